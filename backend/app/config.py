@@ -0,0 +1,210 @@
+"""
+Runtime configuration module for deployment-tunable settings.
+
+1. Reads settings from environment variables (or .env) once, at import time.
+2. Every setting has a default suited to local runs, so no .env entry is required.
+3. Small typed helpers parse ints, floats and booleans consistently.
+4. Algorithm constants (chunk size, thresholds, ...) stay in their own modules;
+   only values that change between deployments live here.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Data locations
+# ─────────────────────────────────────────────────────────────────────────────
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir))
+# Root of kb/, chroma_db/, embed_cache/, doc_embeddings.json and shakers.db
+# (overridable to run isolated instances, e.g. benchmarks)
+DATA_DIR = os.path.abspath(
+    os.getenv("SHAKERS_DATA_DIR") or os.path.join(PROJECT_ROOT, "data")
+)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Database
+# ─────────────────────────────────────────────────────────────────────────────
+# Any SQLAlchemy URL; async drivers (postgresql+asyncpg, sqlite+aiosqlite, ...) make
+# the API routes use an async engine. Defaults to the local SQLite file.
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///" + os.path.join(DATA_DIR, "shakers.db")
+# Connection pool (server databases only; SQLite files use the driver defaults)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 30.0)
+# Recycle connections older than this (seconds), before servers/proxies drop them
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+# Test each pooled connection before use, replacing ones that went stale
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# SQLite: write-ahead log, so readers do not block the writer across workers
+DB_SQLITE_WAL = _env_bool("DB_SQLITE_WAL", True)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LLM provider and gateway
+# ─────────────────────────────────────────────────────────────────────────────
+# Optional override of the Gemini API endpoint (e.g. a local fake server)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
+
+# Maximum number of Gemini calls in flight at once
+LLM_MAX_CONCURRENCY = _env_int("LLM_MAX_CONCURRENCY", 8)
+# Maximum number of requests waiting for a slot before new ones are shed (503)
+LLM_MAX_QUEUE = _env_int("LLM_MAX_QUEUE", 32)
+# Per-request deadline covering both queue wait and the provider call
+LLM_TIMEOUT_SECONDS = _env_float("LLM_TIMEOUT_SECONDS", 20.0)
+# Answer with the top retrieved snippet when the LLM times out or fails
+LLM_DEGRADED_MODE = _env_bool("LLM_DEGRADED_MODE", True)
+
+# Reuse stored answers for byte-identical prompts (keyed by prompt hash and model),
+# so evaluation runs and parameter sweeps only call Gemini for changed prompts
+LLM_ANSWER_CACHE = _env_bool("LLM_ANSWER_CACHE", False)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Retrieval
+# ─────────────────────────────────────────────────────────────────────────────
+# Reject clearly unrelated queries (KB vocabulary / document centroids) before the
+# embedding call and the vector search (see backend/app/services/scope.py)
+SCOPE_PREFILTER_ENABLED = _env_bool("SCOPE_PREFILTER_ENABLED", True)
+# Dimensions requested from the embeddings API (0 = the model's full size)
+EMBED_DIMENSIONS = _env_int("EMBED_DIMENSIONS", 0)
+# Dimensions stored in the Chroma index (0 = as embedded); shorter index vectors are
+# searched with oversampling and the top candidates re-scored on the full vectors
+INDEX_DIMENSIONS = _env_int("INDEX_DIMENSIONS", 0)
+# Embedding cache file format: "json" (float lists), "float32", "float16" or "int8"
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "json").lower()
+# Watch data/kb and re-index changed files in the background of the API process
+KB_WATCH_ENABLED = _env_bool("KB_WATCH_ENABLED", False)
+# How often the KB directory is scanned, and how long it must stay unchanged
+# before a batch of changes is re-indexed (editors save in several writes)
+KB_WATCH_INTERVAL_SECONDS = _env_float("KB_WATCH_INTERVAL_SECONDS", 2.0)
+KB_WATCH_DEBOUNCE_SECONDS = _env_float("KB_WATCH_DEBOUNCE_SECONDS", 1.0)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reranking
+# ─────────────────────────────────────────────────────────────────────────────
+# Re-order a wider candidate set with a local cross-encoder before the LLM call
+# (needs the optional sentence-transformers package; skipped without it)
+RERANK_ENABLED = _env_bool("RERANK_ENABLED", False)
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Chunks retrieved for reranking, and passages kept for the prompt
+RERANK_CANDIDATES = _env_int("RERANK_CANDIDATES", 10)
+RERANK_TOP_N = _env_int("RERANK_TOP_N", 3)
+# (query, passage) pairs per model call, and threads scoring batches in parallel
+RERANK_BATCH_SIZE = _env_int("RERANK_BATCH_SIZE", 16)
+RERANK_WORKERS = _env_int("RERANK_WORKERS", 2)
+# Scores kept in memory, keyed by query hash and passage hash
+RERANK_CACHE_SIZE = _env_int("RERANK_CACHE_SIZE", 10000)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Caches (embeddings, LLM answers, recommendations)
+# ─────────────────────────────────────────────────────────────────────────────
+# "file" (files under data/, per node), "memory" (per process) or "redis" (shared by
+# every worker and node; needs the redis package)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file").lower()
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Prepended to every key, so several deployments can share one Redis
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "shakers:")
+# Socket timeout of Redis calls; a slow or unreachable server counts as a miss
+CACHE_REDIS_TIMEOUT_SECONDS = _env_float("CACHE_REDIS_TIMEOUT_SECONDS", 0.5)
+# Reuse recommendations for the same query, seen documents and KB version
+RECS_CACHE_ENABLED = _env_bool("RECS_CACHE_ENABLED", False)
+RECS_CACHE_TTL_SECONDS = _env_float("RECS_CACHE_TTL_SECONDS", 600.0)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Chat history
+# ─────────────────────────────────────────────────────────────────────────────
+# Largest page GET /history/{user_id} returns in one response
+HISTORY_PAGE_MAX = _env_int("HISTORY_PAGE_MAX", 200)
+# Entries older than this many days are archived out of the live table by compaction
+HISTORY_RETENTION_DAYS = _env_int("HISTORY_RETENTION_DAYS", 90)
+# Run the compaction job in the background of the API process, every N hours
+COMPACTION_ENABLED = _env_bool("COMPACTION_ENABLED", False)
+COMPACTION_INTERVAL_HOURS = _env_float("COMPACTION_INTERVAL_HOURS", 24.0)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Startup warm-up
+# ─────────────────────────────────────────────────────────────────────────────
+# Open the vector index and embed the most frequent recent questions at startup
+WARMUP_ENABLED = _env_bool("WARMUP_ENABLED", True)
+# Longest the startup waits for the warm-up; the rest continues in the background
+WARMUP_BUDGET_SECONDS = _env_float("WARMUP_BUDGET_SECONDS", 5.0)
+# Most frequent questions of the last WARMUP_WINDOW_DAYS that are embedded
+WARMUP_TOP_QUESTIONS = _env_int("WARMUP_TOP_QUESTIONS", 50)
+WARMUP_WINDOW_DAYS = _env_int("WARMUP_WINDOW_DAYS", 7)
+# Answers precomputed in the background for the top N questions (needs LLM_ANSWER_CACHE)
+WARMUP_PRECOMPUTE_ANSWERS = _env_int("WARMUP_PRECOMPUTE_ANSWERS", 0)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LLM request hedging
+# ─────────────────────────────────────────────────────────────────────────────
+# Fire a backup Gemini request when the first one is slower than usual
+LLM_HEDGING_ENABLED = _env_bool("LLM_HEDGING_ENABLED", False)
+# Model for the backup request (empty = same model as the primary)
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL") or None
+# Latency percentile of the primary model used as hedge delay
+LLM_HEDGE_PERCENTILE = _env_float("LLM_HEDGE_PERCENTILE", 0.95)
+# Observations needed before the percentile is trusted
+LLM_HEDGE_MIN_SAMPLES = _env_int("LLM_HEDGE_MIN_SAMPLES", 20)
+# Hedge delay used until enough observations exist
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = _env_float("LLM_HEDGE_DEFAULT_DELAY_SECONDS", 2.0)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Serving (python -m backend.app.serve)
+# ─────────────────────────────────────────────────────────────────────────────
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = _env_int("SERVE_PORT", 8000)
+# Worker processes (0 = one per CPU core)
+SERVE_WORKERS = _env_int("SERVE_WORKERS", 0)
+# A worker silent for longer than this is restarted (above LLM_TIMEOUT_SECONDS)
+SERVE_TIMEOUT_SECONDS = _env_int("SERVE_TIMEOUT_SECONDS", 60)
+# Time given to in-flight requests on shutdown / restart
+SERVE_GRACEFUL_TIMEOUT_SECONDS = _env_int("SERVE_GRACEFUL_TIMEOUT_SECONDS", 30)
+SERVE_KEEPALIVE_SECONDS = _env_int("SERVE_KEEPALIVE_SECONDS", 5)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Response compression
+# ─────────────────────────────────────────────────────────────────────────────
+COMPRESSION_ENABLED = _env_bool("COMPRESSION_ENABLED", True)
+# Smaller bodies are sent uncompressed
+COMPRESSION_MIN_BYTES = _env_int("COMPRESSION_MIN_BYTES", 1024)
+COMPRESSION_GZIP_LEVEL = _env_int("COMPRESSION_GZIP_LEVEL", 6)
+# Brotli quality 0-11 (used when the brotli package is installed)
+COMPRESSION_BROTLI_QUALITY = _env_int("COMPRESSION_BROTLI_QUALITY", 4)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Logging
+# ─────────────────────────────────────────────────────────────────────────────
+# Root log level (DEBUG, INFO, WARNING, ...)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-logger level overrides, e.g. "llm_gemini=DEBUG,retriever_openai=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# "text" or "json" (one JSON object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Keep-ratio per high-volume logger, e.g. "retriever_openai.cache=0.01"
+LOG_SAMPLING = os.getenv(
+    "LOG_SAMPLING", "retriever_openai.cache=0.01,llm_gemini.prompt=0.01"
+)
+# Hand records to a background thread so logging never blocks request threads
+LOG_ASYNC = _env_bool("LOG_ASYNC", True)
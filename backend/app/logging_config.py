@@ -0,0 +1,169 @@
+"""
+Central logging configuration for the API and the command-line scripts.
+
+1. Levels come from config (`LOG_LEVEL` plus per-logger `LOG_LEVELS` overrides).
+2. Per-logger sampling (`LOG_SAMPLING`) keeps only a fraction of high-volume
+   DEBUG/INFO messages (cache hits, prompts); warnings and errors are never dropped.
+3. Queue-based handler: request threads only enqueue records, a background
+   listener thread formats and writes them.
+4. Text or JSON (one object per line) output, selected with `LOG_FORMAT`.
+5. Idempotent: calling `configure_logging()` again is a no-op.
+6. Fork-safe: a worker forked after configuration (gunicorn with a preloaded app) gets
+   its own queue and listener thread, since threads do not survive fork.
+"""
+
+import atexit
+import json
+import os
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import Dict, Optional
+
+from backend.app.config import (
+    LOG_ASYNC,
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_LEVELS,
+    LOG_SAMPLING,
+)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configured = False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+def _parse_mapping(spec: str) -> Dict[str, str]:
+    """Parse "name=value,name2=value2" into a dict (blank entries ignored)."""
+    mapping = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            mapping[name.strip()] = value.strip()
+    return mapping
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 out of every round(1/rate) records below WARNING for each configured
+    logger (and its children); other records pass through untouched.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        if rate is None or rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        every = max(1, round(1 / rate))
+        with self._lock:
+            seen = self._counters.get(record.name, 0)
+            self._counters[record.name] = seen + 1
+        return seen % every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message (+ exception)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record as-is, so message formatting happens
+    in the listener thread instead of the request thread (same process only).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def _start_listener(output: logging.Handler) -> logging.Handler:
+    """Start a listener thread writing to `output`; returns the handler feeding it."""
+    global _listener
+    log_queue: queue.Queue = queue.Queue(-1)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _DeferredQueueHandler(log_queue)
+
+
+def _restart_listener(output: logging.Handler, sampling: logging.Filter) -> None:
+    # In a forked child: the parent's listener thread is gone and its queue lock may be
+    # held, so both are replaced (the stale listener is not stopped at exit)
+    if _listener is not None:
+        atexit.unregister(_listener.stop)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    front = _start_listener(output)
+    front.addFilter(sampling)
+    root.addHandler(front)
+
+
+def configure_logging() -> None:
+    """Install the root handler, levels and sampling described by config."""
+    global _listener, _configured
+    if _configured:
+        return
+    _configured = True
+
+    # 1) Output handler and format
+    output = logging.StreamHandler()
+    output.setFormatter(
+        JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+
+    # 2) Sampling is applied before enqueueing, so dropped records cost nothing more
+    rates = {name: float(v) for name, v in _parse_mapping(LOG_SAMPLING).items()}
+    sampling = SamplingFilter(rates)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if LOG_ASYNC:
+        front = _start_listener(output)
+        os.register_at_fork(after_in_child=lambda: _restart_listener(output, sampling))
+    else:
+        front = output
+    front.addFilter(sampling)
+    root.addHandler(front)
+
+    # 3) Levels: root, then per-logger overrides
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_mapping(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
@@ -1,28 +1,30 @@
+import asyncio
 import os
 import sys
 import pathlib
+import time
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from dotenv import load_dotenv
 import uvicorn
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Configure global logging
-# ─────────────────────────────────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.DEBUG, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-)
-logger = logging.getLogger("main")
-
 # ─────────────────────────────────────────────────────────────────────────────
 # 0) Add project root to sys.path for absolute imports
 # ─────────────────────────────────────────────────────────────────────────────
 PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
-    logger.debug(f"Added PROJECT_ROOT to sys.path: {PROJECT_ROOT}")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Configure global logging (levels, sampling and async handler from config)
+# ─────────────────────────────────────────────────────────────────────────────
+from backend.app.logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger("main")
+logger.debug("Project root on sys.path: %s", PROJECT_ROOT)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 1) Load environment variables
@@ -35,38 +37,160 @@ logger.info("Environment variables loaded")
 # ─────────────────────────────────────────────────────────────────────────────
 from backend.app.routers.rag import router as rag_router
 from backend.app.routers.recs import router as recs_router
-from backend.app.db import init_db
+from backend.app.routers.history import router as history_router
+from backend.app.routers.health import router as health_router
+from backend.app.db import dispose_engines, init_db
+from backend.app.config import (
+    COMPACTION_ENABLED,
+    COMPACTION_INTERVAL_HOURS,
+    COMPRESSION_ENABLED,
+    DATA_DIR as CONFIG_DATA_DIR,
+    KB_WATCH_ENABLED,
+    LOG_LEVEL,
+    WARMUP_ENABLED,
+)
+from backend.app.services import retriever_openai, warmup
+from backend.app.services.kb_watcher import KBWatcher
+from backend.app.services.compaction import run_periodically as run_compaction_periodically
 from backend.app.routers.metrics import router as metrics_router
+from backend.app.responses import CompressionMiddleware, ORJSONResponse
+from backend.app.services.telemetry import (
+    CURRENT_REQUEST,
+    endpoint_label,
+    record_request,
+)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 3) Ensure data directory exists
 # ─────────────────────────────────────────────────────────────────────────────
-DATA_DIR = pathlib.Path(__file__).parent.parent / "data"
+DATA_DIR = pathlib.Path(CONFIG_DATA_DIR)
 DATA_DIR.mkdir(exist_ok=True)
-logger.debug(f"Data directory ensured at: {DATA_DIR}")
+logger.debug("Data directory ensured at: %s", DATA_DIR)
+
+# Held (open and locked) by the one worker that runs the background jobs
+BACKGROUND_LOCK_FILE = DATA_DIR / ".background.lock"
+_background_lock = None
+
+
+def acquire_background_lock() -> bool:
+    """
+    True in the one process per data directory that may run the background jobs:
+    building a missing index, the KB watcher and compaction (the lock is released when
+    that worker exits, and taken by the worker started to replace it). Always True
+    where file locks are unavailable.
+    """
+    global _background_lock
+    if _background_lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    handle = open(BACKGROUND_LOCK_FILE, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _background_lock = handle
+    return True
+
+
+def release_background_lock() -> None:
+    global _background_lock
+    if _background_lock is not None:
+        _background_lock.close()
+        _background_lock = None
+
+
+def build_missing_index() -> None:
+    """
+    Build the vector index if none is published. Without it /health/ready stays 503,
+    so no query (which would otherwise build it) ever reaches the worker.
+    """
+    try:
+        retriever_openai.ensure_index()
+    except Exception:
+        logger.exception("Index build failed; the first query retries it")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 4) Define lifespan event to initialize the database
+# 4) Define lifespan event to initialize the database (then index build, warm-up,
+#    KB watcher and compaction; with several workers all but the warm-up run in one
+#    of them)
 # ─────────────────────────────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Initializing database")
     init_db()
+    background = acquire_background_lock()
+    if background and not retriever_openai.index_exists():
+        logger.info("No vector index published; building it in the background")
+        asyncio.get_running_loop().run_in_executor(None, build_missing_index)
+    warmup_task = None
+    if WARMUP_ENABLED:
+        # Waits at most WARMUP_BUDGET_SECONDS; the rest continues in the background
+        warmup_task = await warmup.start()
+    if (KB_WATCH_ENABLED or COMPACTION_ENABLED) and not background:
+        logger.info("Background jobs run in another worker")
+    kb_watcher = KBWatcher().start() if KB_WATCH_ENABLED and background else None
+    compaction_task = None
+    if COMPACTION_ENABLED and background:
+        logger.info("Starting history compaction every %.1f h", COMPACTION_INTERVAL_HOURS)
+        compaction_task = asyncio.create_task(
+            run_compaction_periodically(COMPACTION_INTERVAL_HOURS * 3600)
+        )
     yield
     logger.info("Shutting down application")
+    warmup.stop(warmup_task)
+    if kb_watcher is not None:
+        kb_watcher.stop()
+    if compaction_task is not None:
+        compaction_task.cancel()
+    release_background_lock()
+    await dispose_engines()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 5) Create FastAPI app and include routers
+# 5) Create FastAPI app (JSON bodies encoded with orjson), include routers and
+#    compress large responses (added before the latency middleware, which stays outermost)
 # ─────────────────────────────────────────────────────────────────────────────
-app = FastAPI(title="Shakers Platform AI", version="0.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="Shakers Platform AI",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 app.include_router(rag_router, prefix="/rag")
 app.include_router(recs_router, prefix="/recs")
+app.include_router(history_router, prefix="/history")
 app.include_router(metrics_router, prefix="/metrics")
+app.include_router(health_router, prefix="/health")
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 6) Per-endpoint latency middleware (labels stage timings with the endpoint)
+# ─────────────────────────────────────────────────────────────────────────────
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # The router fills the shared scope (endpoint, path params) during call_next
+    token = CURRENT_REQUEST.set(request.scope)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        record_request(endpoint_label(request.scope), status_code, elapsed)
+        CURRENT_REQUEST.reset(token)
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 6) Run the application with Uvicorn if executed directly
+# 7) Run the application with Uvicorn if executed directly (development server;
+#    production runs several workers via `python -m backend.app.serve`)
 # ─────────────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     logger.info("Starting Uvicorn server")
@@ -75,5 +199,5 @@ if __name__ == "__main__":
         host="127.0.0.1",
         port=8000,
         reload=True,
-        log_level="debug",
+        log_level=LOG_LEVEL.lower(),
     )
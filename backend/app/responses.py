@@ -0,0 +1,199 @@
+"""
+Response encoding for the API: orjson bodies and gzip/brotli compression.
+
+1. `ORJSONResponse` is the app's default response class: JSON rendered with orjson
+   (numpy values and non-string keys included), several times faster than `json` and
+   than Pydantic's own JSON output on answer-sized strings (benchmarks/serialization.py).
+   `dumps()` is the same encoder for endpoints that build their own body (ETags,
+   NDJSON streams).
+2. `CompressionMiddleware` compresses bodies of COMPRESSION_MIN_BYTES or more:
+   brotli when the client accepts "br" and the optional brotli package is installed,
+   gzip otherwise. Smaller bodies are sent as-is (not worth the CPU). Streaming
+   responses are compressed chunk by chunk; large chunks are compressed off the
+   event loop. A plain ASGI middleware (public Starlette header helpers only), so it
+   does not depend on the internals of Starlette's GZipMiddleware.
+"""
+
+import gzip
+import io
+from typing import Any, Callable, Optional
+
+import anyio
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.app.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_BYTES,
+)
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+# Chunks at least this large are compressed on a worker thread
+THREAD_MIN_BYTES = 128 * 1024
+# Server-sent events must reach the client as they are written
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Compression
+# ─────────────────────────────────────────────────────────────────────────────
+def accepts(accept_encoding: str, coding: str) -> bool:
+    """True when an Accept-Encoding header allows `coding` (q=0 refuses it)."""
+    for part in accept_encoding.lower().split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if name != coding:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class GzipEncoder:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int) -> None:
+        self._buffer = io.BytesIO()
+        self._file = gzip.GzipFile(mode="wb", fileobj=self._buffer, compresslevel=level)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        self._file.write(body)
+        if more_body:
+            self._file.flush()
+        else:
+            self._file.close()
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class BrotliEncoder:
+    content_encoding = "br"
+
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionResponder:
+    """
+    Compresses one response: the start message is held back until the first body
+    chunk shows whether it is worth compressing.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, encoder: Callable[[], Any]) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.make_encoder = encoder
+        self.encoder = None
+        self.initial_message: Optional[Message] = None
+        self.started = False
+        self.send: Send = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MIN_BYTES:
+            return await anyio.to_thread.run_sync(self.encoder.compress, body, more_body)
+        return self.encoder.compress(body, more_body)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.initial_message = message
+            return
+        if message["type"] != "http.response.body":
+            # e.g. http.response.pathsend: passed through untouched
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = Headers(raw=self.initial_message["headers"])
+            if (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            self.encoder = self.make_encoder()
+            data = await self._compress(body, more_body)
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoder.content_encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(data))
+            await self.send(self.initial_message)
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+        elif self.encoder is None:
+            await self.send(message)
+        else:
+            data = await self._compress(body, more_body)
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: Optional[int] = COMPRESSION_BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        # None (or no brotli package) = gzip only
+        self.brotli_quality = brotli_quality if brotli is not None else None
+
+    def _encoder(self, scope: Scope) -> Optional[Callable[[], Any]]:
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        if self.brotli_quality is not None and accepts(accept_encoding, "br"):
+            return lambda: BrotliEncoder(self.brotli_quality)
+        if accepts(accept_encoding, "gzip"):
+            return lambda: GzipEncoder(self.gzip_level)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoder = self._encoder(scope) if scope["type"] == "http" else None
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(self.app, self.minimum_size, encoder)
+        await responder(scope, receive, send)
@@ -0,0 +1,48 @@
+"""
+Health router with the liveness and readiness probes of each worker process.
+
+1. `GET /health/live` answers as long as the worker's event loop runs (no I/O), so an
+   orchestrator restarts only workers that are stuck or dead.
+2. `GET /health/ready` returns 200 once the worker can serve queries: the database
+   answers, a vector index is published and the startup warm-up is over (failed
+   warm-ups count as over, and so do warm-ups past WARMUP_BUDGET_SECONDS). Otherwise
+   503 with the failing checks, so a load balancer keeps traffic away from a worker
+   that is still starting. A missing index is built at startup (main.build_missing_index).
+"""
+
+import logging
+import os
+from typing import Dict
+
+from fastapi import APIRouter
+
+from backend.app.db import ping_async
+from backend.app.responses import ORJSONResponse
+from backend.app.services import retriever_openai, warmup
+
+router = APIRouter(tags=["Health"])
+logger = logging.getLogger("health_router")
+
+
+@router.get("/live")
+async def live() -> Dict[str, object]:
+    return {"status": "alive", "pid": os.getpid()}
+
+
+@router.get("/ready")
+async def ready() -> ORJSONResponse:
+    checks: Dict[str, bool] = {}
+    try:
+        await ping_async()
+        checks["database"] = True
+    except Exception as e:
+        logger.warning("Readiness: database unreachable: %s", e)
+        checks["database"] = False
+    checks["index"] = retriever_openai.index_exists()
+    checks["warmup"] = warmup.startup_over()
+
+    is_ready = all(checks.values())
+    return ORJSONResponse(
+        {"status": "ready" if is_ready else "starting", "pid": os.getpid(), "checks": checks},
+        status_code=200 if is_ready else 503,
+    )
@@ -0,0 +1,83 @@
+"""
+Chat history router module with keyset pagination.
+
+1. `GET /history/{user_id}` returns one page of a user's entries, newest or oldest first,
+   plus the `next_cursor` to pass back for the following page (null on the last one).
+2. Pages are keyset ranges on the (user_id, id) index: `id > cursor` (asc) or
+   `id < cursor` (desc), so deep pages cost the same as the first and new entries
+   never shift an open pagination.
+3. `GET /history/{user_id}/stream` streams the whole history as NDJSON, reading it
+   from the database one batch at a time instead of materializing it.
+"""
+
+import logging
+from typing import Iterator, List, Literal, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from backend.app.config import HISTORY_PAGE_MAX
+from backend.app.db import ChatEntry, get_history_page, iter_user_history
+from backend.app.responses import dumps
+
+router = APIRouter(tags=["History"])
+logger = logging.getLogger("history_router")
+
+STREAM_BATCH_SIZE = 500
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Response models
+# ─────────────────────────────────────────────────────────────────────────────
+class HistoryItem(BaseModel):
+    id: int
+    q: str
+    a: str
+    refs: List[str]
+
+
+class HistoryPage(BaseModel):
+    user_id: str
+    items: List[HistoryItem]
+    next_cursor: Optional[int]
+
+
+def _to_item(row: ChatEntry) -> HistoryItem:
+    return HistoryItem(
+        id=row.id,
+        q=row.question,
+        a=row.answer,
+        refs=row.references.split(",") if row.references else [],
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GET /history/{user_id} endpoint
+# ─────────────────────────────────────────────────────────────────────────────
+@router.get("/{user_id}", response_model=HistoryPage)
+def history_page(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=HISTORY_PAGE_MAX),
+    cursor: Optional[int] = Query(None, description="id of the last entry already seen"),
+    order: Literal["asc", "desc"] = "desc",
+):
+    rows = get_history_page(user_id, cursor=cursor, limit=limit, descending=order == "desc")
+    # A full page may have more after it; a short one is the end
+    next_cursor = rows[-1].id if len(rows) == limit else None
+    logger.info("History page for user=%r: %d items, next_cursor=%s", user_id, len(rows), next_cursor)
+    return HistoryPage(user_id=user_id, items=[_to_item(r) for r in rows], next_cursor=next_cursor)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GET /history/{user_id}/stream endpoint
+# ─────────────────────────────────────────────────────────────────────────────
+@router.get("/{user_id}/stream")
+def history_stream(user_id: str):
+    """Whole history, oldest first, as one JSON object per line."""
+
+    def lines() -> Iterator[bytes]:
+        for row in iter_user_history(user_id, batch_size=STREAM_BATCH_SIZE):
+            yield dumps(_to_item(row).model_dump()) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
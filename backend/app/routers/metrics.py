@@ -2,53 +2,157 @@
 Metrics router module exposing evaluation results as a REST endpoint.
 
 1. Defines a dedicated `/metrics/summary` GET endpoint for retrieval of evaluation metrics.
-2. Dynamically resolves the path to `evaluation/metrics_summary.json` relative to the module.
+2. Resolves the path to `evaluation/metrics_summary.json` once, and keeps the parsed file
+   in memory until its modification time (or size) changes.
 3. Returns a 404 error if the metrics file is missing, guiding users to run the evaluation script.
 4. Wraps file I/O in try/except to return a 500 error on read failures with a clear message.
-5. Uses FastAPI’s JSONResponse for correct JSON content delivery.
+5. Merges live in-process aggregates (queries served, out-of-scope rate, average latency,
+   cache hit rates, out-of-scope prefilter counts and startup warm-up) under "live", and
+   answers with an ETag; a matching `If-None-Match` gets an empty 304, so dashboards can
+   poll cheaply. The body is encoded with orjson.
+6. Exposes live latency histograms (per stage and endpoint) at `/metrics/prometheus`
+   in the Prometheus text exposition format.
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
 import os
 import json
+import hashlib
+from typing import Dict, Optional, Tuple
 
-router = APIRouter(prefix="/metrics", tags=["Metrics"])
+from backend.app.responses import dumps
+from backend.app.services.telemetry import (
+    EVENT_COUNT,
+    REQUEST_LATENCY,
+    STAGE_LATENCY,
+    render_prometheus,
+)
+
+# The "/metrics" prefix is applied once, in main.py
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        "..",
+        "..",
+        "..",
+        "evaluation",
+        "metrics_summary.json",
+    )
+)
+
+# Parsed metrics file and the (path, mtime_ns, size) it was read at
+_summary_cache: Dict[str, object] = {"stamp": None, "data": None}
+
+
+def _load_summary(path: str) -> Optional[dict]:
+    """Parsed metrics file (None if missing), re-read only when it changed on disk."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stamp: Tuple[str, int, int] = (path, stat.st_mtime_ns, stat.st_size)
+    if _summary_cache["stamp"] != stamp:
+        with open(path, "r", encoding="utf-8") as f:
+            _summary_cache["data"] = json.load(f)
+        _summary_cache["stamp"] = stamp
+    return _summary_cache["data"]
+
+
+def _ratio(numerator: int, denominator: int) -> Optional[float]:
+    return numerator / denominator if denominator else None
+
+
+def _avg_stage_ms(stage: str) -> Optional[float]:
+    hists = [hist for (_, name), hist in list(STAGE_LATENCY.items()) if name == stage]
+    count = sum(hist.count for hist in hists)
+    return sum(hist.sum for hist in hists) / count * 1000 if count else None
+
+
+def live_metrics() -> dict:
+    """In-process aggregates since the server started."""
+    events = dict(EVENT_COUNT)
+    queries = events.get("rag_queries", 0)
+    checks = events.get("scope_checks", 0)
+    lexical_misses = events.get("scope_lexical_miss", 0)
+    rejected_centroid = events.get("scope_rejected_centroid", 0)
+    return {
+        "queries_served": queries,
+        "recommendations_served": events.get("recs_served", 0),
+        "out_of_scope_rate": _ratio(events.get("rag_out_of_scope", 0), queries),
+        # Metrics and health endpoints are left out, so polling alone does not change the ETag
+        "avg_latency_ms": {
+            endpoint: hist.sum / hist.count * 1000
+            for endpoint, hist in sorted(REQUEST_LATENCY.items())
+            if hist.count
+            and endpoint.startswith("/")
+            and not endpoint.startswith(("/metrics", "/health"))
+        },
+        "cache_hit_rate": {
+            cache: _ratio(
+                events.get(f"{cache}_cache_hit", 0),
+                events.get(f"{cache}_cache_hit", 0) + events.get(f"{cache}_cache_miss", 0),
+            )
+            for cache in ("embedding", "answer", "rerank", "recs")
+        },
+        "scope_prefilter": {
+            "checks": checks,
+            "lexical_misses": lexical_misses,
+            "rejected_centroid": rejected_centroid,
+            "rejection_rate": _ratio(rejected_centroid, checks),
+            "avg_lexical_ms": _avg_stage_ms("scope_lexical"),
+            "avg_centroid_ms": _avg_stage_ms("scope_centroid"),
+        },
+        "warmup": {
+            "embeddings": events.get("warmup_embeddings", 0),
+            "answers": events.get("warmup_answers", 0),
+        },
+    }
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # GET /metrics/summary endpoint
 # ─────────────────────────────────────────────────────────────────────────────
 @router.get("/summary")
-async def metrics_summary():
+async def metrics_summary(request: Request):
     """
-    Returns the evaluation metrics (JSON) generated by evaluation/evaluate.py
+    Returns the evaluation metrics (JSON) generated by evaluation/evaluate.py,
+    plus live in-process aggregates under "live"
     """
 
-    # 1) Locate evaluation/metrics_summary.json
-    metrics_path = os.path.abspath(
-        os.path.join(
-            os.path.dirname(__file__),
-            "..",
-            "..",
-            "..",
-            "evaluation",
-            "metrics_summary.json",
-        )
-    )
+    # 1) Load evaluation/metrics_summary.json (cached until it changes on disk)
+    try:
+        data = _load_summary(METRICS_PATH)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading metrics: {e}")
 
     # 2) If the metrics file does not exist, return 404
-    if not os.path.exists(metrics_path):
+    if data is None:
         raise HTTPException(
             status_code=404,
             detail="Metrics summary not found. Run evaluation/evaluate.py first.",
         )
 
-    # 3) Load and return the metrics JSON
-    try:
-        with open(metrics_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading metrics: {e}")
+    # 3) Merge live aggregates; unchanged content keeps the same ETag
+    body = dumps({**data, "live": live_metrics()})
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
-    return JSONResponse(content=data)
+# ─────────────────────────────────────────────────────────────────────────────
+# GET /metrics/prometheus endpoint
+# ─────────────────────────────────────────────────────────────────────────────
+@router.get("/prometheus", response_class=PlainTextResponse)
+async def metrics_prometheus():
+    """
+    Returns live latency histograms (request totals and pipeline stages) in
+    Prometheus text format, for scraping.
+    """
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -2,9 +2,14 @@
 RAG router: Defines the API endpoint for Retrieval-Augmented Generation (RAG).
 
 This module provides a FastAPI router with a single POST endpoint `/query` that:
-1. Retrieves relevant document fragments using the retriever service.
-2. Checks if the query is within scope based on a distance threshold.
-3. Generates an answer via the LLM using only the snippet texts.
+1. Retrieves relevant document fragments and checks that the query is within scope
+   (prefilter and distance threshold, see backend/app/services/scope.py).
+2. With RERANK_ENABLED, a wider candidate set is retrieved and reranked by a local
+   cross-encoder, keeping the RERANK_TOP_N best passages (backend/app/services/reranker.py).
+   Steps 1-2 are `retrieve_context` (backend/app/services/rag_pipeline.py), shared with
+   the warm-up and the evaluation so they build the same prompts.
+3. Generates an answer via the LLM using only the snippet texts, through the
+   concurrency-limited LLM gateway (503 when the queue is full).
 4. Stores the interaction in the database, with references derived from the fragments.
 """
 
@@ -19,13 +24,24 @@ PROJECT_ROOT = os.path.abspath(
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import List
 
-from backend.app.services.retriever_openai import retrieve_fragments_openai
-from backend.app.services.llm_gemini import generate_answer_with_references_gemini
-from backend.app.db import add_chat_entry
+from backend.app.services.rag_pipeline import references, retrieve_context, snippet_texts
+from backend.app.config import LLM_HEDGING_ENABLED
+from backend.app.services.llm_gemini import (
+    generate_answer_with_references_gemini,
+    generate_answer_hedged_gemini,
+)
+from backend.app.services.llm_gateway import (
+    LLMGateway,
+    LLMOverloadedError,
+    LLMUnavailableError,
+)
+from backend.app.db import add_chat_entry_async
+from backend.app.services.telemetry import count_event
 
 router = APIRouter(tags=["RAG"])
 logger = logging.getLogger("rag_router")
@@ -38,47 +54,53 @@ class RAGResponse(BaseModel):
     answer: str
     references: List[str]
 
-DISTANCE_THRESHOLD = 1.25
+LLM_GATEWAY = LLMGateway()
 
 @router.post("/query", response_model=RAGResponse)
 async def rag_query(payload: RAGQuery):
-    logger.info(f"→ RAG query start: user={payload.user_id!r} query={payload.query!r}")
-
-    # 1) Retrieve fragments; if none, send out-of-scope fallback
-    fragments = retrieve_fragments_openai(payload.query, k=3)
-    logger.debug(f"Fragments received: {[(round(d,3), src) for _, d, src in fragments]}")
+    logger.info("→ RAG query start: user=%r query=%r", payload.user_id, payload.query)
+    count_event("rag_queries")
 
+    # 1-3) Retrieve, check scope and rerank (blocking I/O and CPU, kept off the event
+    #    loop); if out of scope, send fallback
+    fragments = await run_in_threadpool(retrieve_context, payload.query)
     if not fragments:
         answer = "Sorry, I have no information on that."
-        logger.info("Out-of-scope: no relevant fragments returned, sending fallback answer")
-        add_chat_entry(payload.user_id, payload.query, answer, [])
-        return RAGResponse(answer=answer, references=[])
-
-    # 2) Out-of-scope detection by distance
-    distances = [dist for (_, dist, _) in fragments]
-    if min(distances) > DISTANCE_THRESHOLD:
-        answer = "Sorry, I have no information on that."
-        logger.info(f"Out-of-scope (min_distance={min(distances):.3f}), sending fallback answer")
-        add_chat_entry(payload.user_id, payload.query, answer, [])
+        logger.info("Out-of-scope, sending fallback answer")
+        count_event("rag_out_of_scope")
+        await add_chat_entry_async(payload.user_id, payload.query, answer, [])
         return RAGResponse(answer=answer, references=[])
 
-    # 3) Prepare snippets for LLM
-    snippet_texts = [text for (text, _, _) in fragments]
-    logger.debug(f"Passing {len(snippet_texts)} snippets to LLM")
+    # 4) Prepare snippets for LLM
+    snippets = snippet_texts(fragments)
+    logger.debug("Passing %d snippets to LLM", len(snippets))
 
-    # 4) Call Gemini to generate answer
+    # 5) Call Gemini to generate answer (bounded by the gateway)
     logger.info("Invoking LLM (Gemini) for response generation")
-    rag_output = generate_answer_with_references_gemini(snippet_texts, payload.query)
+    llm_fn = (
+        generate_answer_hedged_gemini
+        if LLM_HEDGING_ENABLED
+        else generate_answer_with_references_gemini
+    )
+    try:
+        rag_output = await LLM_GATEWAY.generate(snippets, payload.query, llm_fn)
+    except (LLMOverloadedError, LLMUnavailableError) as e:
+        logger.warning("LLM unavailable, rejecting request: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="The assistant is busy right now. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
     answer_text = rag_output.get("answer", "").strip()
-    logger.debug(f"LLM answer (len={len(answer_text)}): {answer_text!r}")
+    logger.debug("LLM answer length=%d", len(answer_text))
 
-    # 5) Build and dedupe references
-    references = list(dict.fromkeys(src for (_, _, src) in fragments))
-    logger.debug(f"References extracted: {references}")
+    # 6) Build and dedupe references
+    sources = references(fragments)
+    logger.debug("References extracted: %s", sources)
 
-    # 6) Persist interaction
-    add_chat_entry(payload.user_id, payload.query, answer_text, references)
+    # 7) Persist interaction
+    await add_chat_entry_async(payload.user_id, payload.query, answer_text, sources)
     logger.info("Chat entry persisted to database")
 
     logger.info("← RAG query end")
-    return RAGResponse(answer=answer_text, references=references)
+    return RAGResponse(answer=answer_text, references=sources)
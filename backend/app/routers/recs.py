@@ -2,7 +2,8 @@
 Recommendations router module for personalized resource suggestions.
 
 1. Defines clear Pydantic models for request/response and leverages FastAPI’s validation.
-2. Retrieves user history from the database and transforms it into the required format.
+2. Reads only the distinct references of the user's live entries (one aggregate query,
+   never the whole chat history), plus the documents aggregated from archived entries.
 3. Integrates the recommend_resources service combining user profile and query.
 4. Structured logging at INFO and ERROR levels for traceability.
 5. Error handling with HTTPException for robust API responses.
@@ -16,8 +17,9 @@ from typing import List
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from backend.app.db import get_user_history
+from backend.app.db import get_archived_docs_async, get_seen_references_async
 from backend.app.services.recommendations import recommend_resources
+from backend.app.services.telemetry import count_event
 
 router = APIRouter(tags=["Recommendations"])
 logger = logging.getLogger("recs_router")
@@ -46,17 +48,20 @@ class RecsResponse(BaseModel):
 @router.post("/personalized", response_model=RecsResponse)
 async def personalized_recs(payload: RecsRequest):
     logger.info(
-        f"Generating recommendations for user={payload.user_id!r}, query={payload.current_query!r}"
+        "Generating recommendations for user=%r, query=%r",
+        payload.user_id,
+        payload.current_query,
     )
 
-    # 1) Retrieve full chat history for the user
-    chat_entries = get_user_history(payload.user_id)
+    # 1) Retrieve the distinct references of the user's entries (all the recommender
+    #    uses) and the documents seen in entries already archived by the compaction job
+    seen_refs = await get_seen_references_async(payload.user_id)
+    archived_docs = await get_archived_docs_async(payload.user_id)
 
     # 2) Format history for recommendation service
-    history_list = []
-    for row in chat_entries:
-        refs_list = row.references.split(",") if row.references else []
-        history_list.append({"q": row.question, "a": row.answer, "refs": refs_list})
+    history_list = [{"refs": refs_list} for refs_list in seen_refs]
+    if archived_docs:
+        history_list.append({"refs": archived_docs})
 
     # 3) Generate recommendations combining profile + current query
     try:
@@ -67,10 +72,11 @@ async def personalized_recs(payload: RecsRequest):
             alpha=0.6,
         )
     except Exception as e:
-        logger.error(f"Recommendation generation failed: {e}")
+        logger.error("Recommendation generation failed: %s", e)
         raise HTTPException(
             status_code=500, detail="Failed to generate recommendations"
         )
 
-    logger.info(f"Returning {len(recs)} recommendations")
+    count_event("recs_served")
+    logger.info("Returning %d recommendations", len(recs))
     return RecsResponse(recommendations=recs)
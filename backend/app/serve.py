@@ -0,0 +1,152 @@
+"""
+Production entry point: several worker processes sharing the read-only data.
+
+Usage:
+    python -m backend.app.serve
+    python -m backend.app.serve --workers 4 --port 8080
+
+1. A gunicorn master runs SERVE_WORKERS uvicorn workers (one per CPU core by default)
+   and restarts any that die or stop responding (SERVE_TIMEOUT_SECONDS).
+2. The app is imported once in the master, before forking (`preload_app`): modules,
+   provider clients, configuration and the recommender's document vectors (one
+   contiguous float32 matrix) are shared copy-on-write by every worker.
+   `gc.freeze()` keeps the workers' garbage collector from writing to (and so
+   copying) those pages.
+3. The database schema is created once, in the master. In each worker after fork:
+   database pools are reset (no connection crosses the fork), the log listener thread
+   is restarted, and the lifespan opens the Chroma index and runs the warm-up.
+   Chroma's SQLite connections and threads cannot be forked; its index files are
+   shared through the OS page cache instead.
+4. Building a missing index, the KB watcher and compaction run in one worker only
+   (main.acquire_background_lock); the other workers pick up a new index version and
+   doc_embeddings.json on their next query.
+5. Orchestrators probe each worker on GET /health/live and GET /health/ready.
+6. Without gunicorn (e.g. on Windows) uvicorn's own worker processes are used; they
+   are spawned rather than forked, so nothing is shared.
+"""
+
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+import sys
+from typing import Dict
+
+# Add project root to sys.path so the module also runs as a plain file
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.app.config import (
+    LOG_LEVEL,
+    SERVE_GRACEFUL_TIMEOUT_SECONDS,
+    SERVE_HOST,
+    SERVE_KEEPALIVE_SECONDS,
+    SERVE_PORT,
+    SERVE_TIMEOUT_SECONDS,
+    SERVE_WORKERS,
+)
+
+logger = logging.getLogger("serve")
+
+APP = "backend.app.main:app"
+
+
+def worker_count(requested: int = SERVE_WORKERS) -> int:
+    return requested if requested > 0 else (os.cpu_count() or 1)
+
+
+def worker_class() -> str:
+    # The worker moved out of uvicorn into the uvicorn-worker package
+    if importlib.util.find_spec("uvicorn_worker") is not None:
+        return "uvicorn_worker.UvicornWorker"
+    return "uvicorn.workers.UvicornWorker"
+
+
+def load_app():
+    """Import the app (and everything loaded at import time), then freeze the heap."""
+    from backend.app.main import app
+    from backend.app.services import recommendations
+
+    logger.info(
+        "Preloaded app with %d document vectors", len(recommendations.DOC_EMBEDDINGS)
+    )
+    gc.freeze()
+    return app
+
+
+def post_fork(server, worker) -> None:
+    """gunicorn hook: drop pooled connections inherited from the master."""
+    from backend.app import db
+
+    db.engine.dispose(close=False)
+    db._async_engine = None
+
+
+def gunicorn_options(workers: int, host: str, port: int) -> Dict[str, object]:
+    return {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": worker_class(),
+        "preload_app": True,
+        "timeout": SERVE_TIMEOUT_SECONDS,
+        "graceful_timeout": SERVE_GRACEFUL_TIMEOUT_SECONDS,
+        "keepalive": SERVE_KEEPALIVE_SECONDS,
+        "loglevel": LOG_LEVEL.lower(),
+        "post_fork": post_fork,
+    }
+
+
+def run_gunicorn(options: Dict[str, object]) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    Application().run()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help="0 = one per CPU core")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    return parser.parse_args(argv)
+
+
+def prepare_database() -> None:
+    """Create the schema once, before the workers (whose lifespans would race on it)."""
+    from backend.app import db
+
+    db.init_db()
+    db.engine.dispose()
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    workers = worker_count(args.workers)
+    prepare_database()
+    if importlib.util.find_spec("gunicorn") is not None:
+        logger.info("Starting gunicorn with %d workers on %s:%d", workers, args.host, args.port)
+        run_gunicorn(gunicorn_options(workers, args.host, args.port))
+        return
+
+    import uvicorn
+
+    logger.warning("gunicorn not installed: %d spawned uvicorn workers, no shared memory", workers)
+    uvicorn.run(
+        APP, host=args.host, port=args.port, workers=workers, log_level=LOG_LEVEL.lower()
+    )
+
+
+if __name__ == "__main__":
+    from backend.app.logging_config import configure_logging
+
+    configure_logging()
+    main()
@@ -0,0 +1,234 @@
+"""
+Key-value cache interface shared by the embedding, answer and recommendation caches.
+
+1. One small interface (`get`, `get_many`, `set`, `set_many`, `delete`) over bytes values;
+   callers own the key layout and the (de)serialization.
+2. CACHE_BACKEND selects the store:
+   - "file": one file per key under the caller's directory (the historical layout, so
+     existing data/embed_cache and data/answer_cache entries keep being served);
+   - "memory": a process-local dict, for tests and single-worker runs;
+   - "redis": a Redis-compatible server (CACHE_REDIS_URL) shared by every worker and
+     node, so scaled-out workers reuse each other's embeddings and answers.
+3. Batch lookups (`get_many`, `set_many`) go to Redis as one pipeline: one round trip
+   per batch instead of one per key.
+4. Per-namespace TTL (seconds, None = no expiry); the file backend checks file age.
+5. Redis errors are logged and treated as misses (reads) or skipped (writes): an
+   unreachable cache slows requests down, it never fails them.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from backend.app.config import (
+    CACHE_BACKEND,
+    CACHE_KEY_PREFIX,
+    CACHE_REDIS_TIMEOUT_SECONDS,
+    CACHE_REDIS_URL,
+)
+
+logger = logging.getLogger("cache")
+
+BACKENDS = ("file", "memory", "redis")
+if CACHE_BACKEND not in BACKENDS:
+    raise ValueError(f"Unsupported CACHE_BACKEND {CACHE_BACKEND!r}")
+
+
+class Cache:
+    """Bytes cache; subclasses implement `get`, `set` and `delete`."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [self.get(key) for key in keys]
+
+    def set_many(self, items: Mapping[str, bytes]) -> None:
+        for key, value in items.items():
+            self.set(key, value)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# File backend
+# ─────────────────────────────────────────────────────────────────────────────
+class FileCache(Cache):
+    """One file per key under `root` (keys may contain "/" subdirectories)."""
+
+    def __init__(self, root: str, ttl: Optional[float] = None):
+        self.root = root
+        self.ttl = ttl
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Memory backend
+# ─────────────────────────────────────────────────────────────────────────────
+# {prefixed key: (value, expiry as time.monotonic() or None)}, shared by all namespaces
+_memory_store: Dict[str, Tuple[bytes, Optional[float]]] = {}
+_memory_lock = threading.Lock()
+
+
+class MemoryCache(Cache):
+    """Process-local store with the same semantics as the shared backends."""
+
+    def __init__(self, prefix: str = "", ttl: Optional[float] = None):
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        with _memory_lock:
+            entry = _memory_store.get(self.prefix + key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and time.monotonic() >= expires:
+                del _memory_store[self.prefix + key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with _memory_lock:
+            _memory_store[self.prefix + key] = (value, expires)
+
+    def delete(self, key: str) -> None:
+        with _memory_lock:
+            _memory_store.pop(self.prefix + key, None)
+
+    def clear(self) -> None:
+        """Drop every entry of this namespace."""
+        with _memory_lock:
+            for key in [k for k in _memory_store if k.startswith(self.prefix)]:
+                del _memory_store[key]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Redis backend
+# ─────────────────────────────────────────────────────────────────────────────
+class RedisCache(Cache):
+    """Keys stored as `prefix + key` on a Redis-compatible server."""
+
+    def __init__(self, client, prefix: str = "", ttl: Optional[float] = None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        try:
+            from redis.exceptions import RedisError
+
+            self._errors: Tuple[type, ...] = (RedisError,)
+        except ImportError:  # injected client (tests)
+            self._errors = (ConnectionError, TimeoutError)
+
+    def _expiry(self) -> Optional[int]:
+        return max(1, int(self.ttl)) if self.ttl else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(self.prefix + key)
+        try:
+            return list(pipe.execute())
+        except self._errors as e:
+            logger.warning("Cache read failed (%d keys treated as misses): %s", len(keys), e)
+            return [None] * len(keys)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, items: Mapping[str, bytes]) -> None:
+        if not items:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(self.prefix + key, value, ex=self._expiry())
+        try:
+            pipe.execute()
+        except self._errors as e:
+            logger.warning("Cache write failed (%d keys skipped): %s", len(items), e)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except self._errors as e:
+            logger.warning("Cache delete failed: %s", e)
+
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def redis_client():
+    """Client for CACHE_REDIS_URL, created on first use (its connection pool is thread-safe)."""
+    global _redis_client
+    with _redis_lock:
+        if _redis_client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis needs the redis package") from e
+            _redis_client = redis.Redis.from_url(
+                CACHE_REDIS_URL,
+                socket_timeout=CACHE_REDIS_TIMEOUT_SECONDS,
+                socket_connect_timeout=CACHE_REDIS_TIMEOUT_SECONDS,
+            )
+            logger.info("Redis cache at %s", CACHE_REDIS_URL)
+        return _redis_client
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Namespaces
+# ─────────────────────────────────────────────────────────────────────────────
+def get_cache(
+    namespace: str, directory: str, ttl: Optional[float] = None, backend: Optional[str] = None
+) -> Cache:
+    """
+    Cache of one namespace ("embed", "answer", "recs"): files under `directory`
+    with the file backend, `CACHE_KEY_PREFIX + namespace + ":"` keys otherwise.
+    """
+    backend = backend or CACHE_BACKEND
+    if backend == "file":
+        return FileCache(directory, ttl)
+    prefix = f"{CACHE_KEY_PREFIX}{namespace}:"
+    if backend == "memory":
+        return MemoryCache(prefix, ttl)
+    return RedisCache(redis_client(), prefix, ttl)
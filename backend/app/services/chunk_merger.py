@@ -0,0 +1,90 @@
+"""
+Chunk merger module collapsing overlapping retrieval results into contiguous passages.
+
+1. Groups retrieved chunks by source file using the ordering metadata recorded at index time.
+2. Merges overlapping or adjacent chunks (by `start_index` / `chunk_index`) into one passage.
+3. Strips the duplicated overlap text so the LLM prompt carries each sentence only once.
+4. Keeps the best (lowest) distance of the merged chunks as the passage score.
+5. Leaves chunks without ordering metadata (legacy indexes) untouched.
+"""
+
+from typing import Dict, List, Tuple
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Core parameters
+# ─────────────────────────────────────────────────────────────────────────────
+PASSAGE_SEPARATOR = "\n"
+
+
+def _can_merge(passage: Dict, chunk: Dict) -> bool:
+    """Two chunks of the same source merge if they overlap or are consecutive."""
+    if chunk["start_index"] <= passage["end_index"]:
+        return True
+    previous = passage["last_chunk_index"]
+    return previous is not None and chunk["chunk_index"] == previous + 1
+
+
+def merge_overlapping_chunks(
+    chunks: List[Tuple[str, float, Dict]],
+) -> List[Tuple[str, float, str]]:
+    """
+    Merge retrieved chunks coming from the same source into contiguous passages.
+
+    - chunks: list of (text, distance, metadata) as returned by the vector store.
+      metadata must contain 'source' and, for merging, 'start_index' (character
+      offset in the source file) and optionally 'chunk_index'.
+    Returns a list of (text, distance, source) sorted by ascending distance.
+    """
+    passages: List[Tuple[str, float, str]] = []
+    by_source: Dict[str, List[Dict]] = {}
+
+    # 1) Split chunks into mergeable (with offsets) and pass-through
+    for text, score, metadata in chunks:
+        source = metadata.get("source", "unknown")
+        start = metadata.get("start_index")
+        if start is None or start < 0:
+            passages.append((text, score, source))
+            continue
+        by_source.setdefault(source, []).append(
+            {
+                "text": text,
+                "score": score,
+                "start_index": int(start),
+                "chunk_index": metadata.get("chunk_index"),
+            }
+        )
+
+    # 2) Walk each source in document order, stitching overlapping chunks
+    for source, items in by_source.items():
+        items.sort(key=lambda c: c["start_index"])
+        current = None
+        for chunk in items:
+            if current is not None and _can_merge(current, chunk):
+                overlap = current["end_index"] - chunk["start_index"]
+                if overlap >= len(chunk["text"]):
+                    pass  # fully contained in the current passage
+                elif overlap > 0:
+                    current["text"] += chunk["text"][overlap:]
+                else:
+                    current["text"] += PASSAGE_SEPARATOR + chunk["text"]
+                current["end_index"] = max(
+                    current["end_index"], chunk["start_index"] + len(chunk["text"])
+                )
+                current["score"] = min(current["score"], chunk["score"])
+                current["last_chunk_index"] = chunk["chunk_index"]
+                continue
+
+            if current is not None:
+                passages.append((current["text"], current["score"], source))
+            current = {
+                "text": chunk["text"],
+                "score": chunk["score"],
+                "end_index": chunk["start_index"] + len(chunk["text"]),
+                "last_chunk_index": chunk["chunk_index"],
+            }
+        if current is not None:
+            passages.append((current["text"], current["score"], source))
+
+    # 3) Best passages first, as the retriever returns them
+    passages.sort(key=lambda p: p[1])
+    return passages
@@ -0,0 +1,205 @@
+"""
+History compaction module keeping the live chat table small.
+
+1. Moves ChatEntry rows older than the retention window (HISTORY_RETENTION_DAYS) out of
+   the database, in id-ordered batches, into gzip-compressed columnar archive files
+   (one array per column) under data/archive/chatentry/.
+2. Each archive file is written atomically before its rows are deleted, and the delete
+   plus the aggregate update share one transaction: a crash never loses entries, and a
+   rerun rewrites the same file (named by id range and content digest).
+3. Folds the archived references into per-user UserDocStat aggregates (document, count,
+   last seen), all the recommender needs from old history.
+4. Returns the freed pages to the filesystem with SQLite's incremental vacuum, a bounded
+   number of pages per run (server databases rely on their own autovacuum).
+5. Runs on demand (`python -m backend.app.services.compaction`) or periodically in the
+   API process when COMPACTION_ENABLED is set.
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, delete, select
+
+from backend.app import db
+from backend.app.config import DATA_DIR, HISTORY_RETENTION_DAYS
+from backend.app.db import ChatEntry, UserDocStat
+from backend.app.services.telemetry import count_event
+
+logger = logging.getLogger("compaction")
+
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive", "chatentry")
+ARCHIVE_FORMAT = "shakers-chatentry-columnar/1"
+ARCHIVE_COLUMNS = ("id", "user_id", "question", "answer", "references", "created_at")
+BATCH_SIZE = 1000
+# Pages returned to the filesystem per run (4 KiB each by default)
+VACUUM_PAGES = 10_000
+
+# Only one compaction at a time in this process
+_compaction_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Columnar archive files
+# ─────────────────────────────────────────────────────────────────────────────
+def write_archive(rows: List[ChatEntry], archive_dir: str = ARCHIVE_DIR) -> str:
+    """Write `rows` (ordered by id) to one compressed columnar file; returns its path."""
+    columns: Dict[str, list] = {name: [] for name in ARCHIVE_COLUMNS}
+    for row in rows:
+        for name in ARCHIVE_COLUMNS:
+            value = getattr(row, name)
+            columns[name].append(value.isoformat() if isinstance(value, datetime) else value)
+    payload = json.dumps({"format": ARCHIVE_FORMAT, "rows": len(rows), "columns": columns})
+    # Same rows -> same name (reruns overwrite); SQLite may reuse ids of deleted rows,
+    # so the content digest keeps later batches from replacing earlier ones
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(
+        archive_dir, f"part-{rows[0].id:012d}-{rows[-1].id:012d}-{digest}.json.gz"
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_archive(path: str) -> List[Dict]:
+    """Rows of an archive file, as dicts keyed by column name."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    columns = data["columns"]
+    return [
+        {name: columns[name][i] for name in columns} for i in range(data["rows"])
+    ]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Aggregates and vacuum
+# ─────────────────────────────────────────────────────────────────────────────
+def _merge_aggregates(session: Session, rows: List[ChatEntry]) -> None:
+    seen: Dict[tuple, List] = defaultdict(lambda: [0, None])
+    for row in rows:
+        for doc in filter(None, row.references.split(",")):
+            stat = seen[(row.user_id, doc)]
+            stat[0] += 1
+            stat[1] = max(filter(None, (stat[1], row.created_at)), default=None)
+    for (user_id, doc), (count, last_seen_at) in seen.items():
+        stat = session.get(UserDocStat, (user_id, doc))
+        if stat is None:
+            stat = UserDocStat(user_id=user_id, doc=doc)
+        stat.count += count
+        if last_seen_at and (stat.last_seen_at is None or last_seen_at > stat.last_seen_at):
+            stat.last_seen_at = last_seen_at
+        session.add(stat)
+
+
+def incremental_vacuum(max_pages: int = VACUUM_PAGES) -> int:
+    """
+    Release up to `max_pages` free pages of a SQLite database; returns how many.
+    The first run switches the file to auto_vacuum=INCREMENTAL, which needs one
+    full VACUUM.
+    """
+    if db.engine.url.get_backend_name() != "sqlite":
+        return 0
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            logger.info("Enabling incremental auto-vacuum (one-time full VACUUM)")
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+            return 0
+        before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        # executescript steps the pragma to completion (execute frees a single page)
+        conn.connection.driver_connection.executescript(
+            f"PRAGMA incremental_vacuum({int(max_pages)});"
+        )
+        return before - conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Compaction job
+# ─────────────────────────────────────────────────────────────────────────────
+def compact_history(
+    retention_days: int = HISTORY_RETENTION_DAYS,
+    batch_size: int = BATCH_SIZE,
+    archive_dir: str = ARCHIVE_DIR,
+    vacuum_pages: int = VACUUM_PAGES,
+    now: Optional[datetime] = None,
+) -> Dict:
+    """Archive entries older than `retention_days`, update aggregates, vacuum."""
+    cutoff = (now or db.utcnow()) - timedelta(days=retention_days)
+    archived, files = 0, []
+    with _compaction_lock:
+        while True:
+            with Session(db.engine) as session:
+                rows = session.exec(
+                    select(ChatEntry)
+                    .where(ChatEntry.created_at < cutoff)
+                    .order_by(ChatEntry.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                path = write_archive(rows, archive_dir)
+                ids = [row.id for row in rows]
+                deleted = session.exec(delete(ChatEntry).where(ChatEntry.id.in_(ids))).rowcount
+                if deleted != len(ids):
+                    # Another worker compacted (part of) this batch first
+                    session.rollback()
+                    logger.warning("Batch %s already compacted elsewhere; stopping", path)
+                    break
+                _merge_aggregates(session, rows)
+                session.commit()
+            archived += len(ids)
+            files.append(path)
+            if len(ids) < batch_size:
+                break
+        freed_pages = incremental_vacuum(vacuum_pages) if archived else 0
+
+    count_event("history_archived", archived)
+    logger.info(
+        "Compaction: archived %d entries older than %s into %d files, freed %d pages",
+        archived, cutoff.isoformat(), len(files), freed_pages,
+    )
+    return {
+        "cutoff": cutoff.isoformat(),
+        "archived": archived,
+        "files": files,
+        "freed_pages": freed_pages,
+    }
+
+
+async def run_periodically(interval_seconds: float) -> None:
+    """Run compact_history off the event loop every `interval_seconds` until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, compact_history)
+        except Exception:
+            logger.exception("Compaction run failed")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    from backend.app.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Archive old chat entries and vacuum the DB")
+    parser.add_argument("--retention-days", type=int, default=HISTORY_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--vacuum-pages", type=int, default=VACUUM_PAGES)
+    args = parser.parse_args()
+
+    configure_logging()
+    db.init_db()
+    print(json.dumps(
+        compact_history(args.retention_days, args.batch_size, vacuum_pages=args.vacuum_pages),
+        indent=2,
+    ))
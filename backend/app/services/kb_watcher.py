@@ -0,0 +1,108 @@
+"""
+KB hot reload: re-indexes changed knowledge-base files in the background.
+
+1. Polls data/kb every KB_WATCH_INTERVAL_SECONDS (file name, size and mtime of each
+   *.md file; no extra dependency, works on network and container mounts).
+2. Debounces: a batch of changes is applied only once the directory has stayed unchanged
+   for KB_WATCH_DEBOUNCE_SECONDS, so an editor's several writes trigger one re-index.
+3. Re-indexes only the added/modified files and drops deleted ones
+   (`retriever_openai.update_index_files`): a new index version reuses the other files'
+   chunks and is published atomically; unchanged text reuses the embedding cache.
+4. The same call regenerates the affected entries of doc_embeddings.json (from the
+   file's chunk vectors) and swaps the recommender's in-memory map.
+5. Runs on its own thread, started by the API when KB_WATCH_ENABLED is set; queries keep
+   using the current index while a batch is prepared. A failed batch is retried on the
+   next scan.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from backend.app.config import KB_WATCH_DEBOUNCE_SECONDS, KB_WATCH_INTERVAL_SECONDS
+from backend.app.services import retriever_openai
+from backend.app.services.telemetry import count_event, timed
+
+logger = logging.getLogger("kb_watcher")
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def snapshot(kb_dir: str) -> Snapshot:
+    """{file name: (mtime_ns, size)} of the Markdown files in `kb_dir`."""
+    files: Snapshot = {}
+    try:
+        entries = list(os.scandir(kb_dir))
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        if entry.name.endswith(".md") and entry.is_file():
+            stat = entry.stat()
+            files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class KBWatcher:
+    def __init__(
+        self,
+        kb_dir: Optional[str] = None,
+        interval: float = KB_WATCH_INTERVAL_SECONDS,
+        debounce: float = KB_WATCH_DEBOUNCE_SECONDS,
+    ):
+        self.kb_dir = kb_dir or retriever_openai.KB_DIR
+        self.interval = interval
+        self.debounce = debounce
+        # State of the KB the live index reflects
+        self.indexed: Snapshot = snapshot(self.kb_dir)
+        self._seen: Optional[Snapshot] = None
+        self._seen_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self, now: Optional[float] = None) -> bool:
+        """Scan once; re-index when changes have settled. True if a batch was applied."""
+        now = time.monotonic() if now is None else now
+        current = snapshot(self.kb_dir)
+        if current == self.indexed:
+            self._seen = None
+            return False
+        if current != self._seen:
+            self._seen, self._seen_at = current, now
+            return False
+        if now - self._seen_at < self.debounce:
+            return False
+
+        changed = sorted(name for name, stat in current.items() if self.indexed.get(name) != stat)
+        removed = sorted(name for name in self.indexed if name not in current)
+        self.reindex(changed, removed)
+        self.indexed, self._seen = current, None
+        return True
+
+    def reindex(self, changed: List[str], removed: List[str]) -> None:
+        logger.info("KB changed: re-indexing %s, removing %s", changed, removed)
+        with timed("kb_reindex"):
+            retriever_openai.update_index_files(changed, removed)
+        count_event("kb_reindexed_files", len(changed) + len(removed))
+
+    def run(self) -> None:
+        if not retriever_openai.index_exists():
+            logger.info("No Chroma index yet; building it in the background")
+            retriever_openai.ensure_index()
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("KB re-index failed; retrying on the next scan")
+
+    def start(self) -> "KBWatcher":
+        self._thread = threading.Thread(target=self.run, name="kb-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s every %.1fs", self.kb_dir, self.interval)
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
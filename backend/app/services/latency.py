@@ -0,0 +1,104 @@
+"""
+Latency histogram module for in-process timing statistics.
+
+1. Fixed, Prometheus-style cumulative buckets (seconds) with count and sum.
+2. Percentile estimates by linear interpolation inside the matching bucket.
+3. Thread-safe recording, usable from request threads and the event loop alike.
+4. Constant memory per histogram, regardless of the number of observations.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Core parameters
+# ─────────────────────────────────────────────────────────────────────────────
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    1.5,
+    2.0,
+    3.0,
+    5.0,
+    7.5,
+    10.0,
+    20.0,
+    30.0,
+    60.0,
+)
+
+
+class LatencyHistogram:
+    """Bucketed latency distribution (upper bounds in seconds, +Inf implicit)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Add one observation."""
+        idx = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += seconds
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile (0 < q <= 1), or None without observations.
+        Values in the +Inf bucket are reported as the largest finite bound.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for idx, bucket_count in enumerate(counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if idx == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[idx - 1] if idx > 0 else 0.0
+                upper = self.buckets[idx]
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, object]:
+        """Cumulative bucket counts plus sum/count, for exporters."""
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total = self._count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return {
+            "buckets": list(self.buckets),
+            "cumulative_counts": cumulative,
+            "sum": total_sum,
+            "count": total,
+        }
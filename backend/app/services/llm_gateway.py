@@ -0,0 +1,158 @@
+"""
+LLM gateway module bounding concurrent Gemini calls.
+
+1. Concurrency semaphore limits how many provider calls are in flight at once.
+2. Bounded wait queue: when it is full, new requests are shed immediately (HTTP 503).
+3. Per-request deadline covering both the queue wait and the provider call.
+4. Degraded mode: on timeout or provider failure, answer with the top retrieved snippet.
+5. Works with both blocking LLM functions (run in a dedicated thread pool) and coroutines.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from backend.app.config import (
+    LLM_DEGRADED_MODE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_QUEUE,
+    LLM_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger("llm_gateway")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Errors
+# ─────────────────────────────────────────────────────────────────────────────
+class LLMOverloadedError(Exception):
+    """Raised when the wait queue is full and the request is shed."""
+
+
+class LLMUnavailableError(Exception):
+    """Raised on timeout/provider failure when degraded mode is disabled."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Gateway
+# ─────────────────────────────────────────────────────────────────────────────
+class LLMGateway:
+    """
+    Admission control in front of the LLM service.
+    - max_concurrency: provider calls allowed in flight at once.
+    - max_queue: requests allowed to wait for a free slot.
+    - timeout_seconds: deadline for queue wait + provider call.
+    - degraded_mode: fall back to the top snippet instead of failing.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+        degraded_mode: bool = LLM_DEGRADED_MODE,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.degraded_mode = degraded_mode
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="llm"
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self.shed_count = 0
+        self.degraded_count = 0
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        # asyncio primitives belong to one event loop; rebind if the loop changed
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._waiting = 0
+        return loop
+
+    def _degraded(self, snippet_texts: List[str], reason: str, start: float) -> Dict:
+        if not self.degraded_mode or not snippet_texts:
+            raise LLMUnavailableError(reason)
+        self.degraded_count += 1
+        logger.warning("LLM degraded mode (%s): returning top snippet", reason)
+        return {
+            "answer": snippet_texts[0].strip(),
+            "gemini_time_seconds": time.time() - start,
+            "prompt": "",
+            "degraded": True,
+        }
+
+    async def generate(
+        self,
+        snippet_texts: List[str],
+        query: str,
+        llm_fn: Callable[[List[str], str], Dict],
+    ) -> Dict:
+        """
+        Run llm_fn(snippet_texts, query) under the gateway limits.
+        Raises LLMOverloadedError when the queue is full.
+        """
+        loop = self._bind_loop()
+        semaphore = self._semaphore
+        start = time.time()
+        deadline = loop.time() + self.timeout_seconds
+
+        if not semaphore.locked():
+            # 1) Free slot: acquire without suspending
+            await semaphore.acquire()
+        else:
+            # 2) Shed load fast when every slot is busy and the queue is full
+            if self._waiting >= self.max_queue:
+                self.shed_count += 1
+                logger.warning(
+                    "LLM queue full (%d waiting); shedding request", self._waiting
+                )
+                raise LLMOverloadedError("LLM queue is full")
+
+            # 3) Otherwise wait for a slot, within the request deadline
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                return self._degraded(snippet_texts, "queue wait timeout", start)
+            finally:
+                self._waiting -= 1
+
+        # 4) Call the provider; the slot is released only once the call really ends,
+        #    so abandoned calls still count against the concurrency limit
+        def _on_done(fut: asyncio.Future) -> None:
+            semaphore.release()
+            if not fut.cancelled():
+                fut.exception()  # mark as retrieved
+
+        try:
+            if asyncio.iscoroutinefunction(llm_fn):
+                task = asyncio.ensure_future(llm_fn(snippet_texts, query))
+            else:
+                # copy the context so request-scoped telemetry labels follow the call
+                ctx = contextvars.copy_context()
+                task = loop.run_in_executor(
+                    self._executor, ctx.run, llm_fn, snippet_texts, query
+                )
+        except Exception as e:
+            semaphore.release()
+            logger.error("LLM call could not be scheduled: %s", e)
+            return self._degraded(snippet_texts, str(e), start)
+        task.add_done_callback(_on_done)
+
+        remaining = max(0.0, deadline - loop.time())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), remaining)
+        except asyncio.TimeoutError:
+            task.cancel()  # effective for coroutines; threads finish on their own
+            return self._degraded(snippet_texts, "LLM call timeout", start)
+        except Exception as e:
+            logger.error("LLM call failed: %s", e)
+            return self._degraded(snippet_texts, str(e), start)
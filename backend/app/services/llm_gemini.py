@@ -3,27 +3,48 @@ LLM Gemini module using Google Generative AI (Gemini) for RAG.
 
 1. Few-shot prompting with system instructions and examples to guide the model.
 2. Clean formatting of snippets and query into a single prompt.
-3. Structured logging at DEBUG and INFO levels for prompt, response, and timing.
+3. Structured logging at DEBUG and INFO levels for prompt, response, and timing
+   (full prompts go to the sampled "llm_gemini.prompt" logger).
 4. Error handling around the API call with clear logs on failure.
 5. Returns both the plain-text answer and metadata (elapsed time, full prompt).
+6. Optional request hedging: a backup call (same or alternate model) is fired when
+   the first one exceeds a latency percentile, and the loser is cancelled.
+7. Optional content-addressed answer cache (prompt hash + model), so repeated
+   evaluations only call Gemini for prompts that changed (files, or a store shared
+   by all workers with CACHE_BACKEND=redis).
 """
 
 import os
+import json
 import time
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict
+from collections import defaultdict
+from typing import List, Dict, Optional, Tuple
 
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types as GeminiTypes
 
+from backend.app.config import (
+    DATA_DIR,
+    GEMINI_BASE_URL,
+    LLM_ANSWER_CACHE,
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_MODEL,
+    LLM_HEDGE_PERCENTILE,
+)
+from backend.app.services import cache
+from backend.app.services.latency import LatencyHistogram
+from backend.app.services.telemetry import count_event, record_stage, timed
+
 # ─────────────────────────────────────────────────────────────────────────────
-# Configure logging
+# Loggers (configured centrally in backend/app/logging_config.py)
 # ─────────────────────────────────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.DEBUG, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-)
 logger = logging.getLogger("llm_gemini")
+prompt_logger = logging.getLogger("llm_gemini.prompt")  # high volume, sampled
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Load Gemini API key
@@ -33,7 +54,12 @@ GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
 if GEMINI_API_KEY is None:
     logger.error("Environment variable GOOGLE_API_KEY not found")
     raise RuntimeError("Environment variable GOOGLE_API_KEY not found")
-client_gemini = genai.Client(api_key=GEMINI_API_KEY)
+client_gemini = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options=(
+        GeminiTypes.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+    ),
+)
 logger.info("Gemini client initialized")
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -74,24 +100,76 @@ FEW_SHOT_EXAMPLES = [
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Generate answer with references
+# Per-model latency histograms (drive the hedge delay)
 # ─────────────────────────────────────────────────────────────────────────────
-def generate_answer_with_references_gemini(
-    snippet_texts: List[str],
-    query: str,
-    model: str = "gemini-2.0-flash",
-) -> Dict[str, object]:
+DEFAULT_MODEL = "gemini-2.0-flash"
+MODEL_LATENCY: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+
+
+def hedge_delay_seconds(model: str) -> float:
+    """
+    Delay before firing a backup request: the configured latency percentile of
+    the model, or a default until enough observations have been recorded.
     """
-    1) Build a prompt including:
+    histogram = MODEL_LATENCY[model]
+    if histogram.count < LLM_HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+    return histogram.percentile(LLM_HEDGE_PERCENTILE)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Answer cache (content-addressed: one entry per prompt hash and model)
+# ─────────────────────────────────────────────────────────────────────────────
+ANSWER_CACHE_ENABLED = LLM_ANSWER_CACHE
+ANSWER_CACHE_DIR = os.path.join(DATA_DIR, "answer_cache")
+
+
+def _answer_cache_key(full_prompt: str, model: str) -> str:
+    digest = hashlib.sha256(full_prompt.encode("utf-8")).hexdigest()
+    return f"{model.replace('/', '_')}/{digest}.json"
+
+
+def _load_cached_answer(full_prompt: str, model: str) -> Optional[str]:
+    value = cache.get_cache("answer", ANSWER_CACHE_DIR).get(_answer_cache_key(full_prompt, model))
+    if value is None:
+        return None
+    return json.loads(value)["answer"]
+
+
+def _save_cached_answer(full_prompt: str, model: str, answer: str) -> None:
+    value = json.dumps({"model": model, "answer": answer}).encode("utf-8")
+    cache.get_cache("answer", ANSWER_CACHE_DIR).set(_answer_cache_key(full_prompt, model), value)
+
+
+def _cached_result(full_prompt: str, model: str) -> Optional[Dict[str, object]]:
+    """Result dict for a cached answer, or None (also when the cache is disabled)."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    answer = _load_cached_answer(full_prompt, model)
+    if answer is None:
+        count_event("answer_cache_miss")
+        return None
+    count_event("answer_cache_hit")
+    logger.info("Answer cache hit (model=%s)", model)
+    return {
+        "answer": answer,
+        "gemini_time_seconds": 0.0,
+        "prompt": full_prompt,
+        "model": model,
+        "cached": True,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prompt construction
+# ─────────────────────────────────────────────────────────────────────────────
+def build_prompt(snippet_texts: List[str], query: str) -> str:
+    """
+    Build a prompt including:
        - SYSTEM_INSTRUCTION
        - Few-shot examples
        - Provided snippet_texts
        - The user's question
-    2) Call Gemini to get a plain-text response.
-    3) Return a dict with:
-       - 'answer': the plain-text response
-       - 'gemini_time_seconds': elapsed API call time
-       - 'prompt': the full prompt (for debugging/logs)
     """
 
     # 1) Build snippet section
@@ -110,7 +188,7 @@ def generate_answer_with_references_gemini(
         few_shot += f"Answer: {ex['answer']}\n\n"
 
     # 3) Construct full prompt
-    full_prompt = (
+    return (
         f"{SYSTEM_INSTRUCTION}\n\n"
         f"{few_shot}"
         f"Your snippets:\n{prompt_fragments}\n"
@@ -118,11 +196,33 @@ def generate_answer_with_references_gemini(
         "Answer:"
     )
 
-    logger.debug("=== Prompt to Gemini ===")
-    logger.debug(full_prompt)
-    logger.debug("=== End prompt ===")
 
-    # 4) Call Gemini
+# ─────────────────────────────────────────────────────────────────────────────
+# Generate answer with references
+# ─────────────────────────────────────────────────────────────────────────────
+def generate_answer_with_references_gemini(
+    snippet_texts: List[str],
+    query: str,
+    model: str = DEFAULT_MODEL,
+) -> Dict[str, object]:
+    """
+    1) Build the prompt (see build_prompt).
+    2) Call Gemini to get a plain-text response.
+    3) Return a dict with:
+       - 'answer': the plain-text response
+       - 'gemini_time_seconds': elapsed API call time
+       - 'prompt': the full prompt (for debugging/logs)
+    """
+    with timed("prompt_build"):
+        full_prompt = build_prompt(snippet_texts, query)
+
+    prompt_logger.debug("Prompt to Gemini (model=%s):\n%s", model, full_prompt)
+
+    cached = _cached_result(full_prompt, model)
+    if cached is not None:
+        return cached
+
+    # Call Gemini
     start = time.time()
     try:
         response = client_gemini.models.generate_content(
@@ -131,17 +231,107 @@ def generate_answer_with_references_gemini(
             contents=full_prompt,
         )
     except Exception as e:
-        logger.error(f"Gemini call error: {e}")
+        logger.error("Gemini call error: %s", e)
         raise
     elapsed = time.time() - start
+    MODEL_LATENCY[model].record(elapsed)
+    record_stage("llm_call", elapsed)
 
-    # 5) Extract plain-text answer
+    # Extract plain-text answer
     answer = response.text.strip()
-    logger.debug(f"Raw Gemini answer: {answer!r}")
-    logger.info(f"Generated answer length={len(answer)} time={elapsed:.2f}s")
+    prompt_logger.debug("Raw Gemini answer: %r", answer)
+    logger.info("Generated answer length=%d time=%.2fs", len(answer), elapsed)
+    if ANSWER_CACHE_ENABLED:
+        _save_cached_answer(full_prompt, model, answer)
 
     return {
         "answer": answer,
         "gemini_time_seconds": elapsed,
         "prompt": full_prompt,
     }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Hedged generation (async)
+# ─────────────────────────────────────────────────────────────────────────────
+async def _call_gemini_async(full_prompt: str, model: str) -> Tuple[str, float]:
+    start = time.time()
+    response = await client_gemini.aio.models.generate_content(
+        model=model,
+        config=GeminiTypes.GenerateContentConfig(system_instruction=""),
+        contents=full_prompt,
+    )
+    elapsed = time.time() - start
+    MODEL_LATENCY[model].record(elapsed)
+    return response.text.strip(), elapsed
+
+
+async def generate_answer_hedged_gemini(
+    snippet_texts: List[str],
+    query: str,
+    model: str = DEFAULT_MODEL,
+    hedge_model: Optional[str] = LLM_HEDGE_MODEL,
+) -> Dict[str, object]:
+    """
+    Same contract as generate_answer_with_references_gemini, plus 'model'.
+    1) Send the request to `model`.
+    2) If it has not returned within hedge_delay_seconds(model), send a backup
+       request to `hedge_model` (or the same model).
+    3) Return the first successful answer and cancel the other request.
+    """
+    with timed("prompt_build"):
+        full_prompt = build_prompt(snippet_texts, query)
+    cached = _cached_result(full_prompt, model)
+    if cached is not None:
+        return cached
+    hedge_model = hedge_model or model
+    start = time.time()
+
+    tasks = {asyncio.ensure_future(_call_gemini_async(full_prompt, model)): model}
+    try:
+        delay = hedge_delay_seconds(model)
+        done, _ = await asyncio.wait(set(tasks), timeout=delay)
+        if not done:
+            logger.info(
+                "Hedging: %s slower than %.2fs, sending backup to %s",
+                model,
+                delay,
+                hedge_model,
+            )
+            backup = asyncio.ensure_future(_call_gemini_async(full_prompt, hedge_model))
+            tasks[backup] = hedge_model
+
+        # Take the first successful response; fail only if every call failed
+        pending = set(tasks)
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    answer, _ = task.result()
+                    elapsed = time.time() - start
+                    record_stage("llm_call", elapsed)
+                    logger.info(
+                        "Generated answer length=%d time=%.2fs model=%s hedged=%s",
+                        len(answer),
+                        elapsed,
+                        tasks[task],
+                        len(tasks) > 1,
+                    )
+                    if ANSWER_CACHE_ENABLED:  # keyed by the model that answered
+                        _save_cached_answer(full_prompt, tasks[task], answer)
+                    return {
+                        "answer": answer,
+                        "gemini_time_seconds": elapsed,
+                        "prompt": full_prompt,
+                        "model": tasks[task],
+                    }
+                last_error = task.exception()
+                logger.error("Gemini call error (%s): %s", tasks[task], last_error)
+        raise last_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,64 @@
+"""
+Compact embedding storage: shortened and quantized vectors.
+
+1. `shorten(vector, dims)` keeps the first `dims` values and re-normalizes them;
+   text-embedding-3 models are trained so that this matches requesting `dimensions=dims`.
+2. `quantize` / `dequantize` store vectors as float32, float16, or int8 with one scale per
+   vector (max |value| / 127), the int8 error being at most half a step of that scale.
+3. `encode` / `decode` pack a vector into a small self-describing binary blob
+   (magic, dtype code, dimensions, scale, values) used by the embedding cache.
+"""
+
+import struct
+from typing import Sequence, Tuple
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+_NUMPY_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+_CODES = {"float32": 0, "float16": 1, "int8": 2}
+_NAMES = {code: name for name, code in _CODES.items()}
+
+MAGIC = b"SQV1"
+# magic, dtype code, dimensions, scale
+_HEADER = struct.Struct("<4sBIf")
+
+
+def shorten(vector: Sequence[float], dimensions: int) -> np.ndarray:
+    """First `dimensions` values of `vector`, L2-normalized (float32)."""
+    values = np.asarray(vector, dtype=np.float32)
+    if not dimensions or dimensions >= values.shape[-1]:
+        return values
+    values = values[..., :dimensions]
+    norms = np.linalg.norm(values, axis=-1, keepdims=True)
+    return values / np.where(norms == 0, 1.0, norms)
+
+
+def quantize(vector: Sequence[float], dtype: str) -> Tuple[np.ndarray, float]:
+    """(values stored as `dtype`, scale to multiply them by)."""
+    values = np.asarray(vector, dtype=np.float32)
+    if dtype == "int8":
+        peak = float(np.abs(values).max()) if values.size else 0.0
+        scale = peak / 127.0 if peak else 1.0
+        return np.clip(np.rint(values / scale), -127, 127).astype(np.int8), scale
+    if dtype not in _NUMPY_DTYPES:
+        raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {DTYPES}")
+    return values.astype(_NUMPY_DTYPES[dtype]), 1.0
+
+
+def dequantize(values: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    restored = values.astype(np.float32)
+    return restored * np.float32(scale) if scale != 1.0 else restored
+
+
+def encode(vector: Sequence[float], dtype: str) -> bytes:
+    values, scale = quantize(vector, dtype)
+    return _HEADER.pack(MAGIC, _CODES[dtype], values.shape[0], scale) + values.tobytes()
+
+
+def decode(blob: bytes) -> np.ndarray:
+    magic, code, dims, scale = _HEADER.unpack_from(blob)
+    if magic != MAGIC or code not in _NAMES:
+        raise ValueError("Not an encoded vector")
+    values = np.frombuffer(blob, dtype=_NUMPY_DTYPES[_NAMES[code]], count=dims, offset=_HEADER.size)
+    return dequantize(values, scale)
@@ -0,0 +1,51 @@
+"""
+Context retrieval shared by everything that answers a RAG query: POST /rag/query, the
+warm-up's answer precomputation and the in-process evaluation. Using one function keeps
+their prompts identical, so precomputed answers are the ones the route looks up.
+
+1. Retrieves RERANK_CANDIDATES fragments with RERANK_ENABLED, 3 otherwise.
+2. Returns no fragments when the query is out of scope: nothing retrieved, or every
+   fragment beyond the distance threshold (backend/app/services/scope.py).
+3. With RERANK_ENABLED, keeps the RERANK_TOP_N best candidates by cross-encoder score
+   (backend/app/services/reranker.py).
+4. `snippet_texts` and `references` give the LLM snippets and the deduplicated sources.
+Blocking (network, vector search, model inference): async callers run it in a thread.
+"""
+
+import logging
+from typing import List
+
+from backend.app.config import RERANK_CANDIDATES, RERANK_ENABLED
+from backend.app.services import reranker, retriever_openai, scope
+from backend.app.services.reranker import Fragment
+
+logger = logging.getLogger("rag_pipeline")
+
+
+def retrieve_context(query: str) -> List[Fragment]:
+    """Fragments to answer `query` from, best first; empty when it is out of scope."""
+    fragments = retriever_openai.retrieve_fragments_openai(
+        query, RERANK_CANDIDATES if RERANK_ENABLED else 3
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Fragments received: %s", [(round(d, 3), src) for _, d, src in fragments])
+    if not fragments:
+        logger.info("Out-of-scope: no relevant fragments returned")
+        return []
+
+    distances = [dist for (_, dist, _) in fragments]
+    if scope.is_out_of_scope(distances):
+        logger.info("Out-of-scope (min_distance=%.3f)", min(distances))
+        return []
+
+    if RERANK_ENABLED:
+        fragments = reranker.rerank(query, fragments)
+    return fragments
+
+
+def snippet_texts(fragments: List[Fragment]) -> List[str]:
+    return [text for (text, _, _) in fragments]
+
+
+def references(fragments: List[Fragment]) -> List[str]:
+    return list(dict.fromkeys(src for (_, _, src) in fragments))
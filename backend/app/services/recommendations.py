@@ -3,32 +3,163 @@ Personalized Recommendations module combining user history and query embeddings.
 
 1. Builds a user profile embedding from past “seen” documents to capture preferences.
 2. Blends profile similarity and query relevance via a tunable α parameter.
-3. Vectorized loading of precomputed document embeddings for fast similarity lookups.
+3. Vectorized loading of the document embeddings (float32, one contiguous read-only
+   matrix) for fast similarity lookups; they are derived from the chunk vectors when
+   the index is built (retriever_openai).
 4. Clear separation of steps with helper functions (cosine similarity, embedding fetch).
 5. Detailed docstrings and typed signatures for maintainability and IDE support.
+6. `update_doc_embeddings` rewrites changed entries of the JSON file atomically and swaps
+   the in-memory map, so a KB reload never exposes a half-updated set. Other processes
+   (workers without the KB watcher) reload the map when the file changes on disk.
+7. Optional result cache (RECS_CACHE_ENABLED) keyed by the query, the seen documents,
+   k, alpha and a digest of the document vectors, so a KB change never serves stale
+   recommendations; stored through backend/app/services/cache.py with a TTL.
 """
 
+import hashlib
 import json
 import os
+import threading
 import numpy as np
-from typing import List, Dict
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from backend.app.config import (
+    DATA_DIR,
+    EMBED_DIMENSIONS,
+    RECS_CACHE_ENABLED,
+    RECS_CACHE_TTL_SECONDS,
+)
+from backend.app.services import cache
+from backend.app.services.quantization import shorten
 from backend.app.services.retriever_openai import get_openai_embedding
+from backend.app.services.telemetry import count_event
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 1) PATH TO JSON WITH EMBEDDINGS
 # ─────────────────────────────────────────────────────────────────────────────
-BASE_DIR = os.path.dirname(__file__)
-DOC_EMBED_FILE = os.path.abspath(
-    os.path.join(BASE_DIR, "../../../data/doc_embeddings.json")
-)
+DOC_EMBED_FILE = os.path.join(DATA_DIR, "doc_embeddings.json")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 2) LOAD EMBEDDINGS INTO MEMORY
 # ─────────────────────────────────────────────────────────────────────────────
-with open(DOC_EMBED_FILE, "r", encoding="utf-8") as f:
-    raw = json.load(f)
-    DOC_EMBEDDINGS = {doc: np.array(vec, dtype=float) for doc, vec in raw.items()}
+def _read_doc_embeddings() -> Dict[str, List[float]]:
+    # Written by create_chroma_index; missing until the index is first built
+    if not os.path.exists(DOC_EMBED_FILE):
+        return {}
+    with open(DOC_EMBED_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _packed(vectors: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Same map with every vector a read-only row of one contiguous float32 matrix: one
+    buffer instead of one allocation per document, so workers forked after loading
+    (see backend/app/serve.py) share its pages instead of copying them.
+    """
+    if not vectors:
+        return {}
+    docs = list(vectors)
+    matrix = np.stack([np.asarray(vectors[doc], dtype=np.float32) for doc in docs])
+    matrix.setflags(write=False)
+    return {doc: matrix[i] for i, doc in enumerate(docs)}
+
+
+def _file_stamp() -> Optional[Tuple[int, int, int]]:
+    """(inode, mtime_ns, size) of DOC_EMBED_FILE; None while it does not exist."""
+    try:
+        stat = os.stat(DOC_EMBED_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _load_doc_embeddings() -> Dict[str, np.ndarray]:
+    # float32, shortened like query embeddings when EMBED_DIMENSIONS is set
+    return _packed(
+        {doc: shorten(vec, EMBED_DIMENSIONS) for doc, vec in _read_doc_embeddings().items()}
+    )
+
+
+# Stamp taken before reading, so a rewrite during the read is picked up next time
+_loaded_stamp = _file_stamp()
+DOC_EMBEDDINGS = _load_doc_embeddings()
+
+_update_lock = threading.Lock()
+
+
+def reload_if_changed() -> None:
+    """
+    Reload DOC_EMBEDDINGS when DOC_EMBED_FILE changed on disk since it was loaded
+    (e.g. rewritten by the KB watcher of another worker); one stat per call.
+    """
+    global DOC_EMBEDDINGS, _loaded_stamp
+    if _file_stamp() == _loaded_stamp:
+        return
+    with _update_lock:
+        stamp = _file_stamp()
+        if stamp != _loaded_stamp:
+            DOC_EMBEDDINGS = _load_doc_embeddings()
+            _loaded_stamp = stamp
+
+
+def update_doc_embeddings(
+    updated: Dict[str, List[float]], removed: Iterable[str] = (), replace: bool = False
+) -> None:
+    """
+    Replace (or add) the vectors in `updated` and drop the `removed` documents
+    (or, with `replace`, keep only `updated`), both in DOC_EMBED_FILE (write then
+    rename) and in memory (one reference swap).
+    """
+    global DOC_EMBEDDINGS, _loaded_stamp
+    with _update_lock:
+        stored = {} if replace else _read_doc_embeddings()
+        stored.update({doc: [float(x) for x in vec] for doc, vec in updated.items()})
+        for doc in removed:
+            stored.pop(doc, None)
+        tmp_path = f"{DOC_EMBED_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        os.replace(tmp_path, DOC_EMBED_FILE)
+        _loaded_stamp = _file_stamp()
+
+        embeddings = {} if replace else dict(DOC_EMBEDDINGS)
+        embeddings.update({doc: shorten(vec, EMBED_DIMENSIONS) for doc, vec in updated.items()})
+        for doc in removed:
+            embeddings.pop(doc, None)
+        DOC_EMBEDDINGS = _packed(embeddings)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 3) RESULT CACHE
+# ─────────────────────────────────────────────────────────────────────────────
+RECS_CACHE_DIR = os.path.join(DATA_DIR, "recs_cache")
+CACHE_ENABLED = RECS_CACHE_ENABLED
+# (embeddings map, digest) of the last map digested; recomputed only after a swap
+_version: tuple = (None, "")
+
+
+def _embeddings_version() -> str:
+    """Digest of the current document vectors (names and values)."""
+    global _version
+    embeddings = DOC_EMBEDDINGS
+    if _version[0] is not embeddings:
+        digest = hashlib.sha1()
+        for doc in sorted(embeddings):
+            digest.update(doc.encode("utf-8"))
+            digest.update(np.asarray(embeddings[doc], dtype=np.float32).tobytes())
+        _version = (embeddings, digest.hexdigest())
+    return _version[1]
+
+
+def _recs_cache_key(seen_docs: Iterable[str], current_query: str, k: int, alpha: float) -> str:
+    payload = json.dumps(
+        [current_query, sorted(seen_docs), k, alpha, _embeddings_version()], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest() + ".json"
+
+
+def _recs_cache() -> cache.Cache:
+    return cache.get_cache("recs", RECS_CACHE_DIR, ttl=RECS_CACHE_TTL_SECONDS)
 
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
@@ -48,9 +179,19 @@ def recommend_resources(
       2) The relevance to the current query.
     Returns a list of dicts with 'doc' and 'reason'.
     """
-    # 1) Extract seen documents
+    # 1) Extract seen documents (with the latest document vectors)
+    reload_if_changed()
     seen_docs = {src for entry in chat_history for src in entry.get("refs", [])}
 
+    cache_key: Optional[str] = None
+    if CACHE_ENABLED:
+        cache_key = _recs_cache_key(seen_docs, current_query, k, alpha)
+        cached = _recs_cache().get(cache_key)
+        if cached is not None:
+            count_event("recs_cache_hit")
+            return json.loads(cached)
+        count_event("recs_cache_miss")
+
     # 2) Build historical profile embedding (if user has history)
     user_emb = None
     if seen_docs:
@@ -87,4 +228,6 @@ def recommend_resources(
         reason = f"This document '{doc}' scores {score:.2f} by combining your historical interests and the current query."
         recs.append({"doc": doc, "reason": reason})
 
+    if cache_key is not None:
+        _recs_cache().set(cache_key, json.dumps(recs).encode("utf-8"))
     return recs
@@ -0,0 +1,161 @@
+"""
+Optional cross-encoder reranking of retrieved passages (RERANK_ENABLED).
+
+1. The RAG pipeline retrieves RERANK_CANDIDATES chunks (cheap vector search); a small
+   CPU cross-encoder scores every (query, passage) pair and only the RERANK_TOP_N best
+   passages go into the Gemini prompt.
+2. Pairs are scored in batches of RERANK_BATCH_SIZE on a thread pool of RERANK_WORKERS
+   threads, so one slow batch does not serialize the rest.
+3. Scores are cached in memory (LRU of RERANK_CACHE_SIZE) by query hash and passage hash;
+   the passage hash stands in for the chunk id because merged passages span several
+   chunks. Repeated questions are reranked without a model call.
+4. sentence-transformers is optional: without it (or if the model fails to load) the
+   distance order is kept and the miss is logged once.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from backend.app.config import (
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_SIZE,
+    RERANK_MODEL,
+    RERANK_TOP_N,
+    RERANK_WORKERS,
+)
+from backend.app.services.telemetry import count_event, timed
+
+logger = logging.getLogger("reranker")
+
+Fragment = Tuple[str, float, str]
+# Scores a batch of (query, passage) pairs; higher is more relevant
+ScoreFn = Callable[[List[Tuple[str, str]]], Sequence[float]]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def load_cross_encoder(model_name: str = RERANK_MODEL) -> Optional[ScoreFn]:
+    """Score function of a sentence-transformers CrossEncoder on CPU (None if unavailable)."""
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError:
+        logger.warning("sentence-transformers not installed; reranking disabled")
+        return None
+    try:
+        model = CrossEncoder(model_name, device="cpu")
+    except Exception:
+        logger.exception("Could not load cross-encoder %s; reranking disabled", model_name)
+        return None
+    logger.info("Cross-encoder %s loaded", model_name)
+    return lambda pairs: model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+
+
+class Reranker:
+    def __init__(
+        self,
+        score_fn: Optional[ScoreFn] = None,
+        model_name: str = RERANK_MODEL,
+        batch_size: int = RERANK_BATCH_SIZE,
+        workers: int = RERANK_WORKERS,
+        cache_size: int = RERANK_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.cache_size = cache_size
+        self._score_fn = score_fn
+        # The model is loaded on first use, once; None after a failed load
+        self._loaded = score_fn is not None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="rerank")
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _scorer(self) -> Optional[ScoreFn]:
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self._score_fn = load_cross_encoder(self.model_name)
+                    self._loaded = True
+        return self._score_fn
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, items: List[Tuple[Tuple[str, str], float]]) -> None:
+        with self._cache_lock:
+            for key, score in items:
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    def scores(self, query: str, passages: Sequence[str]) -> Optional[List[float]]:
+        """Relevance score of each passage for `query` (None when no model is available)."""
+        query_key = _digest(query)
+        keys = [(query_key, _digest(p)) for p in passages]
+        scores: List[Optional[float]] = [self._cached(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        count_event("rerank_cache_hit", len(passages) - len(missing))
+        if not missing:
+            return scores
+        count_event("rerank_cache_miss", len(missing))
+
+        score_fn = self._scorer()
+        if score_fn is None:
+            return None
+        batches = [
+            missing[start : start + self.batch_size]
+            for start in range(0, len(missing), self.batch_size)
+        ]
+        with timed("rerank_model"):
+            results = self._executor.map(
+                lambda batch: score_fn([(query, passages[i]) for i in batch]), batches
+            )
+            for batch, batch_scores in zip(batches, results):
+                for i, score in zip(batch, batch_scores):
+                    scores[i] = float(score)
+        self._store([(keys[i], scores[i]) for i in missing])
+        return scores
+
+    def rerank(self, query: str, fragments: List[Fragment], top_n: int = RERANK_TOP_N) -> List[Fragment]:
+        """The `top_n` fragments by cross-encoder score (distance order if unavailable)."""
+        if len(fragments) <= 1:
+            return fragments[:top_n]
+        with timed("rerank"):
+            scores = self.scores(query, [text for (text, _, _) in fragments])
+        if scores is None:
+            return fragments[:top_n]
+        order = sorted(range(len(fragments)), key=lambda i: -scores[i])
+        logger.debug("Rerank order %s (scores %s)", order, [round(scores[i], 3) for i in order])
+        return [fragments[i] for i in order[:top_n]]
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    """Process-wide reranker (model and score cache shared by every request)."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = Reranker()
+        return _reranker
+
+
+def rerank(query: str, fragments: List[Fragment], top_n: int = RERANK_TOP_N) -> List[Fragment]:
+    return get_reranker().rerank(query, fragments, top_n)
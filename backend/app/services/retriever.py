@@ -32,11 +32,8 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 
 # ───────────────────
-# Configure logging
+# Logger (configured centrally in backend/app/logging_config.py)
 # ───────────────────
-logging.basicConfig(
-    level=logging.DEBUG, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-)
 logger = logging.getLogger("retriever_local")
 
 # ───────────────────
@@ -1,11 +1,26 @@
 """
 Retriever module using OpenAI embeddings and Chroma vector store.
 
-1. Batch embedding requests with caching to reduce latency.
+1. Batch embedding requests with caching to reduce latency (batch cache lookups; the
+   store is chosen by CACHE_BACKEND, see backend/app/services/cache.py).
 2. Retries with exponential backoff for transient API errors, catching any Exception.
-3. Incremental indexing: only new or modified documents are (re-)indexed.
-4. Structured logging instead of print statements.
+3. Incremental indexing: `update_index_files` replaces the chunks of changed KB files
+   in the live index (driven by backend/app/services/kb_watcher.py).
+4. Structured logging instead of print statements (per-hit cache logs are sampled).
 5. Core parameters defined as constants in code.
+6. Chunk ordering metadata recorded at index time, used to merge overlapping hits.
+7. One Chroma store per index directory, opened once and shared by all queries.
+   Rebuilds go to a new version directory published through a pointer file; each
+   query is pinned to one version and old versions are garbage-collected.
+8. Out-of-scope prefilter (document centroids, with KB vocabulary misses only counted)
+   before the vector search; thresholds live in backend/app/services/scope.py. The
+   scope index is built with each index version and saved next to it.
+9. Compact vectors: shortened embeddings (EMBED_DIMENSIONS), a shorter index
+   (INDEX_DIMENSIONS, searched with oversampling and re-scored on the full-precision
+   chunk vectors stored next to each index version) and float16/int8 cache files
+   (EMBED_CACHE_DTYPE). Chunk texts are never embedded while serving.
+10. Indexing embeds each chunk once and derives the recommender's document vectors
+    (length-weighted mean of the chunk vectors, doc_embeddings.json) from the same pass.
 """
 
 import os
@@ -14,9 +29,13 @@ import shutil
 import json
 import hashlib
 import logging
-from time import time
-from typing import List, Tuple, Optional
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple, Optional
 
+import numpy as np
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -29,13 +48,30 @@ from langchain_community.vectorstores import Chroma
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+# Add project root to sys.path so the script also runs as a plain file
+PROJECT_ROOT = os.path.abspath(
+    os.path.join(__file__, os.pardir, os.pardir, os.pardir, os.pardir)
+)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.app.config import (
+    CACHE_BACKEND,
+    DATA_DIR,
+    EMBED_CACHE_DTYPE,
+    EMBED_DIMENSIONS,
+    INDEX_DIMENSIONS,
+    SCOPE_PREFILTER_ENABLED,
+)
+from backend.app.services import cache, quantization, scope
+from backend.app.services.chunk_merger import merge_overlapping_chunks
+from backend.app.services.telemetry import count_event, timed
+
 # ───────────────────
-# Configure logging
+# Loggers (configured centrally in backend/app/logging_config.py)
 # ───────────────────
-logging.basicConfig(
-    level=logging.DEBUG, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-)
 logger = logging.getLogger("retriever_openai")
+cache_logger = logging.getLogger("retriever_openai.cache")  # high volume, sampled
 
 # ───────────────────
 # Load environment variables and init OpenAI client
@@ -55,41 +91,118 @@ CHUNK_SIZE = 800
 CHUNK_OVERLAP = 100
 EMBED_MODEL = "text-embedding-3-small"
 BATCH_SIZE = 50
-DISTANCE_THRESHOLD = 1.25
-
-# Paths
-BASE_DIR = os.path.dirname(__file__)
-KB_DIR = os.path.abspath(os.path.join(BASE_DIR, "../../../data/kb"))
-CHROMA_DB_DIR = os.path.abspath(os.path.join(BASE_DIR, "../../../data/chroma_db"))
-EMBED_CACHE_DIR = os.path.abspath(os.path.join(BASE_DIR, "../../../data/embed_cache"))
-
-os.makedirs(EMBED_CACHE_DIR, exist_ok=True)
-logger.debug(f"Embed cache directory: {EMBED_CACHE_DIR}")
+MERGE_OVERLAPPING_CHUNKS = True
+# Candidates fetched per requested hit when the index holds shortened vectors
+RESCORE_OVERSAMPLE = 4
+# Index versions kept on disk (current + previous, for readers still pinned to it)
+INDEX_KEEP_VERSIONS = 2
+
+# Paths (CHROMA_DB_DIR holds one directory per index version and the CURRENT pointer)
+KB_DIR = os.path.join(DATA_DIR, "kb")
+CHROMA_DB_DIR = os.path.join(DATA_DIR, "chroma_db")
+INDEX_POINTER = "CURRENT"
+# Full-precision chunk vectors of a shortened index version (row i = chunk id i)
+FULL_VECTORS_FILE = "full_vectors.npy"
+FULL_VECTOR_IDS_FILE = "full_vectors.ids.json"
+# KB vocabulary and document centroids of an index version (out-of-scope prefilter)
+SCOPE_INDEX_FILE = "scope_index.json"
+EMBED_CACHE_DIR = os.path.join(DATA_DIR, "embed_cache")
+
+if EMBED_CACHE_DTYPE not in ("json",) + quantization.DTYPES:
+    raise ValueError(f"Unsupported EMBED_CACHE_DTYPE {EMBED_CACHE_DTYPE!r}")
+if CACHE_BACKEND == "file":
+    os.makedirs(EMBED_CACHE_DIR, exist_ok=True)
+    logger.debug("Embed cache directory: %s", EMBED_CACHE_DIR)
+
+# Opened vector stores, keyed by index (version) directory
+_vector_stores: Dict[str, Chroma] = {}
+_vector_stores_lock = threading.Lock()
+# Queries in flight per index directory; garbage collection skips these
+_pins: Dict[str, int] = defaultdict(int)
+# Full-precision chunk vectors per index directory (None: not stored for that version)
+_full_vectors: Dict[str, Optional["FullVectors"]] = {}
 
 # ───────────────────
 # Caching utilities
 # ───────────────────
 
 
-def _get_cache_path(text: str) -> str:
-    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
-    return os.path.join(EMBED_CACHE_DIR, f"{digest}.json")
-
-
-def _load_from_cache(text: str) -> Optional[List[float]]:
-    path = _get_cache_path(text)
-    if os.path.exists(path):
-        logger.debug(f"Cache hit: {os.path.basename(path)}")
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
-
-
-def _save_to_cache(text: str, vector: List[float]) -> None:
-    path = _get_cache_path(text)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(vector, f)
-    logger.debug(f"Saved embedding to cache: {os.path.basename(path)}")
+def _embed_cache() -> cache.Cache:
+    return cache.get_cache("embed", EMBED_CACHE_DIR)
+
+
+def _cache_key(text: str, model: str = EMBED_MODEL, dtype: Optional[str] = None) -> str:
+    key = text
+    if model != EMBED_MODEL or EMBED_DIMENSIONS:
+        # Default model at full size keeps the historical key (plain text hash)
+        key = f"{model}|{EMBED_DIMENSIONS}|{text}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return f"{digest}.{dtype or EMBED_CACHE_DTYPE}"
+
+
+def _load_many_from_cache(
+    texts: List[str], model: str = EMBED_MODEL, full_precision: bool = False
+) -> List[Optional[List[float]]]:
+    """
+    Cached vectors of `texts` (None for misses), fetched in one batch lookup.
+    `full_precision` skips lossy (float16/int8) entries.
+    """
+    store = _embed_cache()
+    if full_precision and EMBED_CACHE_DTYPE in ("float16", "int8"):
+        keys = [_cache_key(t, model, "json") for t in texts]
+        values = store.get_many(keys)
+    else:
+        keys = [_cache_key(t, model) for t in texts]
+        values = store.get_many(keys)
+    if EMBED_CACHE_DTYPE != "json" and not full_precision:
+        # JSON entries are also read when a binary format is configured (older caches)
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            json_keys = [_cache_key(texts[i], model, "json") for i in missing]
+            for i, key, value in zip(missing, json_keys, store.get_many(json_keys)):
+                keys[i], values[i] = key, value
+    vectors: List[Optional[List[float]]] = []
+    for key, value in zip(keys, values):
+        if value is None:
+            vectors.append(None)
+            continue
+        cache_logger.debug("Cache hit: %s", key)
+        if key.endswith(".json"):
+            vectors.append(json.loads(value))
+        else:
+            vectors.append(quantization.decode(value).tolist())
+    return vectors
+
+
+def _load_from_cache(text: str, model: str = EMBED_MODEL) -> Optional[List[float]]:
+    return _load_many_from_cache([text], model)[0]
+
+
+def _save_many_to_cache(
+    texts: List[str],
+    vectors: List[List[float]],
+    model: str = EMBED_MODEL,
+    full_precision: bool = False,
+) -> None:
+    """
+    Store `vectors` in EMBED_CACHE_DTYPE; `full_precision` also keeps a lossless JSON
+    entry next to a lossy (float16/int8) one, the entry `_load_many_from_cache` reads.
+    """
+    lossless = full_precision and EMBED_CACHE_DTYPE in ("float16", "int8")
+    items = {}
+    for text, vector in zip(texts, vectors):
+        if EMBED_CACHE_DTYPE == "json":
+            items[_cache_key(text, model)] = json.dumps(vector).encode("utf-8")
+        else:
+            items[_cache_key(text, model)] = quantization.encode(vector, EMBED_CACHE_DTYPE)
+        if lossless:
+            items[_cache_key(text, model, "json")] = json.dumps(vector).encode("utf-8")
+    _embed_cache().set_many(items)
+    cache_logger.debug("Saved %d embeddings to cache", len(items))
+
+
+def _save_to_cache(text: str, vector: List[float], model: str = EMBED_MODEL) -> None:
+    _save_many_to_cache([text], [vector], model)
 
 
 # ───────────────────
@@ -101,143 +214,587 @@ def _save_to_cache(text: str, vector: List[float]) -> None:
     retry=retry_if_exception_type(Exception),
     reraise=True,
 )
-def _call_openai_embedding(texts: List[str], model: str) -> List[List[float]]:
-    logger.debug(f"Calling OpenAI embeddings API for batch of size {len(texts)}")
-    response = client.embeddings.create(model=model, input=texts)
+def _call_openai_embedding(
+    texts: List[str], model: str, dimensions: Optional[int] = None
+) -> List[List[float]]:
+    logger.debug("Calling OpenAI embeddings API for batch of size %d", len(texts))
+    if dimensions:
+        response = client.embeddings.create(model=model, input=texts, dimensions=dimensions)
+    else:
+        response = client.embeddings.create(model=model, input=texts)
     embeddings = [d.embedding for d in response.data]
     logger.debug("Received embeddings from OpenAI")
     return embeddings
 
 
+def _dimensions_kwargs() -> Dict[str, int]:
+    return {"dimensions": EMBED_DIMENSIONS} if EMBED_DIMENSIONS else {}
+
+
 def get_openai_embedding(text: str, model: str = EMBED_MODEL) -> List[float]:
-    logger.debug("get_openai_embedding: checking cache")
-    cached = _load_from_cache(text)
+    with timed("cache_lookup"):
+        cached = _load_from_cache(text, model)
     if cached is not None:
+        count_event("embedding_cache_hit")
         return cached
-    logger.debug("Cache miss: calling OpenAI for single embedding")
-    emb = _call_openai_embedding([text], model=model)[0]
-    _save_to_cache(text, emb)
+    count_event("embedding_cache_miss")
+    cache_logger.debug("Cache miss: calling OpenAI for single embedding")
+    with timed("embedding"):
+        emb = _call_openai_embedding([text], model=model, **_dimensions_kwargs())[0]
+    _save_to_cache(text, emb, model)
     return emb
 
 
 def batch_get_openai_embeddings(
-    texts: List[str], model: str = EMBED_MODEL
+    texts: List[str], model: str = EMBED_MODEL, full_precision: bool = False
 ) -> List[List[float]]:
-    logger.info(f"batch_get_openai_embeddings: processing {len(texts)} texts")
-    results = [_load_from_cache(t) for t in texts]
+    """
+    Vectors of `texts`; `full_precision` ignores lossy cache entries (re-embeds those)
+    and caches the new vectors losslessly as well.
+    """
+    logger.info("batch_get_openai_embeddings: processing %d texts", len(texts))
+    with timed("cache_lookup"):
+        results = _load_many_from_cache(texts, model, full_precision)
     uncached = [i for i, v in enumerate(results) if v is None]
-    logger.info(f"Found {len(uncached)} uncached texts")
+    logger.info("Found %d uncached texts", len(uncached))
+    count_event("embedding_cache_hit", len(texts) - len(uncached))
+    count_event("embedding_cache_miss", len(uncached))
     for start in range(0, len(uncached), BATCH_SIZE):
         batch_idxs = uncached[start : start + BATCH_SIZE]
         batch_texts = [texts[i] for i in batch_idxs]
-        batch_embs = _call_openai_embedding(batch_texts, model=model)
+        with timed("embedding"):
+            batch_embs = _call_openai_embedding(batch_texts, model=model, **_dimensions_kwargs())
+        _save_many_to_cache(batch_texts, batch_embs, model, full_precision)
         for idx, emb in zip(batch_idxs, batch_embs):
-            _save_to_cache(texts[idx], emb)
             results[idx] = emb
     return results  # type: ignore
 
 
+def _index_vector(vector: List[float]) -> List[float]:
+    """Vector as stored in the Chroma index (shortened when INDEX_DIMENSIONS is set)."""
+    if not INDEX_DIMENSIONS:
+        return vector
+    return quantization.shorten(vector, INDEX_DIMENSIONS).tolist()
+
+
+def _embed_chunks(texts: List[str]) -> List[List[float]]:
+    """Chunk vectors for indexing; full precision when they are kept for re-scoring."""
+    return batch_get_openai_embeddings(texts, full_precision=bool(INDEX_DIMENSIONS)) if texts else []
+
+
+def _chunk_source(chunk_id: str) -> str:
+    # Chunk ids are "source:version:chunk_index"
+    return chunk_id.rsplit(":", 2)[0]
+
+
+class FullVectors:
+    """Full-precision chunk vectors of one index version, looked up by chunk metadata."""
+
+    def __init__(self, matrix: np.ndarray, ids: List[str]):
+        self.matrix = matrix
+        self.ids = ids
+        # (source, chunk_index) identifies a chunk within one index version
+        self.rows = {
+            (_chunk_source(chunk_id), int(chunk_id.rsplit(":", 1)[1])): row
+            for row, chunk_id in enumerate(ids)
+        }
+
+    def lookup(self, metadatas: List[Dict]) -> Optional[np.ndarray]:
+        """Rows of the given chunks, or None if any of them is missing."""
+        rows = [self.rows.get((meta.get("source"), meta.get("chunk_index"))) for meta in metadatas]
+        if any(row is None for row in rows):
+            return None
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+
+
+def _save_full_vectors(index_dir: str, ids: List[str], matrix: np.ndarray) -> None:
+    np.save(os.path.join(index_dir, FULL_VECTORS_FILE), np.asarray(matrix, dtype=np.float32))
+    with open(os.path.join(index_dir, FULL_VECTOR_IDS_FILE), "w", encoding="utf-8") as f:
+        json.dump(list(ids), f)
+
+
+def full_vectors(index_dir: str) -> Optional[FullVectors]:
+    """Full-precision vectors of an index version (memory-mapped, loaded once)."""
+    with _vector_stores_lock:
+        if index_dir not in _full_vectors:
+            try:
+                matrix = np.load(os.path.join(index_dir, FULL_VECTORS_FILE), mmap_mode="r")
+                with open(os.path.join(index_dir, FULL_VECTOR_IDS_FILE), "r", encoding="utf-8") as f:
+                    _full_vectors[index_dir] = FullVectors(matrix, json.load(f))
+            except FileNotFoundError:
+                logger.warning(
+                    "No full-precision vectors in %s; hits on the shortened index are not re-scored",
+                    index_dir,
+                )
+                _full_vectors[index_dir] = None
+        return _full_vectors[index_dir]
+
+
+def _rescore(
+    results: List[Tuple], q_emb: List[float], k: int, vectors: Optional[FullVectors]
+) -> List[Tuple]:
+    """
+    Re-rank (document, distance) candidates found on shortened vectors by their
+    squared L2 distance on the stored full-precision vectors (same scale as
+    Chroma's), keep k. Without stored vectors the shortened-index order is kept.
+    """
+    exact = vectors.lookup([doc.metadata for doc, _ in results]) if vectors is not None else None
+    if exact is None:
+        count_event("rescore_skipped")
+        return results[:k]
+    distances = ((exact - np.asarray(q_emb, dtype=np.float32)) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return [(results[i][0], float(distances[i])) for i in order]
+
+
 # ───────────────────
 # Incremental Chroma indexing
 # ───────────────────
 
 
-def create_chroma_index(
-    chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP
-) -> Chroma:
-    logger.info("Creating Chroma index from KB")
-    if os.path.exists(CHROMA_DB_DIR):
-        shutil.rmtree(CHROMA_DB_DIR)
-        logger.info("Removed existing Chroma DB for full rebuild")
-
-    loader = DirectoryLoader(
-        KB_DIR, glob="*.md", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"}
-    )
-    documents = loader.load()
-    logger.info(f"Loaded {len(documents)} documents from {KB_DIR}")
-
+def _split_documents(documents, chunk_size: int, chunk_overlap: int):
+    """
+    (texts, metadatas, ids) of the chunks of `documents`. Metadata records the
+    per-source ordering so overlapping hits can be merged at query time; ids are
+    per source and content version, so one file's chunks can be replaced alone.
+    """
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
     )
-    chunks = splitter.split_documents(documents)
-    logger.info(f"Split into {len(chunks)} chunks")
+    texts, metadatas, ids = [], [], []
+    for document in documents:
+        source = os.path.basename(document.metadata.get("source", ""))
+        version = hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()[:12]
+        for chunk_index, chunk in enumerate(splitter.split_documents([document])):
+            texts.append(chunk.page_content)
+            metadatas.append(
+                {
+                    "source": source,
+                    "chunk_index": chunk_index,
+                    "start_index": chunk.metadata.get("start_index", -1),
+                }
+            )
+            ids.append(f"{source}:{version}:{chunk_index}")
+    return texts, metadatas, ids
+
+
+class OpenAIEmbeddingFunction:
+    """LangChain embedding interface over the cached OpenAI embeddings (index vectors)."""
+
+    def __init__(self, model_name: str = EMBED_MODEL):
+        self.model_name = model_name
+
+    def embed_documents(self, texts_list: List[str]) -> List[List[float]]:
+        return [
+            _index_vector(v)
+            for v in batch_get_openai_embeddings(texts_list, model=self.model_name)
+        ]
+
+    def embed_query(self, text: str) -> List[float]:
+        return _index_vector(get_openai_embedding(text, model=self.model_name))
+
+
+# Serializes writers of the index (full rebuilds, per-file updates); readers never take it
+_index_write_lock = threading.RLock()
+
+
+def document_vectors(
+    texts: List[str], metadatas: List[Dict], vectors: List[List[float]]
+) -> Dict[str, List[float]]:
+    """Per-source mean of the chunk vectors, weighted by chunk length (recommender vectors)."""
+    grouped: Dict[str, Tuple[List[List[float]], List[int]]] = {}
+    for text, meta, vector in zip(texts, metadatas, vectors):
+        chunk_vectors, weights = grouped.setdefault(meta["source"], ([], []))
+        chunk_vectors.append(vector)
+        weights.append(max(1, len(text)))
+    return {
+        source: np.average(np.asarray(chunk_vectors, dtype=np.float32), axis=0, weights=weights).tolist()
+        for source, (chunk_vectors, weights) in grouped.items()
+    }
+
+
+def _save_document_vectors(
+    updated: Dict[str, List[float]], removed: List[str] = (), replace: bool = False
+) -> None:
+    # Imported here: the recommender imports this module for query embeddings
+    from backend.app.services import recommendations
+
+    recommendations.update_doc_embeddings(updated, removed, replace=replace)
+
+
+def _upsert_chunks(collection, ids, texts, metadatas, vectors) -> None:
+    """Write chunks with their index vectors, in batches Chroma accepts."""
+    from chromadb.utils.batch_utils import create_batches
+
+    index_vectors = [_index_vector(v) for v in vectors]
+    for batch_ids, batch_vectors, batch_metas, batch_texts in create_batches(
+        api=collection._client, ids=ids, embeddings=index_vectors, metadatas=metadatas, documents=texts
+    ):
+        collection.upsert(
+            ids=batch_ids, embeddings=batch_vectors, metadatas=batch_metas, documents=batch_texts
+        )
+
+
+# ───────────────────
+# Versioned index directories
+# ───────────────────
 
-    texts = [c.page_content for c in chunks]
-    metadatas = [
-        {"source": os.path.basename(c.metadata.get("source", ""))} for c in chunks
+
+def current_index_dir() -> Optional[str]:
+    """Directory of the published index version (None until one is built)."""
+    try:
+        with open(os.path.join(CHROMA_DB_DIR, INDEX_POINTER), "r", encoding="utf-8") as f:
+            return os.path.join(CHROMA_DB_DIR, f.read().strip())
+    except FileNotFoundError:
+        # Layout before versioning: the index files directly in CHROMA_DB_DIR
+        if os.path.exists(os.path.join(CHROMA_DB_DIR, "chroma.sqlite3")):
+            return CHROMA_DB_DIR
+        return None
+
+
+def _new_index_dir() -> str:
+    # Names sort by creation time; the pid keeps parallel builders apart
+    name = f"v{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+    path = os.path.join(CHROMA_DB_DIR, name)
+    os.makedirs(path)
+    return path
+
+
+def _publish_index(index_dir: str) -> None:
+    """Point CURRENT at `index_dir` (write then rename: readers see old or new)."""
+    pointer = os.path.join(CHROMA_DB_DIR, INDEX_POINTER)
+    tmp_path = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(index_dir))
+    os.replace(tmp_path, pointer)
+    logger.info("Published index version %s", os.path.basename(index_dir))
+
+
+def _close_store(index_dir: str) -> None:
+    """Drop the opened store of `index_dir` and stop Chroma's cached client for it."""
+    with _vector_stores_lock:
+        _vector_stores.pop(index_dir, None)
+        _full_vectors.pop(index_dir, None)
+    try:
+        from chromadb.api.client import SharedSystemClient
+
+        system = SharedSystemClient._identifer_to_system.pop(index_dir, None)
+        if system is not None:
+            system.stop()
+    except Exception as e:  # best effort: only frees file handles earlier
+        logger.debug("Could not stop Chroma client for %s: %s", index_dir, e)
+
+
+def gc_index_versions(keep: int = INDEX_KEEP_VERSIONS) -> List[str]:
+    """
+    Delete index versions older than the `keep` most recent up to the current one,
+    except those pinned by queries in flight; newer directories (builds in
+    progress) are left alone. Returns the removed paths.
+    """
+    current = current_index_dir()
+    if current is None or current == CHROMA_DB_DIR:
+        return []
+    versions = sorted(
+        e.name for e in os.scandir(CHROMA_DB_DIR) if e.is_dir() and e.name.startswith("v")
+    )
+    current_name = os.path.basename(current)
+    older = [name for name in versions if name < current_name]
+    doomed = [os.path.join(CHROMA_DB_DIR, name) for name in older[: max(0, len(older) - (keep - 1))]]
+    # Files of the unversioned layout (before the first published version)
+    legacy = [
+        os.path.join(CHROMA_DB_DIR, e.name)
+        for e in os.scandir(CHROMA_DB_DIR)
+        if not e.name.startswith(("v", INDEX_POINTER))
     ]
-    ids = [f"chunk_{i}" for i in range(len(chunks))]
+    removed = []
+    with _vector_stores_lock:
+        doomed = [path for path in doomed if not _pins.get(path)]
+        if _pins.get(CHROMA_DB_DIR):
+            legacy = []
+    if legacy:
+        _close_store(CHROMA_DB_DIR)
+    for path in doomed + legacy:
+        if path in doomed:
+            _close_store(path)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+        removed.append(path)
+    if removed:
+        logger.info("Removed %d old index versions/files", len(removed))
+    return removed
+
+
+def _build_scope_index(store: Chroma, index_dir: str) -> Optional[scope.ScopeIndex]:
+    """Scope index of a new version, saved with it so workers load it instead of rebuilding."""
+    if not SCOPE_PREFILTER_ENABLED:
+        return None
+    index = scope.ScopeIndex.from_store(store)
+    index.save(os.path.join(index_dir, SCOPE_INDEX_FILE))
+    return index
+
+
+def get_scope_index(store: Chroma) -> scope.ScopeIndex:
+    """Scope index of an opened store (loaded from its version directory once)."""
+    return scope.get_scope_index(
+        store, CHROMA_DB_DIR, os.path.join(store._persist_directory, SCOPE_INDEX_FILE)
+    )
 
-    class OpenAIEmbeddingFunction:
-        def __init__(self, model_name: str):
-            self.model_name = model_name
 
-        def embed_documents(self, texts_list: List[str]) -> List[List[float]]:
-            return batch_get_openai_embeddings(texts_list, model=self.model_name)
+def index_exists() -> bool:
+    return current_index_dir() is not None
 
-        def embed_query(self, text: str) -> List[float]:
-            return get_openai_embedding(text, model=self.model_name)
 
-    embedding_fn = OpenAIEmbeddingFunction(EMBED_MODEL)
-    vector_db = Chroma.from_texts(
-        texts=texts,
-        embedding=embedding_fn,
-        metadatas=metadatas,
-        ids=ids,
-        persist_directory=CHROMA_DB_DIR,
-    )
-    vector_db.persist()
+def ensure_index() -> None:
+    """Build the index unless a version is published (at most one builder per process)."""
+    with _index_write_lock:
+        if not index_exists():
+            logger.info("Chroma DB not found; creating index...")
+            create_chroma_index()
+
+
+def create_chroma_index(
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    update_recommender: bool = True,
+) -> Chroma:
+    """
+    Full rebuild of the index from the KB into a new version directory, published
+    once complete: queries keep using the previous version meanwhile. Each chunk
+    is embedded once; the same vectors give the recommender's per-document
+    vectors, which replace doc_embeddings.json unless `update_recommender` is
+    False (e.g. sweep variants).
+    """
+    logger.info("Creating Chroma index from KB")
+    with _index_write_lock:
+        loader = DirectoryLoader(
+            KB_DIR, glob="*.md", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"}
+        )
+        documents = loader.load()
+        logger.info("Loaded %d documents from %s", len(documents), KB_DIR)
+
+        texts, metadatas, ids = _split_documents(documents, chunk_size, chunk_overlap)
+        logger.info("Split into %d chunks", len(texts))
+        vectors = _embed_chunks(texts)
+
+        index_dir = _new_index_dir()
+        try:
+            vector_db = Chroma(
+                embedding_function=OpenAIEmbeddingFunction(EMBED_MODEL),
+                persist_directory=index_dir,
+            )
+            if texts:
+                _upsert_chunks(vector_db._collection, ids, texts, metadatas, vectors)
+                if INDEX_DIMENSIONS:
+                    _save_full_vectors(index_dir, ids, np.asarray(vectors, dtype=np.float32))
+            scope_index = _build_scope_index(vector_db, index_dir)
+        except Exception:
+            _close_store(index_dir)
+            shutil.rmtree(index_dir, ignore_errors=True)
+            raise
+        with _vector_stores_lock:
+            _vector_stores[index_dir] = vector_db
+        _publish_index(index_dir)
+        if scope_index is not None:
+            scope.set_scope_index(vector_db, CHROMA_DB_DIR, scope_index)
+        if update_recommender:
+            _save_document_vectors(document_vectors(texts, metadatas, vectors), replace=True)
+    gc_index_versions()
     logger.info("Chroma index successfully created and persisted")
     return vector_db
 
 
+def _copy_chunks(source, target, exclude_sources: List[str], batch_size: int = 1000) -> None:
+    """Copy every chunk of `source` not from `exclude_sources` into `target` (no re-embedding)."""
+    excluded = set(exclude_sources)
+    offset = 0
+    while True:
+        page = source.get(
+            include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset
+        )
+        if not page["ids"]:
+            return
+        keep = [i for i, meta in enumerate(page["metadatas"]) if meta.get("source") not in excluded]
+        if keep:
+            target.upsert(
+                ids=[page["ids"][i] for i in keep],
+                embeddings=[page["embeddings"][i] for i in keep],
+                documents=[page["documents"][i] for i in keep],
+                metadatas=[page["metadatas"][i] for i in keep],
+            )
+        offset += len(page["ids"])
+
+
+def update_index_files(changed: List[str], removed: List[str] = ()) -> Dict[str, int]:
+    """
+    Re-index only the KB files named in `changed` (added or modified) and drop
+    the chunks of `removed`. The new version copies every other chunk from the
+    current one (no embedding calls) and embeds only the changed files, then is
+    published in one step; queries see either the old or the new index. The
+    affected doc_embeddings.json entries are updated afterwards.
+    Returns the number of chunks of each changed file.
+    """
+    chunk_counts: Dict[str, int] = {}
+    doc_vectors: Dict[str, List[float]] = {}
+    excluded = set(changed) | set(removed)
+    with _index_write_lock:
+        current_dir = current_index_dir()
+        current = get_vector_store()
+        # Full-precision vectors of the kept chunks are copied too (no re-embedding)
+        full_ids: List[str] = []
+        full_rows: List[np.ndarray] = []
+        previous = full_vectors(current_dir) if INDEX_DIMENSIONS else None
+        if previous is not None:
+            keep = [i for i, chunk_id in enumerate(previous.ids) if _chunk_source(chunk_id) not in excluded]
+            full_ids += [previous.ids[i] for i in keep]
+            full_rows.append(np.asarray(previous.matrix[keep], dtype=np.float32))
+        index_dir = _new_index_dir()
+        try:
+            store = Chroma(persist_directory=index_dir)
+            _copy_chunks(current._collection, store._collection, list(excluded))
+            for name in changed:
+                path = os.path.join(KB_DIR, name)
+                documents = TextLoader(path, encoding="utf-8").load()
+                texts, metadatas, ids = _split_documents(documents, CHUNK_SIZE, CHUNK_OVERLAP)
+                vectors = _embed_chunks(texts)
+                if texts:
+                    _upsert_chunks(store._collection, ids, texts, metadatas, vectors)
+                    full_ids += ids
+                    full_rows.append(np.asarray(vectors, dtype=np.float32))
+                chunk_counts[name] = len(ids)
+                doc_vectors.update(document_vectors(texts, metadatas, vectors))
+                logger.info("Re-indexed %s: %d chunks", name, len(ids))
+            if INDEX_DIMENSIONS and full_ids:
+                _save_full_vectors(index_dir, full_ids, np.concatenate(full_rows))
+            scope_index = _build_scope_index(store, index_dir)
+        except Exception:
+            _close_store(index_dir)
+            shutil.rmtree(index_dir, ignore_errors=True)
+            raise
+        with _vector_stores_lock:
+            _vector_stores[index_dir] = store
+        _publish_index(index_dir)
+        if scope_index is not None:
+            scope.set_scope_index(store, CHROMA_DB_DIR, scope_index)
+        if removed:
+            logger.info("Removed %s from the index", list(removed))
+        empty = [name for name, count in chunk_counts.items() if not count]
+        _save_document_vectors(doc_vectors, list(removed) + empty)
+    gc_index_versions()
+    return chunk_counts
+
+
+def _open_current_store() -> Tuple[str, Chroma]:
+    # Caller holds _vector_stores_lock
+    index_dir = current_index_dir()
+    if index_dir is None:
+        raise FileNotFoundError(f"No Chroma index published in {CHROMA_DB_DIR}")
+    store = _vector_stores.get(index_dir)
+    if store is None:
+        store = Chroma(persist_directory=index_dir)
+        _vector_stores[index_dir] = store
+    return index_dir, store
+
+
+def get_vector_store() -> Chroma:
+    """
+    Chroma store of the current index version, opened on first use and shared by
+    every query (and thread) afterwards; a newly published version (from this or
+    another process) is picked up on the next call. Queries pass their own vectors,
+    so the store needs no embedding function.
+    """
+    with _vector_stores_lock:
+        return _open_current_store()[1]
+
+
+@contextmanager
+def pinned_vector_store() -> Iterator[Chroma]:
+    """Current store, kept on disk (not garbage-collected) until the block exits."""
+    with _vector_stores_lock:
+        index_dir, store = _open_current_store()
+        _pins[index_dir] += 1
+    try:
+        yield store
+    finally:
+        with _vector_stores_lock:
+            _pins[index_dir] -= 1
+            if not _pins[index_dir]:
+                del _pins[index_dir]
+
+
 # ───────────────────
 # Retrieval with out-of-scope detection
 # ───────────────────
 
 
 def retrieve_fragments_openai(query: str, k: int = 3) -> List[Tuple[str, float, str]]:
-    logger.info(f"retrieve_fragments_openai: query={query!r}, k={k}")
-    if not os.path.exists(CHROMA_DB_DIR):
-        logger.info("Chroma DB not found; creating index...")
-        create_chroma_index()
+    logger.info("retrieve_fragments_openai: query=%r, k=%d", query, k)
+    if not index_exists():
+        ensure_index()
+    # The whole query runs against one index version, even if a new one is published
+    with pinned_vector_store() as store:
+        return _retrieve(store, query, k)
+
+
+def _retrieve(store: Chroma, query: str, k: int) -> List[Tuple[str, float, str]]:
+    scope_index = None
+    if SCOPE_PREFILTER_ENABLED:
+        count_event("scope_checks")
+        with timed("scope_lexical"):
+            scope_index = get_scope_index(store)
+            in_vocabulary = scope_index.lexical_match(query)
+        if not in_vocabulary:
+            # Advisory: paraphrases and other languages miss the KB wording too
+            count_event("scope_lexical_miss")
+            logger.info("No KB vocabulary in query; left to the centroid check")
 
-    start = time()
     q_emb = get_openai_embedding(query)
-    logger.debug(f"Computed query embedding in {time() - start:.2f}s")
-
-    class DummyEmbFn:
-        def __init__(self, vec):
-            self.vec = vec
-
-        def embed_documents(self, texts):
-            return [self.vec] * len(texts)
-
-        def embed_query(self, _):
-            return self.vec
-
-    db = Chroma(persist_directory=CHROMA_DB_DIR, embedding_function=DummyEmbFn(q_emb))
-    try:
-        results = db.similarity_search_with_score(query, k=k)
-    except TypeError:
-        results = db.similarity_search_by_vector(q_emb, k=k)
-    logger.debug(f"Chroma returned {len(results)} results")
+    q_index = _index_vector(q_emb)
+    rescore = len(q_index) < len(q_emb)
+
+    if scope_index is not None:
+        with timed("scope_centroid"):
+            similarity = scope_index.max_centroid_similarity(q_index)
+        if similarity is not None and similarity < scope.CENTROID_MIN_SIMILARITY:
+            count_event("scope_rejected_centroid")
+            logger.info("Out-of-scope detected (centroid similarity=%.3f)", similarity)
+            return []
+
+    with timed("vector_search"):
+        results = store.similarity_search_by_vector_with_relevance_scores(
+            q_index, k=k * RESCORE_OVERSAMPLE if rescore else k
+        )
+    logger.debug("Chroma returned %d results", len(results))
+    if rescore and results:
+        with timed("rescore"):
+            results = _rescore(results, q_emb, k, full_vectors(store._persist_directory))
 
     distances = [score for _, score in results]
-    logger.debug(f"Distances: {distances}")
-    if not distances or min(distances) > DISTANCE_THRESHOLD:
+    logger.debug("Distances: %s", distances)
+    if scope.is_out_of_scope(distances):
         logger.info(
-            f"Out-of-scope detected (min_distance={min(distances) if distances else 'none'})"
+            "Out-of-scope detected (min_distance=%s)",
+            min(distances) if distances else "none",
         )
         return []
 
-    output = [
-        (doc.page_content, score, doc.metadata.get("source", "unknown"))
-        for doc, score in results
-    ]
-    logger.info(f"Returning {len(output)} fragments")
+    if MERGE_OVERLAPPING_CHUNKS:
+        output = merge_overlapping_chunks(
+            [(doc.page_content, score, doc.metadata) for doc, score in results]
+        )
+        logger.debug("Merged %d chunks into %d passages", len(results), len(output))
+    else:
+        output = [
+            (doc.page_content, score, doc.metadata.get("source", "unknown"))
+            for doc, score in results
+        ]
+    logger.info("Returning %d fragments", len(output))
     return output
 
 
 if __name__ == "__main__":
+    from backend.app.logging_config import configure_logging
+
+    configure_logging()
     create_chroma_index()
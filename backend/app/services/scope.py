@@ -0,0 +1,310 @@
+"""
+Out-of-scope classifier for RAG queries, run before the expensive retrieval steps.
+
+1. Holds the distance threshold used on Chroma results (`is_out_of_scope`), the single
+   place the retriever, the RAG router and the evaluation runner read it from.
+2. Lexical stage (no provider call): a query with several content words (Unicode words,
+   so accented and non-English queries keep theirs), none sharing a stem with the indexed
+   KB text, is a lexical miss. A miss is advisory only: paraphrases and other languages
+   share no words with the KB, so the query still goes to the centroid stage.
+3. Centroid stage (no vector search): the query embedding is compared with one centroid
+   per KB document (mean of its chunk vectors); below CENTROID_MIN_SIMILARITY the query
+   is rejected and the Chroma search is skipped.
+4. Vocabulary and centroids are built from the index itself when an index version is
+   built, and saved next to it; workers load that file (once per opened vector store)
+   instead of reading the whole collection, so they always match the live KB.
+5. `python -m backend.app.services.scope --calibrate` sets CENTROID_MIN_SIMILARITY from
+   the simulated questions (and off-topic probes), reporting rejection rates, the share
+   of in-scope questions the lexical stage misses and the latency of both stages; the
+   result is stored in data/scope_calibration.json.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from backend.app.config import DATA_DIR, PROJECT_ROOT
+
+logger = logging.getLogger("scope")
+
+# ───────────────────
+# Thresholds
+# ───────────────────
+# Chroma distance above which even the best hit is considered unrelated
+DISTANCE_THRESHOLD = 1.25
+# Cosine similarity to the closest KB document centroid below which a query is rejected
+# (conservative default; `--calibrate` replaces it with a value fitted on the KB)
+DEFAULT_CENTROID_MIN_SIMILARITY = 0.20
+# Kept below the lowest in-scope similarity seen during calibration
+CALIBRATION_MARGIN = 0.05
+CALIBRATION_FILE = os.path.join(DATA_DIR, "scope_calibration.json")
+
+STEM_LENGTH = 5
+# Shorter queries ("How do I get paid?") are left to the centroid stage: one or two
+# unknown words are weak evidence, several unknown words are not
+LEXICAL_MIN_STEMS = 3
+STOPWORDS = frozenset(
+    """
+    a about an and are as at be by can could do does did for from get got had has have
+    how i if in into is it its me my of on or our should so than that the their them
+    then there these they this to up us was we were what when where which who why will
+    with would you your yours hello hi please thanks thank much many some any all more
+    most also just very
+    """.split()
+)
+# Letters and digits of any script ("métodos", "Rechnung"), underscores excluded
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _load_centroid_threshold(path: str = CALIBRATION_FILE) -> float:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return float(json.load(f)["centroid_min_similarity"])
+    except FileNotFoundError:
+        return DEFAULT_CENTROID_MIN_SIMILARITY
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring invalid scope calibration %s: %s", path, e)
+        return DEFAULT_CENTROID_MIN_SIMILARITY
+
+
+CENTROID_MIN_SIMILARITY = _load_centroid_threshold()
+
+
+def is_out_of_scope(distances: Sequence[float]) -> bool:
+    """True when no retrieved fragment is close enough to the query."""
+    return not distances or min(distances) > DISTANCE_THRESHOLD
+
+
+# ───────────────────
+# Scope index (vocabulary + centroids)
+# ───────────────────
+def content_stems(text: str) -> Set[str]:
+    """Stems of the non-stopword tokens of `text` (lowercased, truncated)."""
+    return {
+        token[:STEM_LENGTH]
+        for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    }
+
+
+class ScopeIndex:
+    """KB vocabulary stems and L2-normalized per-document centroid vectors."""
+
+    def __init__(self, vocabulary: Set[str], sources: List[str], centroids: np.ndarray):
+        self.vocabulary = vocabulary
+        self.sources = sources
+        self.centroids = centroids
+
+    @classmethod
+    def from_chunks(
+        cls,
+        documents: List[str],
+        metadatas: List[Dict],
+        embeddings: Optional[Sequence[Sequence[float]]],
+    ) -> "ScopeIndex":
+        vocabulary: Set[str] = set()
+        for text in documents:
+            vocabulary |= content_stems(text or "")
+        by_source: Dict[str, List] = defaultdict(list)
+        if embeddings is not None:
+            for meta, vector in zip(metadatas, embeddings):
+                by_source[(meta or {}).get("source", "unknown")].append(vector)
+        sources = sorted(by_source)
+        if sources:
+            centroids = np.stack(
+                [np.mean(np.asarray(by_source[s], dtype=np.float32), axis=0) for s in sources]
+            )
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids = centroids / np.where(norms == 0, 1.0, norms)
+        else:
+            centroids = np.zeros((0, 0), dtype=np.float32)
+        return cls(vocabulary, sources, centroids)
+
+    @classmethod
+    def from_store(cls, store) -> "ScopeIndex":
+        data = store.get(include=["documents", "metadatas", "embeddings"])
+        return cls.from_chunks(data["documents"], data["metadatas"], data.get("embeddings"))
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "vocabulary": sorted(self.vocabulary),
+                    "sources": self.sources,
+                    "centroids": self.centroids.tolist(),
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ScopeIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        centroids = np.asarray(data["centroids"], dtype=np.float32)
+        if not data["sources"]:
+            centroids = np.zeros((0, 0), dtype=np.float32)
+        return cls(set(data["vocabulary"]), data["sources"], centroids)
+
+    def lexical_match(self, query: str) -> bool:
+        """
+        False only when the query has LEXICAL_MIN_STEMS content words, none in the KB
+        (a hint, not a rejection: the centroid stage decides).
+        """
+        stems = content_stems(query)
+        if len(stems) < LEXICAL_MIN_STEMS or not self.vocabulary:
+            return True
+        return bool(stems & self.vocabulary)
+
+    def max_centroid_similarity(self, query_embedding: Sequence[float]) -> Optional[float]:
+        """Cosine similarity to the closest document centroid (None if not comparable)."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if not len(self.sources) or query.shape[0] != self.centroids.shape[1]:
+            return None
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        return float((self.centroids @ (query / norm)).max())
+
+
+# One scope index per opened vector store, rebuilt when the store is replaced
+_scope_indexes: Dict[str, tuple] = {}
+_scope_lock = threading.Lock()
+
+
+def get_scope_index(store, key: str, path: Optional[str] = None) -> ScopeIndex:
+    """
+    Scope index of `store`: the cached one, else the file saved with its index version
+    (`path`), else built from the store's contents (indexes built before it was saved).
+    """
+    with _scope_lock:
+        cached = _scope_indexes.get(key)
+        if cached is not None and cached[0] is store:
+            return cached[1]
+    if path is not None and os.path.exists(path):
+        index = ScopeIndex.load(path)
+        set_scope_index(store, key, index)
+        return index
+    return refresh_scope_index(store, key)
+
+
+def set_scope_index(store, key: str, index: ScopeIndex) -> None:
+    with _scope_lock:
+        _scope_indexes[key] = (store, index)
+
+
+def refresh_scope_index(store, key: str) -> ScopeIndex:
+    """Rebuild the scope index of `store` (after its contents changed) and swap it in."""
+    index = ScopeIndex.from_store(store)
+    set_scope_index(store, key, index)
+    logger.info(
+        "Scope index built: %d stems, %d document centroids", len(index.vocabulary), len(index.sources)
+    )
+    return index
+
+
+# ───────────────────
+# Calibration
+# ───────────────────
+# Clearly unrelated questions used as negatives during calibration
+OUT_OF_SCOPE_PROBES = [
+    "What will the weather be like in Madrid tomorrow?",
+    "Who won the last football World Cup?",
+    "Give me a recipe for seafood paella.",
+    "What is the capital of Australia?",
+    "How do I fix a flat bicycle tyre?",
+    "Recommend a good science fiction novel.",
+    "How many moons does Jupiter have?",
+    "Translate 'good morning' into Japanese.",
+]
+
+
+def calibrate(index: ScopeIndex, in_scope: List[str], out_of_scope: List[str], embed) -> Dict:
+    """
+    Fit the centroid threshold below every in-scope question and report how many
+    questions of each set the centroid stage rejects and the lexical stage misses
+    (on the in-scope set, the rate it would wrongly reject if it were decisive),
+    with per-stage latency.
+    """
+
+    def run(questions):
+        rows = []
+        for question in questions:
+            t0 = time.perf_counter()
+            lexical_ok = index.lexical_match(question)
+            lexical_ms = (time.perf_counter() - t0) * 1000
+            emb = embed(question)
+            t0 = time.perf_counter()
+            similarity = index.max_centroid_similarity(emb)
+            centroid_ms = (time.perf_counter() - t0) * 1000
+            rows.append((question, lexical_ok, similarity, lexical_ms, centroid_ms))
+        return rows
+
+    in_rows, out_rows = run(in_scope), run(out_of_scope)
+    in_sims = [r[2] for r in in_rows if r[2] is not None]
+    threshold = (
+        max(0.0, min(in_sims) - CALIBRATION_MARGIN) if in_sims else DEFAULT_CENTROID_MIN_SIMILARITY
+    )
+
+    def report(rows):
+        lexical = sum(1 for r in rows if not r[1])
+        centroid = sum(1 for r in rows if r[2] is not None and r[2] < threshold)
+        total = len(rows) or 1
+        return {
+            "questions": len(rows),
+            "lexical_misses": lexical,
+            "lexical_miss_rate": lexical / total,
+            "rejected_centroid": centroid,
+            "rejection_rate": centroid / total,
+            "similarity": {
+                "min": min((r[2] for r in rows if r[2] is not None), default=None),
+                "max": max((r[2] for r in rows if r[2] is not None), default=None),
+            },
+            "avg_lexical_ms": sum(r[3] for r in rows) / total,
+            "avg_centroid_ms": sum(r[4] for r in rows) / total,
+        }
+
+    in_report = report(in_rows)
+    return {
+        "centroid_min_similarity": threshold,
+        # In-scope questions a decisive lexical stage would have rejected
+        "lexical_false_rejection_rate": in_report["lexical_miss_rate"],
+        "in_scope": in_report,
+        "out_of_scope": report(out_rows),
+    }
+
+
+if __name__ == "__main__":
+    from backend.app.logging_config import configure_logging
+    from backend.app.services import retriever_openai
+
+    parser = argparse.ArgumentParser(description="Calibrate the out-of-scope prefilter")
+    parser.add_argument("--calibrate", action="store_true", required=True)
+    parser.add_argument(
+        "--questions",
+        default=os.path.join(PROJECT_ROOT, "tests", "simulated_data", "test_questions.json"),
+    )
+    parser.add_argument("--no-save", action="store_true", help="only print the report")
+    args = parser.parse_args()
+
+    configure_logging()
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [q["question"] for q in json.load(f)]
+    scope_index = ScopeIndex.from_store(retriever_openai.get_vector_store())
+    result = calibrate(
+        scope_index, questions, OUT_OF_SCOPE_PROBES, retriever_openai.get_openai_embedding
+    )
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        with open(CALIBRATION_FILE, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved calibration to {CALIBRATION_FILE}")
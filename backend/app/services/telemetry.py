@@ -0,0 +1,167 @@
+"""
+Telemetry module recording per-stage and per-endpoint latency histograms.
+
+1. `timed(stage)` context manager measures a pipeline stage (embedding, cache lookup,
+   vector search, prompt build, LLM call, DB write, ...).
+2. Stages are labelled with the endpoint serving the current request (request scope
+   published by the HTTP middleware), so the same stage can be compared across endpoints.
+3. Total request time and request counts per endpoint/status are recorded by the middleware.
+4. `count_event(name)` keeps in-process counters of domain events (queries served,
+   out-of-scope answers, cache hits/misses).
+5. `render_prometheus()` exports everything in the Prometheus text exposition format.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend.app.services.latency import LatencyHistogram
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Registry
+# ─────────────────────────────────────────────────────────────────────────────
+METRIC_PREFIX = "shakers"
+NO_ENDPOINT = "none"  # stages run outside an HTTP request (scripts, warm-up)
+UNMATCHED_ENDPOINT = "unmatched"  # requests that matched no route (404)
+
+# ASGI scope of the request being served, set by the HTTP middleware
+CURRENT_REQUEST: ContextVar[Optional[dict]] = ContextVar("current_request", default=None)
+
+STAGE_LATENCY: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+REQUEST_LATENCY: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+REQUEST_COUNT: Dict[Tuple[str, str], int] = defaultdict(int)
+EVENT_COUNT: Dict[str, int] = defaultdict(int)
+_count_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Endpoint labels
+# ─────────────────────────────────────────────────────────────────────────────
+def _route_template(path: str, path_format: str) -> Optional[Tuple[str, str]]:
+    """
+    (prefix, template): `path` split into the part routers or mounts consumed and the
+    route template that matched the rest. None when they do not line up.
+    """
+    segments = path.split("/")
+    template = path_format.split("/")[1:]
+    if ":path}" in path_format or len(template) >= len(segments):
+        return None
+    split = len(segments) - len(template)
+    for part, segment in zip(template, segments[split:]):
+        if part != segment and not (part.startswith("{") and part.endswith("}")):
+            return None
+    return "/".join(segments[:split]), "/" + "/".join(template)
+
+
+def endpoint_label(scope: Optional[dict]) -> str:
+    """
+    Route template of a request (e.g. "/history/{user_id}"), so labels stay bounded no
+    matter which ids are requested: the matched route's template after the prefix its
+    router or mount consumed. Prefix segments (or the whole path, when no route template
+    lines up) equal to a path parameter are replaced by its name.
+    """
+    if scope is None:
+        return NO_ENDPOINT
+    if "endpoint" not in scope:
+        return UNMATCHED_ENDPOINT
+    path = scope.get("path", "")
+    path_format = getattr(scope.get("route"), "path_format", None)
+    prefix, template = (path_format and _route_template(path, path_format)) or (path, "")
+    # Parameters of the template itself are already in place
+    names = {
+        str(value): f"{{{name}}}"
+        for name, value in scope.get("path_params", {}).items()
+        if f"{{{name}" not in template
+    }
+    return "/".join(names.get(segment, segment) for segment in prefix.split("/")) + template
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Recording helpers
+# ─────────────────────────────────────────────────────────────────────────────
+def record_stage(stage: str, seconds: float) -> None:
+    """Record the duration of a pipeline stage for the current endpoint."""
+    STAGE_LATENCY[(endpoint_label(CURRENT_REQUEST.get()), stage)].record(seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Measure the enclosed block as `stage` (recorded even if it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_request(endpoint: str, status_code: int, seconds: float) -> None:
+    """Record a finished HTTP request (called by the middleware)."""
+    REQUEST_LATENCY[endpoint].record(seconds)
+    with _count_lock:
+        REQUEST_COUNT[(endpoint, str(status_code))] += 1
+
+
+def count_event(name: str, amount: int = 1) -> None:
+    """Increment the in-process counter of a domain event."""
+    with _count_lock:
+        EVENT_COUNT[name] += amount
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prometheus exposition
+# ─────────────────────────────────────────────────────────────────────────────
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: Dict[str, str]) -> str:
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs.items()) + "}"
+
+
+def _histogram_lines(
+    name: str, labels: Dict[str, str], hist: LatencyHistogram
+) -> List[str]:
+    snap = hist.snapshot()
+    lines = []
+    bounds = [str(b) for b in snap["buckets"]] + ["+Inf"]
+    for bound, cumulative in zip(bounds, snap["cumulative_counts"]):
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {snap['sum']}")
+    lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """Return all metrics in Prometheus text format (version 0.0.4)."""
+    lines = []
+
+    name = f"{METRIC_PREFIX}_request_duration_seconds"
+    lines.append(f"# HELP {name} Total HTTP request time per endpoint.")
+    lines.append(f"# TYPE {name} histogram")
+    for endpoint, hist in sorted(REQUEST_LATENCY.items()):
+        lines.extend(_histogram_lines(name, {"endpoint": endpoint}, hist))
+
+    name = f"{METRIC_PREFIX}_stage_duration_seconds"
+    lines.append(f"# HELP {name} Time spent per pipeline stage and endpoint.")
+    lines.append(f"# TYPE {name} histogram")
+    for (endpoint, stage), hist in sorted(STAGE_LATENCY.items()):
+        lines.extend(
+            _histogram_lines(name, {"endpoint": endpoint, "stage": stage}, hist)
+        )
+
+    name = f"{METRIC_PREFIX}_requests_total"
+    lines.append(f"# HELP {name} HTTP requests per endpoint and status code.")
+    lines.append(f"# TYPE {name} counter")
+    for (endpoint, status), count in sorted(REQUEST_COUNT.items()):
+        lines.append(f"{name}{_labels({'endpoint': endpoint, 'status': status})} {count}")
+
+    name = f"{METRIC_PREFIX}_events_total"
+    lines.append(f"# HELP {name} Domain events (queries, out-of-scope answers, cache hits).")
+    lines.append(f"# TYPE {name} counter")
+    for event, count in sorted(EVENT_COUNT.items()):
+        lines.append(f"{name}{_labels({'event': event})} {count}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,158 @@
+"""
+Startup warm-up so the first users after a deploy don't pay the cold-start latency.
+
+1. Reads the most frequent answered questions of the last WARMUP_WINDOW_DAYS from
+   ChatEntry (one grouped query).
+2. Opens the Chroma index, loads its scope index and runs one vector search, so the
+   store, its segments and the centroids are in memory before the first request.
+3. Embeds those questions in batches (only the ones missing from the embedding cache
+   reach the provider).
+4. Optionally precomputes the answers of the top WARMUP_PRECOMPUTE_ANSWERS questions
+   into the LLM answer cache, one at a time, after the startup phase.
+5. `start()` waits at most WARMUP_BUDGET_SECONDS for steps 1-3; whatever is left keeps
+   running in the background and is stopped on shutdown. Failures are logged, never raised.
+   Readiness (`startup_over()`) waits for the same budget, never longer.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from backend.app import db
+from backend.app.config import (
+    WARMUP_BUDGET_SECONDS,
+    WARMUP_PRECOMPUTE_ANSWERS,
+    WARMUP_TOP_QUESTIONS,
+    WARMUP_WINDOW_DAYS,
+)
+from backend.app.services import llm_gemini, rag_pipeline, retriever_openai
+from backend.app.services.telemetry import count_event
+
+logger = logging.getLogger("warmup")
+
+# Progress of the current warm-up (served with the live metrics)
+STATUS: Dict[str, object] = {"state": "idle"}
+# Set on shutdown; checked between questions by the background steps
+_stop = threading.Event()
+
+
+def frequent_questions(
+    limit: int = WARMUP_TOP_QUESTIONS, window_days: int = WARMUP_WINDOW_DAYS
+) -> List[str]:
+    since = db.utcnow() - timedelta(days=window_days)
+    return [question for question, _ in db.get_frequent_questions(since, limit)]
+
+
+def load_index(questions: List[str]) -> bool:
+    """Open the vector store and its scope index; False when no index is built yet."""
+    if not retriever_openai.index_exists():
+        logger.info("No Chroma index at %s; skipping index warm-up", retriever_openai.CHROMA_DB_DIR)
+        return False
+    store = retriever_openai.get_vector_store()
+    if retriever_openai.SCOPE_PREFILTER_ENABLED:
+        retriever_openai.get_scope_index(store)
+    if questions:
+        vector = retriever_openai._index_vector(retriever_openai.get_openai_embedding(questions[0]))
+        store.similarity_search_by_vector_with_relevance_scores(vector, k=1)
+    return True
+
+
+def embed_questions(questions: List[str]) -> int:
+    """Fill the embedding cache for `questions`; returns how many were embedded."""
+    done = 0
+    for start in range(0, len(questions), retriever_openai.BATCH_SIZE):
+        if _stop.is_set():
+            break
+        batch = questions[start : start + retriever_openai.BATCH_SIZE]
+        retriever_openai.batch_get_openai_embeddings(batch)
+        done += len(batch)
+    count_event("warmup_embeddings", done)
+    return done
+
+
+def precompute_answers(questions: List[str]) -> int:
+    """
+    Run the route's retrieval and generation for each question so its answer is cached
+    (same fragments, hence the same prompt, as POST /rag/query).
+    """
+    if not llm_gemini.ANSWER_CACHE_ENABLED:
+        logger.info("LLM answer cache disabled; not precomputing answers")
+        return 0
+    done = 0
+    for question in questions:
+        if _stop.is_set():
+            break
+        fragments = rag_pipeline.retrieve_context(question)
+        if not fragments:
+            continue
+        llm_gemini.generate_answer_with_references_gemini(
+            rag_pipeline.snippet_texts(fragments), question
+        )
+        done += 1
+    count_event("warmup_answers", done)
+    return done
+
+
+async def run(
+    ready: asyncio.Event,
+    top_questions: int = WARMUP_TOP_QUESTIONS,
+    window_days: int = WARMUP_WINDOW_DAYS,
+    answers: int = WARMUP_PRECOMPUTE_ANSWERS,
+) -> None:
+    """Warm-up steps off the event loop; `ready` is set once the startup phase is over."""
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    STATUS.clear()
+    STATUS["state"] = "running"
+    try:
+        questions = await loop.run_in_executor(None, frequent_questions, top_questions, window_days)
+        STATUS["questions"] = len(questions)
+        STATUS["index_loaded"] = await loop.run_in_executor(None, load_index, questions)
+        STATUS["embedded"] = await loop.run_in_executor(None, embed_questions, questions)
+        STATUS["state"] = "ready"
+        STATUS["ready_seconds"] = round(time.perf_counter() - t0, 3)
+        logger.info(
+            "Warm-up ready in %.2fs: %d questions embedded", STATUS["ready_seconds"], STATUS["embedded"]
+        )
+        ready.set()
+        if answers:
+            STATUS["answers"] = await loop.run_in_executor(
+                None, precompute_answers, questions[:answers]
+            )
+            logger.info("Warm-up precomputed %d answers", STATUS["answers"])
+    except Exception:
+        STATUS["state"] = "failed"
+        logger.exception("Warm-up failed")
+    finally:
+        ready.set()
+
+
+async def start(budget_seconds: float = WARMUP_BUDGET_SECONDS, **kwargs) -> asyncio.Task:
+    """
+    Start the warm-up and wait until its startup phase is over or the budget is
+    spent; returns the task (still running for the background steps).
+    """
+    _stop.clear()
+    ready = asyncio.Event()
+    task = asyncio.create_task(run(ready, **kwargs))
+    try:
+        await asyncio.wait_for(ready.wait(), budget_seconds)
+    except asyncio.TimeoutError:
+        STATUS["budget_spent"] = True
+        logger.info("Warm-up budget of %.1fs spent; continuing in the background", budget_seconds)
+    return task
+
+
+def startup_over() -> bool:
+    """True once the startup phase has finished (or failed) or its budget is spent."""
+    return STATUS.get("state") != "running" or bool(STATUS.get("budget_spent"))
+
+
+def stop(task: Optional[asyncio.Task]) -> None:
+    """Ask the background steps to stop after the current question and cancel the task."""
+    _stop.set()
+    if task is not None:
+        task.cancel()
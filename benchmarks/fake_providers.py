@@ -0,0 +1,171 @@
+"""
+Local fake OpenAI (embeddings) and Gemini (generateContent) servers for benchmarks.
+
+1. Speak just enough of each REST API for the official SDKs used by the backend.
+2. Configurable latency distributions per provider ("fixed:0.05", "uniform:0.02,0.2",
+   "lognormal:0.3,0.5" = median seconds, sigma), to reproduce provider tails.
+3. Deterministic embeddings: hashed bag-of-words plus a shared component, so related
+   texts are close and every query stays within the retriever's distance threshold.
+4. Thread-per-request HTTP servers started in background threads; no extra dependencies.
+"""
+
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Core parameters
+# ─────────────────────────────────────────────────────────────────────────────
+EMBED_DIMENSIONS = 256
+SHARED_COMPONENT = 1.5  # weight of the dimension every vector shares
+FAKE_ANSWER = "This is a benchmark answer generated by the fake Gemini server."
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Latency distributions
+# ─────────────────────────────────────────────────────────────────────────────
+class LatencyModel:
+    """
+    Parse and sample a latency spec:
+    - "fixed:S"              always S seconds
+    - "uniform:A,B"          uniformly between A and B seconds
+    - "lognormal:MEDIAN,SIG" log-normal with the given median and sigma
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        if self.kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return random.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return random.lognormvariate(math.log(median), sigma)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Deterministic embeddings
+# ─────────────────────────────────────────────────────────────────────────────
+def fake_embedding(text: str, dimensions: int = EMBED_DIMENSIONS) -> List[float]:
+    """Unit vector: hashed bag-of-words (normalized) plus a shared component."""
+    vec = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        vec[1 + int.from_bytes(digest[:4], "little") % (dimensions - 1)] += 1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    vec = [v / norm for v in vec]
+    vec[0] = SHARED_COMPONENT
+    norm = math.sqrt(sum(v * v for v in vec))
+    return [v / norm for v in vec]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP servers
+# ─────────────────────────────────────────────────────────────────────────────
+class _FakeServer:
+    """Base class: runs a ThreadingHTTPServer in a daemon thread."""
+
+    def __init__(self, latency: str):
+        self.latency = LatencyModel(latency)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.latency.sample())
+                payload = json.dumps(server.respond(self.path, body)).encode("utf-8")
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, path: str, body: dict) -> dict:
+        raise NotImplementedError
+
+    def start(self) -> "_FakeServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeOpenAIServer(_FakeServer):
+    """POST /v1/embeddings, honouring encoding_format (float or base64)."""
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def respond(self, path: str, body: dict) -> dict:
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dims = body.get("dimensions") or EMBED_DIMENSIONS
+        data = []
+        for idx, text in enumerate(inputs):
+            vec = fake_embedding(text, dims)
+            if body.get("encoding_format") == "base64":
+                vec = base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode()
+            data.append({"object": "embedding", "index": idx, "embedding": vec})
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+
+class FakeGeminiServer(_FakeServer):
+    """POST /v1beta/models/{model}:generateContent."""
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def respond(self, path: str, body: dict) -> dict:
+        return {
+            "candidates": [
+                {
+                    "content": {"role": "model", "parts": [{"text": FAKE_ANSWER}]},
+                    "finishReason": "STOP",
+                }
+            ]
+        }
@@ -0,0 +1,364 @@
+"""
+Load-testing and latency benchmark for the FastAPI service with stubbed providers.
+
+Usage:
+    python benchmarks/load_test.py --rps 20 --duration 30
+    python benchmarks/load_test.py --gemini-latency lognormal:0.8,0.6 --workers 2
+
+1. Boots `backend.app.main:app` (uvicorn subprocess) against local fake OpenAI and
+   Gemini servers with configurable latency distributions, on an isolated copy of
+   the data directory (the real index, caches and DB are never touched).
+2. Drives the selected endpoints with an open-loop load generator at a fixed RPS;
+   latency is measured from the scheduled send time, so a saturated server cannot
+   hide its queueing delay (no coordinated omission).
+3. Reports p50/p95/p99, throughput and error rate per endpoint.
+4. Stores each run in benchmarks/results/ (tagged with the git commit) and compares
+   it against the previous run, so regressions between commits are visible.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+# Add project root to sys.path for absolute imports
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.fake_providers import FakeGeminiServer, FakeOpenAIServer
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Paths and defaults
+# ─────────────────────────────────────────────────────────────────────────────
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+KB_SOURCE_DIR = os.path.join(PROJECT_ROOT, "data", "kb")
+QUESTIONS_FILE = os.path.join(PROJECT_ROOT, "tests", "simulated_data", "test_questions.json")
+PROFILES_FILE = os.path.join(PROJECT_ROOT, "tests", "simulated_data", "user_profiles.json")
+
+ENDPOINTS = {"rag": "/rag/query", "recs": "/recs/personalized"}
+READY_TIMEOUT_SECONDS = 60
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Environment setup
+# ─────────────────────────────────────────────────────────────────────────────
+def prepare_data_dir(root: str) -> str:
+    """Copy the KB into an isolated data dir (build_index derives the document embeddings)."""
+    data_dir = os.path.join(root, "data")
+    shutil.copytree(KB_SOURCE_DIR, os.path.join(data_dir, "kb"))
+    return data_dir
+
+
+def build_env(data_dir: str, openai: FakeOpenAIServer, gemini: FakeGeminiServer) -> Dict:
+    env = dict(os.environ)
+    env.update(
+        {
+            "SHAKERS_DATA_DIR": data_dir,
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": openai.base_url,
+            "GOOGLE_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": gemini.base_url,
+            "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+            "PYTHONPATH": PROJECT_ROOT,
+            "ANONYMIZED_TELEMETRY": "False",  # no Chroma telemetry from the bench
+        }
+    )
+    return env
+
+
+def build_index(env: Dict) -> None:
+    """Build the Chroma index (and doc_embeddings.json) up front so no request pays for it."""
+    subprocess.run(
+        [sys.executable, "-m", "backend.app.services.retriever_openai"],
+        env=env,
+        cwd=PROJECT_ROOT,
+        check=True,
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api(env: Dict, port: int, workers: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        cwd=PROJECT_ROOT,
+    )
+    deadline = time.time() + READY_TIMEOUT_SECONDS
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited during startup (code {proc.returncode})")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("API did not become ready in time")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Load generation
+# ─────────────────────────────────────────────────────────────────────────────
+def make_payload(endpoint: str, i: int, questions: List[Dict], profiles: List[Dict]) -> Dict:
+    question = questions[i % len(questions)]["question"]
+    if endpoint == "recs":
+        return {"user_id": profiles[i % len(profiles)]["user_id"], "current_query": question}
+    return {"user_id": f"bench_{i % 50}", "query": question}
+
+
+async def _send(client, endpoint, payload, scheduled_at, samples):
+    loop = asyncio.get_running_loop()
+    status: object
+    try:
+        resp = await client.post(ENDPOINTS[endpoint], json=payload)
+        status = resp.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    samples.append(
+        {"endpoint": endpoint, "latency": loop.time() - scheduled_at, "status": status}
+    )
+
+
+async def run_load(
+    base_url: str,
+    endpoints: List[str],
+    rps: float,
+    duration: float,
+    timeout: float,
+    questions: List[Dict],
+    profiles: List[Dict],
+) -> Dict:
+    """Open-loop load: request i is scheduled at start + i / rps."""
+    samples: List[Dict] = []
+    total = int(rps * duration)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks = []
+        for i in range(total):
+            scheduled_at = start + i / rps
+            delay = scheduled_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = endpoints[i % len(endpoints)]
+            payload = make_payload(endpoint, i, questions, profiles)
+            tasks.append(
+                asyncio.create_task(_send(client, endpoint, payload, scheduled_at, samples))
+            )
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+    return {"samples": samples, "elapsed": elapsed}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reporting
+# ─────────────────────────────────────────────────────────────────────────────
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(q * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[Dict], elapsed: float) -> Dict:
+    summary = {}
+    for endpoint in sorted({s["endpoint"] for s in samples}):
+        rows = [s for s in samples if s["endpoint"] == endpoint]
+        ok = sorted(
+            s["latency"] for s in rows if isinstance(s["status"], int) and s["status"] < 400
+        )
+        statuses: Dict[str, int] = {}
+        for s in rows:
+            statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+        summary[endpoint] = {
+            "requests": len(rows),
+            "ok": len(ok),
+            "error_rate": 1 - len(ok) / len(rows) if rows else 0.0,
+            "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(ok, 0.50) * 1000,
+            "p95_ms": percentile(ok, 0.95) * 1000,
+            "p99_ms": percentile(ok, 0.99) * 1000,
+            "mean_ms": (sum(ok) / len(ok) * 1000) if ok else 0.0,
+            "max_ms": (ok[-1] * 1000) if ok else 0.0,
+            "statuses": statuses,
+        }
+    return summary
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(report: Dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"load_{report['timestamp'].replace(':', '').replace('-', '')}_{report['commit']}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_previous(current_path: str) -> Optional[Dict]:
+    """Most recent earlier load-test result, if any."""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    names = sorted(
+        n for n in os.listdir(RESULTS_DIR) if n.startswith("load_") and n.endswith(".json")
+    )
+    names = [n for n in names if os.path.join(RESULTS_DIR, n) != current_path]
+    return load_json(os.path.join(RESULTS_DIR, names[-1])) if names else None
+
+
+def _delta(new: float, old: float) -> str:
+    if not old:
+        return ""
+    return f" ({(new - old) / old:+.1%})"
+
+
+def print_report(report: Dict, previous: Optional[Dict]) -> None:
+    print(f"\n=== Load test @ {report['commit']} ({report['config']['rps']} rps) ===")
+    for endpoint, stats in report["endpoints"].items():
+        old = (previous or {}).get("endpoints", {}).get(endpoint, {})
+        print(f"[{endpoint}] requests={stats['requests']} ok={stats['ok']} "
+              f"errors={stats['error_rate']:.2%} "
+              f"throughput={stats['throughput_rps']:.1f}/s"
+              f"{_delta(stats['throughput_rps'], old.get('throughput_rps'))}")
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            print(f"    {key[:-3]:>4} = {stats[key]:8.1f} ms{_delta(stats[key], old.get(key))}")
+        print(f"    statuses = {stats['statuses']}")
+    if previous:
+        print(f"\n(compared with {previous['commit']} at {previous['timestamp']})")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rps", type=float, default=10.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument(
+        "--endpoints", default="rag,recs", help="comma-separated subset of: rag,recs"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout (s)")
+    parser.add_argument(
+        "--openai-latency", default="lognormal:0.08,0.4", help="fake embeddings latency"
+    )
+    parser.add_argument(
+        "--gemini-latency", default="lognormal:0.6,0.5", help="fake Gemini latency"
+    )
+    parser.add_argument("--no-save", action="store_true", help="do not store results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {sorted(unknown)}")
+
+    questions = load_json(QUESTIONS_FILE)
+    profiles = load_json(PROFILES_FILE)
+    openai = FakeOpenAIServer(args.openai_latency).start()
+    gemini = FakeGeminiServer(args.gemini_latency).start()
+    workdir = tempfile.mkdtemp(prefix="shakers_bench_")
+    api = None
+    try:
+        env = build_env(prepare_data_dir(workdir), openai, gemini)
+        print("Building benchmark index...")
+        build_index(env)
+        port = free_port()
+        api = start_api(env, port, args.workers)
+        print(f"API ready on port {port}; running {args.duration:.0f}s at {args.rps} rps")
+
+        result = asyncio.run(
+            run_load(
+                f"http://127.0.0.1:{port}",
+                endpoints,
+                args.rps,
+                args.duration,
+                args.timeout,
+                questions,
+                profiles,
+            )
+        )
+    finally:
+        if api is not None:
+            api.terminate()
+            api.wait(timeout=10)
+        openai.stop()
+        gemini.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": git_commit(),
+        "config": {
+            "rps": args.rps,
+            "duration": args.duration,
+            "workers": args.workers,
+            "endpoints": endpoints,
+            "openai_latency": args.openai_latency,
+            "gemini_latency": args.gemini_latency,
+        },
+        "elapsed_seconds": result["elapsed"],
+        "endpoints": summarize(result["samples"], result["elapsed"]),
+    }
+    path = None if args.no_save else save_results(report)
+    print_report(report, load_previous(path) if path else load_previous(""))
+    if path:
+        print(f"Saved results to {path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+Micro-benchmarks for the retriever, recommender, cache and prompt hot paths.
+
+Usage:
+    python benchmarks/micro.py --kb-sizes 10,1000,10000 --history-lengths 0,10,100
+    python benchmarks/micro.py --kb-sizes 100000 --bench recommend,retrieve
+    python benchmarks/micro.py --compare benchmarks/results/micro_<old>.json
+    python benchmarks/micro.py --compare OLD.json NEW.json
+
+1. Benchmarks `recommend_resources`, `retrieve_fragments_openai`, `_load_from_cache`/
+   `_save_to_cache`, `get_user_history` and `llm_gemini.build_prompt` in-process.
+2. Synthetic data only: a random KB of N documents (doc matrix and Chroma index),
+   a stub embedder (no network calls) and a temporary SQLite DB with histories of
+   the requested lengths. The real index, caches and DB are never touched.
+3. Each case is timed with `timeit` autorange and reported per call (min/median/mean).
+4. Results are stored as JSON in benchmarks/results/ (tagged with the git commit);
+   `--compare` prints per-case median ratios against a previous run.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+from unittest import mock
+
+import numpy as np
+
+# Add project root to sys.path for absolute imports
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Provider clients are created at import time; no request is ever sent with these keys
+os.environ.setdefault("OPENAI_API_KEY", "micro-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "micro-benchmark")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+from langchain_community.vectorstores import Chroma
+from sqlmodel import Session, SQLModel, create_engine
+
+from backend.app import db
+from backend.app.services import llm_gemini, recommendations, retriever_openai
+from benchmarks.load_test import RESULTS_DIR, git_commit, load_json
+
+# Telemetry is disabled, but some posthog versions still log a failed send per client
+logging.getLogger("chromadb.telemetry.product.posthog").setLevel(logging.CRITICAL)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Defaults
+# ─────────────────────────────────────────────────────────────────────────────
+BENCHMARKS = ("recommend", "retrieve", "cache", "history", "prompt")
+EMBED_DIMENSIONS = 1536  # text-embedding-3-small
+CHUNKS_PER_DOC = 4  # synthetic chunks per document in the Chroma index
+CHUNK_CHARS = 800
+QUERY_NOISE = 0.5  # query = doc vector + noise, so hits stay within the threshold
+REGRESSION_THRESHOLD = 0.10
+SEED = 1234
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Synthetic data
+# ─────────────────────────────────────────────────────────────────────────────
+def _unit_rows(rng: np.random.Generator, rows: int, dims: int) -> np.ndarray:
+    matrix = rng.standard_normal((rows, dims)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def synthetic_doc_embeddings(n_docs: int, dims: int, seed: int = SEED) -> Dict[str, np.ndarray]:
+    """{doc name: unit vector}, shaped like recommendations.DOC_EMBEDDINGS."""
+    rng = np.random.default_rng(seed)
+    matrix = _unit_rows(rng, n_docs, dims).astype(float)
+    return {f"doc_{i:06d}.md": matrix[i] for i in range(n_docs)}
+
+
+def synthetic_history(docs: List[str], length: int, seed: int = SEED) -> List[Dict]:
+    """Chat history entries (as passed to recommend_resources) with 1-3 refs each."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "question": f"Synthetic question {i}",
+            "refs": [docs[j] for j in rng.choice(len(docs), size=min(len(docs), 1 + i % 3), replace=False)],
+        }
+        for i in range(length)
+    ]
+
+
+class StubEmbedder:
+    """Embedding function returning precomputed vectors (no provider calls)."""
+
+    def __init__(self, vectors: Dict[str, List[float]]):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.vectors[t] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors[text]
+
+
+def build_synthetic_index(persist_dir: str, n_docs: int, dims: int, seed: int = SEED) -> List[float]:
+    """
+    Persist a Chroma index with CHUNKS_PER_DOC overlapping chunks per document
+    (same metadata layout as create_chroma_index) and return a query vector
+    close to one of the chunks.
+    """
+    rng = np.random.default_rng(seed)
+    n_chunks = n_docs * CHUNKS_PER_DOC
+    matrix = _unit_rows(rng, n_chunks, dims)
+    step = CHUNK_CHARS - retriever_openai.CHUNK_OVERLAP
+    texts, metadatas, vectors = [], [], {}
+    for i in range(n_chunks):
+        doc, chunk_index = divmod(i, CHUNKS_PER_DOC)
+        text = f"chunk {i} of doc_{doc:06d} " + "x" * (CHUNK_CHARS - 32)
+        texts.append(text)
+        vectors[text] = matrix[i].tolist()
+        metadatas.append(
+            {
+                "source": f"doc_{doc:06d}.md",
+                "chunk_index": chunk_index,
+                "start_index": chunk_index * step,
+            }
+        )
+
+    store = Chroma(persist_directory=persist_dir, embedding_function=StubEmbedder(vectors))
+    batch = 5000  # below chromadb's maximum batch size
+    for start in range(0, n_chunks, batch):
+        store.add_texts(
+            texts[start : start + batch],
+            metadatas=metadatas[start : start + batch],
+            ids=[f"chunk_{i}" for i in range(start, min(start + batch, n_chunks))],
+        )
+
+    query = matrix[0] + QUERY_NOISE * _unit_rows(rng, 1, dims)[0]
+    return (query / np.linalg.norm(query)).tolist()
+
+
+def build_history_db(db_file: str, lengths: List[int]):
+    """Temporary SQLite DB holding one user "bench_<n>" with n entries per length."""
+    engine = create_engine(
+        f"sqlite:///{db_file}", echo=False, connect_args={"check_same_thread": False}
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for length in lengths:
+            session.add_all(
+                db.ChatEntry(
+                    user_id=f"bench_{length}",
+                    question=f"Synthetic question {i}",
+                    answer="Synthetic answer " * 20,
+                    references="payments.md,find_freelancer.md",
+                )
+                for i in range(length)
+            )
+            # Noise from other users, so the user_id filter has work to do
+            session.add_all(
+                db.ChatEntry(
+                    user_id=f"other_{length}", question="q", answer="a", references=""
+                )
+                for _ in range(length)
+            )
+        session.commit()
+    return engine
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Timing
+# ─────────────────────────────────────────────────────────────────────────────
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict:
+    """Per-call timings in microseconds (timeit autorange, then `repeat` rounds)."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    rounds = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "loops": number,
+        "min_us": min(rounds),
+        "median_us": statistics.median(rounds),
+        "mean_us": statistics.fmean(rounds),
+    }
+
+
+def _case(name: str, params: Dict, stats: Dict) -> Dict:
+    label = ",".join(f"{k}={v}" for k, v in params.items())
+    case = {"case": f"{name}[{label}]", "name": name, "params": params, **stats}
+    print(f"  {case['case']:<48} median={stats['median_us']:>12.1f} us  "
+          f"min={stats['min_us']:>12.1f} us  loops={stats['loops']}")
+    return case
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Benchmarks
+# ─────────────────────────────────────────────────────────────────────────────
+def bench_recommend(kb_sizes, history_lengths, dims, repeat, min_time) -> List[Dict]:
+    cases = []
+    query_emb = synthetic_doc_embeddings(1, dims, seed=SEED + 1)["doc_000000.md"].tolist()
+    for kb_size in kb_sizes:
+        docs = synthetic_doc_embeddings(kb_size, dims)
+        names = list(docs)
+        with mock.patch.object(recommendations, "DOC_EMBEDDINGS", docs), mock.patch.object(
+            recommendations, "get_openai_embedding", lambda _q: query_emb
+        ):
+            for length in history_lengths:
+                history = synthetic_history(names, length)
+                stats = measure(
+                    lambda: recommendations.recommend_resources(history, "query"),
+                    repeat,
+                    min_time,
+                )
+                cases.append(_case("recommend_resources", {"kb": kb_size, "history": length}, stats))
+    return cases
+
+
+def bench_retrieve(kb_sizes, workdir, dims, repeat, min_time) -> List[Dict]:
+    cases = []
+    for kb_size in kb_sizes:
+        persist_dir = os.path.join(workdir, f"chroma_{kb_size}")
+        print(f"  (building synthetic index: {kb_size} docs x {CHUNKS_PER_DOC} chunks)")
+        query_emb = build_synthetic_index(persist_dir, kb_size, dims)
+        with mock.patch.object(retriever_openai, "CHROMA_DB_DIR", persist_dir), mock.patch.object(
+            retriever_openai, "get_openai_embedding", lambda _q: query_emb
+        ):
+            hits = retriever_openai.retrieve_fragments_openai("query")
+            if not hits:
+                raise RuntimeError("Synthetic query fell outside DISTANCE_THRESHOLD")
+            stats = measure(
+                lambda: retriever_openai.retrieve_fragments_openai("query"), repeat, min_time
+            )
+        cases.append(_case("retrieve_fragments_openai", {"kb": kb_size, "k": 3}, stats))
+    return cases
+
+
+def bench_cache(workdir, dims, repeat, min_time) -> List[Dict]:
+    cache_dir = os.path.join(workdir, "embed_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    vector = synthetic_doc_embeddings(1, dims)["doc_000000.md"].tolist()
+    params = {"dims": dims}
+    with mock.patch.object(retriever_openai, "EMBED_CACHE_DIR", cache_dir):
+        cases = [
+            _case(
+                "_save_to_cache",
+                params,
+                measure(lambda: retriever_openai._save_to_cache("cached text", vector), repeat, min_time),
+            ),
+            _case(
+                "_load_from_cache",
+                {**params, "hit": True},
+                measure(lambda: retriever_openai._load_from_cache("cached text"), repeat, min_time),
+            ),
+            _case(
+                "_load_from_cache",
+                {**params, "hit": False},
+                measure(lambda: retriever_openai._load_from_cache("missing text"), repeat, min_time),
+            ),
+        ]
+    return cases
+
+
+def bench_history(history_lengths, workdir, repeat, min_time) -> List[Dict]:
+    engine = build_history_db(os.path.join(workdir, "history.db"), history_lengths)
+    cases = []
+    try:
+        with mock.patch.object(db, "engine", engine):
+            for length in history_lengths:
+                user_id = f"bench_{length}"
+                stats = measure(lambda: db.get_user_history(user_id), repeat, min_time)
+                cases.append(_case("get_user_history", {"history": length}, stats))
+    finally:
+        engine.dispose()
+    return cases
+
+
+def bench_prompt(snippet_counts, repeat, min_time) -> List[Dict]:
+    cases = []
+    for count in snippet_counts:
+        snippets = [f"Snippet body {i}\n" + "lorem ipsum " * (CHUNK_CHARS // 12) for i in range(count)]
+        stats = measure(
+            lambda: llm_gemini.build_prompt(snippets, "How do payments work?"), repeat, min_time
+        )
+        cases.append(_case("build_prompt", {"snippets": count}, stats))
+    return cases
+
+
+def run_benchmarks(
+    selected: List[str],
+    kb_sizes: List[int],
+    history_lengths: List[int],
+    snippet_counts: List[int],
+    dims: int = EMBED_DIMENSIONS,
+    repeat: int = 5,
+    min_time: float = 0.2,
+) -> List[Dict]:
+    workdir = tempfile.mkdtemp(prefix="shakers_micro_")
+    cases: List[Dict] = []
+    # Per-call INFO logs would dominate the timings; warnings still get through
+    logging.disable(logging.INFO)
+    try:
+        if "recommend" in selected:
+            print("recommend_resources")
+            cases += bench_recommend(kb_sizes, history_lengths, dims, repeat, min_time)
+        if "retrieve" in selected:
+            print("retrieve_fragments_openai")
+            cases += bench_retrieve(kb_sizes, workdir, dims, repeat, min_time)
+        if "cache" in selected:
+            print("embedding cache")
+            cases += bench_cache(workdir, dims, repeat, min_time)
+        if "history" in selected:
+            print("get_user_history")
+            cases += bench_history(history_lengths, workdir, repeat, min_time)
+        if "prompt" in selected:
+            print("build_prompt")
+            cases += bench_prompt(snippet_counts, repeat, min_time)
+    finally:
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return cases
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Results and comparison
+# ─────────────────────────────────────────────────────────────────────────────
+def save_results(report: Dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"micro_{report['timestamp'].replace(':', '').replace('-', '')}_{report['commit']}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare(old: Dict, new: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Median ratio new/old for every case present in both reports; cases slower
+    (faster) than the threshold are flagged as regressions (improvements).
+    """
+    old_cases = {c["case"]: c for c in old["cases"]}
+    rows = []
+    for case in new["cases"]:
+        before = old_cases.get(case["case"])
+        if before is None or not before["median_us"]:
+            continue
+        ratio = case["median_us"] / before["median_us"]
+        verdict = "regression" if ratio > 1 + threshold else (
+            "improvement" if ratio < 1 - threshold else "unchanged"
+        )
+        rows.append(
+            {
+                "case": case["case"],
+                "old_us": before["median_us"],
+                "new_us": case["median_us"],
+                "ratio": ratio,
+                "verdict": verdict,
+            }
+        )
+    return rows
+
+
+def print_comparison(old: Dict, new: Dict, rows: List[Dict]) -> None:
+    print(f"\n=== {old['commit']} -> {new['commit']} (median per call) ===")
+    for row in rows:
+        print(f"  {row['case']:<48} {row['old_us']:>12.1f} -> {row['new_us']:>12.1f} us "
+              f"x{row['ratio']:.2f}  {row['verdict']}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--bench", default=",".join(BENCHMARKS), help=f"comma-separated subset of: {','.join(BENCHMARKS)}"
+    )
+    parser.add_argument("--kb-sizes", type=_int_list, default=[10, 1000, 10000], help="synthetic KB sizes (docs)")
+    parser.add_argument("--history-lengths", type=_int_list, default=[0, 10, 100], help="chat history lengths")
+    parser.add_argument("--snippets", type=_int_list, default=[3, 10], help="snippets per prompt")
+    parser.add_argument("--dims", type=int, default=EMBED_DIMENSIONS, help="embedding dimensions")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per case")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument(
+        "--compare",
+        nargs="+",
+        metavar="JSON",
+        help="OLD [NEW]: compare two stored runs, or run now and compare against OLD",
+    )
+    parser.add_argument("--no-save", action="store_true", help="do not store results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare and len(args.compare) > 2:
+        raise SystemExit("--compare takes OLD or OLD NEW")
+    if args.compare and len(args.compare) == 2:
+        old, new = (load_json(p) for p in args.compare)
+        rows = compare(old, new)
+        print_comparison(old, new, rows)
+        return rows
+
+    selected = [b.strip() for b in args.bench.split(",") if b.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {sorted(unknown)}")
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": git_commit(),
+        "config": {
+            "bench": selected,
+            "kb_sizes": args.kb_sizes,
+            "history_lengths": args.history_lengths,
+            "snippets": args.snippets,
+            "dims": args.dims,
+            "repeat": args.repeat,
+            "min_time": args.min_time,
+        },
+        "cases": run_benchmarks(
+            selected,
+            args.kb_sizes,
+            args.history_lengths,
+            args.snippets,
+            dims=args.dims,
+            repeat=args.repeat,
+            min_time=args.min_time,
+        ),
+    }
+    path = None if args.no_save else save_results(report)
+    if path:
+        print(f"Saved results to {path}")
+    if args.compare:
+        old = load_json(args.compare[0])
+        print_comparison(old, report, compare(old, report))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Recall and storage of shortened / quantized embeddings against exact float32 search.
+
+Usage:
+    python benchmarks/quantization.py
+    python benchmarks/quantization.py --dims 0,512,256 --dtypes float32,float16,int8 --k 3
+    python benchmarks/quantization.py --synthetic 5000 --queries 200
+
+1. Vectors: the cached embeddings of the KB chunks and simulated questions
+   (no network calls; texts without a cached vector are skipped), or a synthetic
+   set whose variance decays along the dimensions like text-embedding-3 vectors.
+2. Each variant mirrors the retriever: the cache stores vectors as `dtype`, the index
+   holds their first `dims` values (re-normalized) and, when shortened, the top
+   k * oversample candidates are re-scored on the decoded full vectors.
+3. Reported per variant: cache bytes per vector, index bytes per vector, recall@k
+   against exact float32 search without and with re-scoring, and search latency.
+4. Results are stored as JSON in benchmarks/results/ (tagged with the git commit).
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Add project root to sys.path for absolute imports
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Provider clients are created at import time; no request is ever sent with these keys
+os.environ.setdefault("OPENAI_API_KEY", "quantization-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "quantization-benchmark")
+
+from backend.app.services import quantization, retriever_openai
+from benchmarks.load_test import QUESTIONS_FILE, RESULTS_DIR, git_commit, load_json
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Defaults
+# ─────────────────────────────────────────────────────────────────────────────
+DIMS = [0, 512, 256]  # 0 = full size
+DTYPES = list(quantization.DTYPES)
+SYNTHETIC_DIMENSIONS = 1536  # text-embedding-3-small
+SEED = 1234
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Vectors
+# ─────────────────────────────────────────────────────────────────────────────
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+
+def cached_vectors(questions_file: str = QUESTIONS_FILE) -> Tuple[np.ndarray, np.ndarray]:
+    """(chunk vectors, question vectors) found in the embedding cache."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+
+    docs = DirectoryLoader(
+        retriever_openai.KB_DIR, glob="*.md", loader_cls=TextLoader,
+        loader_kwargs={"encoding": "utf-8"},
+    ).load()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=retriever_openai.CHUNK_SIZE, chunk_overlap=retriever_openai.CHUNK_OVERLAP,
+        add_start_index=True,
+    )
+    texts = [c.page_content for c in splitter.split_documents(docs)]
+    texts += [q["question"] for q in load_json(questions_file)]
+    n_chunks = len(texts) - len(load_json(questions_file))
+
+    chunks, queries = [], []
+    for i, text in enumerate(texts):
+        vector = retriever_openai._load_from_cache(text)
+        if vector is not None:
+            (chunks if i < n_chunks else queries).append(vector)
+    if not chunks or not queries:
+        raise SystemExit("No cached embeddings found; run with --synthetic N instead")
+    return _normalize(np.asarray(chunks)), _normalize(np.asarray(queries))
+
+
+def synthetic_vectors(
+    n_docs: int, n_queries: int, dims: int = SYNTHETIC_DIMENSIONS, seed: int = SEED
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit vectors with most of their variance in the first dimensions; queries are
+    noisy copies of random documents."""
+    rng = np.random.default_rng(seed)
+    spread = 1.0 / np.sqrt(1.0 + np.arange(dims) / 64.0)
+    docs = rng.standard_normal((n_docs, dims)) * spread
+    picks = rng.integers(0, n_docs, n_queries)
+    queries = docs[picks] + 0.5 * rng.standard_normal((n_queries, dims)) * spread
+    return _normalize(docs), _normalize(queries)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Variants
+# ─────────────────────────────────────────────────────────────────────────────
+def _top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    distances = ((matrix - query) ** 2).sum(axis=1)
+    return np.argsort(distances, kind="stable")[:k]
+
+
+def _recall(found: List[np.ndarray], exact: List[np.ndarray]) -> float:
+    hits = sum(len(set(f.tolist()) & set(e.tolist())) for f, e in zip(found, exact))
+    return hits / max(1, sum(len(e) for e in exact))
+
+
+def run_variant(
+    docs: np.ndarray, queries: np.ndarray, dims: int, dtype: str, k: int, oversample: int
+) -> Dict:
+    full = docs.shape[1]
+    dims = full if not dims or dims >= full else dims
+    k = min(k, len(docs))
+    exact = [_top_k(docs, q, k) for q in queries]
+
+    stored = np.stack([quantization.decode(quantization.encode(v, dtype)) for v in docs])
+    index = quantization.shorten(stored, dims)
+    query_index = quantization.shorten(queries, dims)
+
+    t0 = time.perf_counter()
+    plain = [_top_k(index, q, k) for q in query_index]
+    search_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    rescored = plain
+    rescore_ms = search_ms
+    if dims < full:
+        t0 = time.perf_counter()
+        rescored = []
+        for q, qi in zip(queries, query_index):
+            candidates = _top_k(index, qi, k * oversample)
+            rescored.append(candidates[_top_k(stored[candidates], q, k)])
+        rescore_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    return {
+        "dims": dims,
+        "dtype": dtype,
+        "cache_bytes_per_vector": len(quantization.encode(docs[0], dtype)),
+        "index_bytes_per_vector": dims * 4,
+        "recall_at_k": _recall(plain, exact),
+        "recall_at_k_rescored": _recall(rescored, exact),
+        "search_ms": search_ms,
+        "rescored_search_ms": rescore_ms,
+    }
+
+
+def run_benchmark(
+    docs: np.ndarray, queries: np.ndarray, dims: List[int], dtypes: List[str], k: int,
+    oversample: int = retriever_openai.RESCORE_OVERSAMPLE,
+) -> List[Dict]:
+    return [run_variant(docs, queries, d, t, k, oversample) for d in dims for t in dtypes]
+
+
+def print_table(rows: List[Dict], k: int) -> None:
+    header = f"{'dims':>5} {'dtype':>8} {'cache_B':>8} {'index_B':>8} " \
+             f"{'recall@' + str(k):>9} {'rescored':>9} {'ms':>7} {'ms_rs':>7}"
+    print("\n" + header)
+    for r in rows:
+        print(f"{r['dims']:>5} {r['dtype']:>8} {r['cache_bytes_per_vector']:>8} "
+              f"{r['index_bytes_per_vector']:>8} {r['recall_at_k']:>9.2%} "
+              f"{r['recall_at_k_rescored']:>9.2%} {r['search_ms']:>7.3f} "
+              f"{r['rescored_search_ms']:>7.3f}")
+
+
+def save_results(report: Dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"quant_{report['timestamp'].replace(':', '').replace('-', '')}_{report['commit']}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def _list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dims", type=lambda v: [int(d) for d in _list(v)], default=DIMS)
+    parser.add_argument("--dtypes", type=_list, default=DTYPES)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--oversample", type=int, default=retriever_openai.RESCORE_OVERSAMPLE)
+    parser.add_argument("--synthetic", type=int, default=0, help="synthetic documents (0 = cached KB)")
+    parser.add_argument("--queries", type=int, default=100, help="synthetic queries")
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--no-save", action="store_true", help="do not store results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    if args.synthetic:
+        docs, queries = synthetic_vectors(args.synthetic, args.queries)
+    else:
+        docs, queries = cached_vectors(args.questions)
+
+    rows = run_benchmark(docs, queries, args.dims, args.dtypes, args.k, args.oversample)
+    print(f"{len(docs)} vectors, {len(queries)} queries, {docs.shape[1]} dimensions")
+    print_table(rows, args.k)
+    report = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": git_commit(),
+        "config": {
+            "source": f"synthetic:{args.synthetic}" if args.synthetic else "embed_cache",
+            "documents": len(docs),
+            "queries": len(queries),
+            "k": args.k,
+            "oversample": args.oversample,
+        },
+        "rows": rows,
+    }
+    if not args.no_save:
+        print(f"Saved results to {save_results(report)}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
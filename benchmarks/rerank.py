@@ -0,0 +1,256 @@
+"""
+Added latency of cross-encoder reranking against the prompt tokens it saves.
+
+Usage:
+    python benchmarks/rerank.py
+    python benchmarks/rerank.py --candidates 10 --top-n 1,2,3 --batch-size 16 --workers 2
+    python benchmarks/rerank.py --scorer overlap   # no model: measures the plumbing only
+
+1. Candidates: the KB chunks and simulated questions with a cached embedding (no network
+   calls; texts without a cached vector are skipped), searched exactly with numpy, so
+   only the reranking step differs between rows.
+2. Baseline row: the top --baseline-k chunks by distance, as the RAG endpoint sends
+   them without reranking. Rerank rows: --candidates chunks reranked, top N kept.
+3. Reported per row: reference recall against the expected sources, prompt tokens
+   (full Gemini prompt, estimated at ~4 characters per token) and tokens saved versus
+   the baseline, and the added rerank latency per query, cold (empty score cache)
+   and warm (repeated question).
+4. Results are stored as JSON in benchmarks/results/ (tagged with the git commit).
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add project root to sys.path for absolute imports
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Provider clients are created at import time; no request is ever sent with these keys
+os.environ.setdefault("OPENAI_API_KEY", "rerank-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "rerank-benchmark")
+
+from backend.app.config import RERANK_BATCH_SIZE, RERANK_CANDIDATES, RERANK_WORKERS
+from backend.app.services import retriever_openai, scope
+from backend.app.services.llm_gemini import build_prompt
+from backend.app.services.reranker import Reranker, load_cross_encoder
+from benchmarks.load_test import QUESTIONS_FILE, RESULTS_DIR, git_commit, load_json, percentile
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Defaults
+# ─────────────────────────────────────────────────────────────────────────────
+BASELINE_K = 3
+TOP_N = [1, 2, 3]
+CHARS_PER_TOKEN = 4
+
+Fragment = Tuple[str, float, str]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Candidates
+# ─────────────────────────────────────────────────────────────────────────────
+def cached_corpus(questions_file: str = QUESTIONS_FILE):
+    """(chunk texts, chunk sources, chunk vectors, questions with a cached vector)."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+
+    docs = DirectoryLoader(
+        retriever_openai.KB_DIR, glob="*.md", loader_cls=TextLoader,
+        loader_kwargs={"encoding": "utf-8"},
+    ).load()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=retriever_openai.CHUNK_SIZE, chunk_overlap=retriever_openai.CHUNK_OVERLAP,
+        add_start_index=True,
+    )
+    texts, sources, vectors = [], [], []
+    for chunk in splitter.split_documents(docs):
+        vector = retriever_openai._load_from_cache(chunk.page_content)
+        if vector is not None:
+            texts.append(chunk.page_content)
+            sources.append(os.path.basename(chunk.metadata.get("source", "unknown")))
+            vectors.append(vector)
+
+    questions = []
+    for entry in load_json(questions_file):
+        vector = retriever_openai._load_from_cache(entry["question"])
+        if vector is not None:
+            questions.append({**entry, "vector": np.asarray(vector, dtype=np.float32)})
+    if not texts or not questions:
+        raise SystemExit("No cached embeddings found for the KB and the simulated questions")
+    return texts, sources, np.asarray(vectors, dtype=np.float32), questions
+
+
+def nearest(
+    texts: List[str], sources: List[str], vectors: np.ndarray, query: np.ndarray, k: int
+) -> List[Fragment]:
+    """Top-k chunks by L2 distance, shaped like retrieve_fragments_openai's output."""
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return [(texts[i], float(distances[i]), sources[i]) for i in order]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scorers
+# ─────────────────────────────────────────────────────────────────────────────
+def overlap_scores(pairs: List[Tuple[str, str]]) -> List[float]:
+    """Share of the query's content stems found in the passage (dependency-free stand-in)."""
+    scores = []
+    for query, passage in pairs:
+        stems = scope.content_stems(query)
+        scores.append(len(stems & scope.content_stems(passage)) / max(1, len(stems)))
+    return scores
+
+
+def make_scorer(name: str):
+    if name == "overlap":
+        return overlap_scores
+    score_fn = load_cross_encoder()
+    if score_fn is None:
+        raise SystemExit("Cross-encoder unavailable (pip install sentence-transformers), "
+                         "or run with --scorer overlap")
+    return score_fn
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Benchmark
+# ─────────────────────────────────────────────────────────────────────────────
+def prompt_tokens(fragments: List[Fragment], question: str) -> int:
+    return len(build_prompt([t for (t, _, _) in fragments], question)) // CHARS_PER_TOKEN
+
+
+def reference_recall(fragments: List[Fragment], expected: List[str]) -> float:
+    if not expected:
+        return 1.0
+    return len(set(expected) & {src for (_, _, src) in fragments}) / len(expected)
+
+
+def _row(name: str, top_n: Optional[int], recalls, tokens, cold=None, warm=None) -> Dict:
+    row = {
+        "variant": name,
+        "top_n": top_n,
+        "reference_recall": sum(recalls) / len(recalls),
+        "prompt_tokens": sum(tokens) / len(tokens),
+    }
+    for label, seconds in (("added_ms_cold", cold), ("added_ms_warm", warm)):
+        if seconds is not None:
+            ms = sorted(s * 1000 for s in seconds)
+            row[label] = {"p50": percentile(ms, 0.50), "p95": percentile(ms, 0.95)}
+    return row
+
+
+def run_benchmark(
+    questions: List[Dict], retrieve, reranker: Reranker, candidates: int,
+    top_ns: List[int], baseline_k: int = BASELINE_K,
+) -> List[Dict]:
+    """
+    `retrieve(question, k)` returns fragments in distance order. One baseline row,
+    then one row per top N with the cold and warm rerank latency.
+    """
+    recalls, tokens = [], []
+    for q in questions:
+        fragments = retrieve(q, baseline_k)
+        recalls.append(reference_recall(fragments, q.get("references", [])))
+        tokens.append(prompt_tokens(fragments, q["question"]))
+    rows = [_row(f"distance top {baseline_k}", None, recalls, tokens)]
+
+    pools = {q["question"]: retrieve(q, candidates) for q in questions}
+    for top_n in top_ns:
+        reranker.clear_cache()
+        recalls, tokens = [], []
+        cold, warm = [], []
+        for q in questions:
+            question = q["question"]
+            for seconds in (cold, warm):
+                t0 = time.perf_counter()
+                kept = reranker.rerank(question, pools[question], top_n)
+                seconds.append(time.perf_counter() - t0)
+            recalls.append(reference_recall(kept, q.get("references", [])))
+            tokens.append(prompt_tokens(kept, question))
+        rows.append(_row(f"rerank {candidates}->{top_n}", top_n, recalls, tokens, cold, warm))
+
+    baseline_tokens = rows[0]["prompt_tokens"]
+    for row in rows:
+        row["tokens_saved"] = baseline_tokens - row["prompt_tokens"]
+    return rows
+
+
+def print_table(rows: List[Dict]) -> None:
+    print(f"\n{'variant':<18} {'recall':>7} {'tokens':>7} {'saved':>6} "
+          f"{'cold_p50':>9} {'cold_p95':>9} {'warm_p50':>9}")
+    for r in rows:
+        cold, warm = r.get("added_ms_cold"), r.get("added_ms_warm")
+        latency = (f"{cold['p50']:>9.2f} {cold['p95']:>9.2f} {warm['p50']:>9.2f}"
+                   if cold else f"{'-':>9} {'-':>9} {'-':>9}")
+        print(f"{r['variant']:<18} {r['reference_recall']:>7.2%} {r['prompt_tokens']:>7.0f} "
+              f"{r['tokens_saved']:>6.0f} {latency}")
+
+
+def save_results(report: Dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"rerank_{report['timestamp'].replace(':', '').replace('-', '')}_{report['commit']}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--candidates", type=int, default=RERANK_CANDIDATES)
+    parser.add_argument("--top-n", type=lambda v: [int(n) for n in v.split(",") if n.strip()],
+                        default=TOP_N)
+    parser.add_argument("--baseline-k", type=int, default=BASELINE_K)
+    parser.add_argument("--batch-size", type=int, default=RERANK_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=RERANK_WORKERS)
+    parser.add_argument("--scorer", choices=["cross-encoder", "overlap"], default="cross-encoder")
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--no-save", action="store_true", help="do not store results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    texts, sources, vectors, questions = cached_corpus(args.questions)
+    reranker = Reranker(
+        make_scorer(args.scorer), batch_size=args.batch_size, workers=args.workers
+    )
+    rows = run_benchmark(
+        questions, lambda q, k: nearest(texts, sources, vectors, q["vector"], k),
+        reranker, args.candidates, args.top_n, args.baseline_k,
+    )
+    print(f"{len(texts)} chunks, {len(questions)} questions, scorer={args.scorer}")
+    print_table(rows)
+    report = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": git_commit(),
+        "config": {
+            "scorer": args.scorer,
+            "chunks": len(texts),
+            "questions": len(questions),
+            "candidates": args.candidates,
+            "baseline_k": args.baseline_k,
+            "batch_size": args.batch_size,
+            "workers": args.workers,
+            "chars_per_token": CHARS_PER_TOKEN,
+        },
+        "rows": rows,
+    }
+    if not args.no_save:
+        print(f"Saved results to {save_results(report)}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Serialization and compression cost of each API response body.
+
+Usage:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --endpoints history_page,metrics_summary --repeat 7
+
+1. Payloads shaped like the real responses: a RAG answer, recommendations, a full
+   history page (HISTORY_PAGE_MAX entries), the NDJSON history stream, the metrics
+   summary and the readiness probe. Answer texts are taken from the KB documents so
+   they compress like real answers; nothing touches the network or the database.
+2. Every payload is encoded each way the API could encode it: FastAPI's default for
+   routes with a response_model (Pydantic straight to JSON bytes), Pydantic objects
+   dumped for orjson, `jsonable_encoder` + `json.dumps` (JSONResponse) and
+   `jsonable_encoder` + orjson (ORJSONResponse), or plain `json`/orjson for bodies
+   built by hand.
+3. The body is then compressed with gzip (COMPRESSION_GZIP_LEVEL) and, when the brotli
+   package is installed, brotli (COMPRESSION_BROTLI_QUALITY): time per call, size and
+   ratio, and whether the middleware compresses it at all (COMPRESSION_MIN_BYTES).
+4. Timings use micro.measure (per call, microseconds). Results are stored as JSON in
+   benchmarks/results/ (tagged with the git commit).
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+# Add project root to sys.path for absolute imports
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Provider clients are created at import time; no request is ever sent with these keys
+os.environ.setdefault("OPENAI_API_KEY", "serialization-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "serialization-benchmark")
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from backend.app.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_BYTES,
+    HISTORY_PAGE_MAX,
+)
+from backend.app.responses import brotli, dumps
+from backend.app.routers.history import HistoryItem, HistoryPage
+from backend.app.routers.metrics import live_metrics
+from backend.app.routers.rag import RAGResponse
+from backend.app.routers.recs import RecsResponse, SingleRec
+from benchmarks.load_test import KB_SOURCE_DIR, RESULTS_DIR, git_commit
+from benchmarks.micro import measure
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Defaults
+# ─────────────────────────────────────────────────────────────────────────────
+ENDPOINTS = ("rag", "recs", "history_page", "history_stream", "metrics_summary", "health")
+ANSWER_CHARS = 1200  # typical Gemini answer
+STREAM_ROWS = 500  # one history stream batch
+SEED = 1234
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Payloads
+# ─────────────────────────────────────────────────────────────────────────────
+def kb_texts(kb_dir: str = KB_SOURCE_DIR) -> List[str]:
+    texts = []
+    for path in sorted(glob.glob(os.path.join(kb_dir, "*.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts or ["Payments are held in escrow until the client approves the work. " * 40]
+
+
+def _snippet(rng: random.Random, texts: List[str], chars: int) -> str:
+    text = rng.choice(texts)
+    start = rng.randrange(max(len(text) - chars, 1))
+    return text[start:start + chars]
+
+
+def _history_items(rng: random.Random, texts: List[str], docs: List[str], n: int) -> List[HistoryItem]:
+    return [
+        HistoryItem(
+            id=i + 1,
+            q=_snippet(rng, texts, 80),
+            a=_snippet(rng, texts, ANSWER_CHARS),
+            refs=rng.sample(docs, min(2, len(docs))),
+        )
+        for i in range(n)
+    ]
+
+
+def build_payloads(texts: List[str], page_size: int = HISTORY_PAGE_MAX, seed: int = SEED) -> Dict:
+    """{endpoint: (kind, payload)}; kind "model" is a Pydantic response, "dict" a hand-built body."""
+    rng = random.Random(seed)
+    docs = [f"doc_{i}.md" for i in range(max(len(texts), 3))]
+    summary_path = os.path.join(PROJECT_ROOT, "evaluation", "metrics_summary.json")
+    summary = {}
+    if os.path.exists(summary_path):
+        with open(summary_path, "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    return {
+        "rag": ("model", RAGResponse(answer=_snippet(rng, texts, ANSWER_CHARS), references=docs[:3])),
+        "recs": ("model", RecsResponse(recommendations=[
+            SingleRec(doc=doc, reason=_snippet(rng, texts, 160)) for doc in docs[:3]
+        ])),
+        "history_page": ("model", HistoryPage(
+            user_id="u1", items=_history_items(rng, texts, docs, page_size), next_cursor=page_size,
+        )),
+        "history_stream": ("lines", _history_items(rng, texts, docs, STREAM_ROWS)),
+        "metrics_summary": ("dict", {**summary, "live": live_metrics()}),
+        "health": ("dict", {
+            "status": "ready", "pid": 1234, "checks": {"database": True, "index": True, "warmup": True},
+        }),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Encoders
+# ─────────────────────────────────────────────────────────────────────────────
+def encoders(kind: str, payload) -> Dict[str, Callable[[], bytes]]:
+    if kind == "model":
+        return {
+            "pydantic_json": lambda: payload.model_dump_json().encode("utf-8"),
+            "pydantic_orjson": lambda: dumps(payload.model_dump(mode="json")),
+            "jsonable_json": lambda: json.dumps(jsonable_encoder(payload)).encode("utf-8"),
+            "jsonable_orjson": lambda: dumps(jsonable_encoder(payload)),
+        }
+    if kind == "lines":
+        return {
+            "json": lambda: "".join(json.dumps(item.model_dump()) + "\n" for item in payload).encode("utf-8"),
+            "orjson": lambda: b"".join(dumps(item.model_dump()) + b"\n" for item in payload),
+        }
+    return {
+        "json": lambda: json.dumps(payload).encode("utf-8"),
+        "orjson": lambda: dumps(payload),
+        "jsonable_json": lambda: json.dumps(jsonable_encoder(payload)).encode("utf-8"),
+        "jsonable_orjson": lambda: dumps(jsonable_encoder(payload)),
+    }
+
+
+def compressors(gzip_level: int, brotli_quality: int) -> Dict[str, Callable[[bytes], bytes]]:
+    available = {"gzip": lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)}
+    if brotli is not None:
+        available["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    return available
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Benchmark
+# ─────────────────────────────────────────────────────────────────────────────
+def bench_endpoint(
+    name: str,
+    kind: str,
+    payload,
+    repeat: int,
+    min_time: float,
+    min_bytes: int = COMPRESSION_MIN_BYTES,
+    gzip_level: int = COMPRESSION_GZIP_LEVEL,
+    brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+) -> Dict:
+    encoded = {label: measure(fn, repeat, min_time) for label, fn in encoders(kind, payload).items()}
+    bodies = {label: fn() for label, fn in encoders(kind, payload).items()}
+    # Every encoder must produce the same document
+    parsed = [
+        [orjson.loads(line) for line in body.splitlines()] if kind == "lines" else orjson.loads(body)
+        for body in bodies.values()
+    ]
+    assert all(doc == parsed[0] for doc in parsed), f"{name}: encoders disagree"
+
+    body = min(bodies.values(), key=len)
+    compressed = {}
+    for label, compress in compressors(gzip_level, brotli_quality).items():
+        size = len(compress(body))
+        compressed[label] = {
+            **measure(lambda: compress(body), repeat, min_time),
+            "bytes": size,
+            "ratio": size / len(body),
+        }
+    fastest = min(encoded, key=lambda label: encoded[label]["median_us"])
+    return {
+        "endpoint": name,
+        "bytes": len(body),
+        "compressed_by_middleware": len(body) >= min_bytes,
+        "encode": encoded,
+        "fastest": fastest,
+        "compress": compressed,
+    }
+
+
+def run_benchmark(endpoints, repeat: int, min_time: float, page_size: int = HISTORY_PAGE_MAX) -> List[Dict]:
+    payloads = build_payloads(kb_texts(), page_size)
+    return [
+        bench_endpoint(name, *payloads[name], repeat=repeat, min_time=min_time)
+        for name in endpoints
+    ]
+
+
+def print_table(rows: List[Dict]) -> None:
+    for row in rows:
+        flag = "compressed" if row["compressed_by_middleware"] else "sent as-is"
+        print(f"\n{row['endpoint']}: {row['bytes']} bytes ({flag})")
+        for label, stats in row["encode"].items():
+            mark = " *" if label == row["fastest"] else ""
+            print(f"  {label:<18} {stats['median_us']:>10.1f} us{mark}")
+        for label, stats in row["compress"].items():
+            print(
+                f"  {label:<18} {stats['median_us']:>10.1f} us  "
+                f"{stats['bytes']} bytes ({stats['ratio']:.0%})"
+            )
+
+
+def save_results(report: Dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"serialization_{report['timestamp'].replace(':', '').replace('-', '')}_{report['commit']}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoints", type=lambda v: [e.strip() for e in v.split(",") if e.strip()],
+                        default=list(ENDPOINTS))
+    parser.add_argument("--page-size", type=int, default=HISTORY_PAGE_MAX)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--no-save", action="store_true", help="do not store results")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.endpoints) - set(ENDPOINTS))
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    rows = run_benchmark(args.endpoints, args.repeat, args.min_time, args.page_size)
+    print_table(rows)
+    report = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": git_commit(),
+        "config": {
+            "page_size": args.page_size,
+            "stream_rows": STREAM_ROWS,
+            "min_bytes": COMPRESSION_MIN_BYTES,
+            "gzip_level": COMPRESSION_GZIP_LEVEL,
+            "brotli_quality": COMPRESSION_BROTLI_QUALITY if brotli is not None else None,
+        },
+        "rows": rows,
+    }
+    if not args.no_save:
+        print(f"Saved results to {save_results(report)}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Parameter sweep over chunk size, chunk overlap and k for the OpenAI/Chroma retriever.
+
+Usage:
+    python benchmarks/sweep.py --chunk-sizes 400,800,1200 --overlaps 0,100,200 --ks 3,5
+    python benchmarks/sweep.py --workers 4 --keep-dir /tmp/shakers_sweep
+
+1. Builds one index per (chunk_size, overlap) variant, in parallel processes, with
+   `create_chroma_index`; chunk embeddings come from the shared embedding cache, so
+   only chunk texts never seen before are sent to OpenAI.
+2. Evaluates every variant and k against tests/simulated_data/test_questions.json
+   (recall@k, MRR, nDCG@k, as in `evaluate.py --retrieval-only`).
+3. Reports quality next to index size, build time and query latency, and marks the
+   Pareto-optimal settings (no other setting is better on nDCG, p50 latency and size).
+4. Stores the report in benchmarks/results/ (tagged with the git commit).
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Add project root to sys.path for absolute imports
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.load_test import QUESTIONS_FILE, RESULTS_DIR, git_commit, load_json
+from evaluation.evaluate import latency_stats, retrieval_metrics
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# One variant: build, measure, evaluate
+# ─────────────────────────────────────────────────────────────────────────────
+def _dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def run_variant(
+    chunk_size: int, overlap: int, ks: List[int], questions: List[Dict], index_dir: str
+) -> List[Dict]:
+    """
+    Build the index for one (chunk_size, overlap) variant in `index_dir` and
+    evaluate it for every k. Runs in a worker process.
+    """
+    from backend.app.services import retriever_openai
+
+    retriever_openai.CHROMA_DB_DIR = index_dir
+    start = time.perf_counter()
+    retriever_openai.create_chroma_index(
+        chunk_size=chunk_size, chunk_overlap=overlap, update_recommender=False
+    )
+    build_seconds = time.perf_counter() - start
+    n_chunks = len(retriever_openai.get_vector_store().get(include=[])["ids"])
+
+    rows = []
+    for k in ks:
+        # Warm-up: query embeddings come from the cache afterwards
+        for entry in questions:
+            retriever_openai.retrieve_fragments_openai(entry["question"], k=k)
+        scores, latencies = [], []
+        for entry in questions:
+            t0 = time.perf_counter()
+            fragments = retriever_openai.retrieve_fragments_openai(entry["question"], k=k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            ranked = list(dict.fromkeys(src for (_, _, src) in fragments))
+            scores.append(retrieval_metrics(ranked, set(entry.get("references", [])), k))
+        total = len(questions) or 1
+        latency = latency_stats(latencies)
+        rows.append(
+            {
+                "chunk_size": chunk_size,
+                "overlap": overlap,
+                "k": k,
+                "chunks": n_chunks,
+                "index_bytes": _dir_size(index_dir),
+                "build_seconds": build_seconds,
+                "recall_at_k": sum(s["recall"] for s in scores) / total,
+                "mrr": sum(s["rr"] for s in scores) / total,
+                "ndcg_at_k": sum(s["ndcg"] for s in scores) / total,
+                "p50_ms": latency.get("p50_ms", 0.0),
+                "p95_ms": latency.get("p95_ms", 0.0),
+            }
+        )
+    return rows
+
+
+def _run_variant_args(args) -> List[Dict]:
+    return run_variant(*args)
+
+
+def _init_worker() -> None:
+    # Per-query INFO logs from the retriever would flood the sweep output
+    logging.disable(logging.INFO)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sweep
+# ─────────────────────────────────────────────────────────────────────────────
+def mark_pareto(rows: List[Dict]) -> List[Dict]:
+    """
+    Flag rows not dominated by another one: higher-or-equal nDCG, lower-or-equal
+    p50 latency and index size, strictly better on at least one of them.
+    """
+
+    def dominates(a, b):
+        at_least = (
+            a["ndcg_at_k"] >= b["ndcg_at_k"]
+            and a["p50_ms"] <= b["p50_ms"]
+            and a["index_bytes"] <= b["index_bytes"]
+        )
+        strictly = (
+            a["ndcg_at_k"] > b["ndcg_at_k"]
+            or a["p50_ms"] < b["p50_ms"]
+            or a["index_bytes"] < b["index_bytes"]
+        )
+        return at_least and strictly
+
+    for row in rows:
+        row["pareto"] = not any(dominates(other, row) for other in rows if other is not row)
+    return rows
+
+
+def run_sweep(
+    chunk_sizes: List[int],
+    overlaps: List[int],
+    ks: List[int],
+    questions: List[Dict],
+    workdir: str,
+    workers: int = 2,
+) -> List[Dict]:
+    """Build and evaluate every valid variant; workers=1 runs in this process."""
+    variants = [(c, o) for c, o in itertools.product(chunk_sizes, overlaps) if o < c]
+    jobs = [
+        (c, o, ks, questions, os.path.join(workdir, f"chroma_c{c}_o{o}")) for c, o in variants
+    ]
+    if workers == 1:
+        results = [_run_variant_args(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as pool:
+            results = list(pool.map(_run_variant_args, jobs))
+    return mark_pareto([row for rows in results for row in rows])
+
+
+def print_table(rows: List[Dict]) -> None:
+    header = f"{'chunk':>6} {'ovlp':>5} {'k':>3} {'chunks':>7} {'size_kb':>9} {'build_s':>8} " \
+             f"{'recall':>7} {'mrr':>6} {'ndcg':>6} {'p50_ms':>8} {'p95_ms':>8}"
+    print("\n" + header)
+    for r in sorted(rows, key=lambda r: (-r["ndcg_at_k"], r["p50_ms"])):
+        print(f"{r['chunk_size']:>6} {r['overlap']:>5} {r['k']:>3} {r['chunks']:>7} "
+              f"{r['index_bytes'] / 1024:>9.0f} {r['build_seconds']:>8.1f} "
+              f"{r['recall_at_k']:>7.2%} {r['mrr']:>6.3f} {r['ndcg_at_k']:>6.3f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}{'  *' if r['pareto'] else ''}")
+    print("\n(* = Pareto-optimal on nDCG, p50 latency and index size)")
+
+
+def save_results(report: Dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"sweep_{report['timestamp'].replace(':', '').replace('-', '')}_{report['commit']}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[400, 800, 1200])
+    parser.add_argument("--overlaps", type=_int_list, default=[0, 100, 200])
+    parser.add_argument("--ks", type=_int_list, default=[3, 5])
+    parser.add_argument("--workers", type=int, default=2, help="parallel index builds")
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--keep-dir", default=None, help="keep the built indexes here")
+    parser.add_argument("--no-save", action="store_true", help="do not store results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    questions = load_json(args.questions)
+    workdir: Optional[str] = args.keep_dir or tempfile.mkdtemp(prefix="shakers_sweep_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        rows = run_sweep(
+            args.chunk_sizes, args.overlaps, args.ks, questions, workdir, args.workers
+        )
+    finally:
+        if not args.keep_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(rows)
+    report = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": git_commit(),
+        "config": {
+            "chunk_sizes": args.chunk_sizes,
+            "overlaps": args.overlaps,
+            "ks": args.ks,
+            "workers": args.workers,
+            "questions": os.path.relpath(args.questions, PROJECT_ROOT),
+        },
+        "rows": rows,
+    }
+    if not args.no_save:
+        print(f"Saved results to {save_results(report)}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
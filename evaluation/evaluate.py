@@ -3,17 +3,83 @@ Batch evaluation script for RAG and Recommendations services.
 
 Usage:
     python evaluation/evaluate.py
+    python evaluation/evaluate.py --concurrency 16 --timeout 30 --retries 3
+    python evaluation/evaluate.py --fresh        # ignore an existing checkpoint
+    python evaluation/evaluate.py --in-process --pool process --workers 4
+    python evaluation/evaluate.py --retrieval-only --k 5 --distance-threshold 1.1
+    python evaluation/evaluate.py --in-process --answer-cache
 
-Ensure your API server is running at http://127.0.0.1:8000 and you have:
+Ensure your API server is running at http://127.0.0.1:8000 (not needed with
+--in-process) and you have:
     - tests/simulated_data/test_questions.json
     - tests/simulated_data/user_profiles.json
+
+1. Async runner: up to `--concurrency` requests in flight, each with a timeout.
+2. Transient failures (timeouts, connection errors, 429/5xx) are retried with
+   exponential backoff; other HTTP errors are recorded and skipped.
+3. Every finished question/profile is appended to a checkpoint file, so an
+   interrupted run resumes where it stopped and only failed items are re-sent
+   (the checkpoint is removed once a run completes without errors).
+4. Latency statistics (p50/p95/p99/mean/max) are saved next to overlap/recall
+   in metrics_summary.json.
+5. --in-process calls the service functions directly (no server, no HTTP/JSON) on
+   a thread or process pool; each worker loads the index and the document
+   embeddings once. Chat entries are not written to the database in this mode.
+6. --retrieval-only skips the LLM and scores the retrieved sources against the
+   expected references (recall@k, MRR, nDCG@k), so retrieval parameters can be
+   swept in seconds. --answer-cache reuses Gemini answers for unchanged prompts
+   (keyed by prompt hash and model; set LLM_ANSWER_CACHE=true on the API server
+   for the same effect over HTTP).
 """
 
 import os
 import json
-import requests
+import math
+import time
+import sys
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 
 API_URL = "http://127.0.0.1:8000"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add project root to sys.path for the in-process mode (backend imports)
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+SUMMARY_FILE = os.path.join(SCRIPT_DIR, "metrics_summary.json")
+CHECKPOINT_FILE = os.path.join(SCRIPT_DIR, "eval_checkpoint.jsonl")
+
+# Runner defaults
+CONCURRENCY = 4
+REQUEST_TIMEOUT_SECONDS = 60.0
+MAX_RETRIES = 3
+RETRY_WAIT_MIN_SECONDS = 1.0
+RETRY_WAIT_MAX_SECONDS = 10.0
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+OUT_OF_SCOPE_ANSWER = "Sorry, I have no information on that."  # as in routers/rag.py
+
+# send(path, payload) -> response JSON; raises RequestFailed on non-retryable errors
+Sender = Callable[[str, Dict], Awaitable[Dict]]
+
+
+class TransientError(Exception):
+    """Retryable failure (timeout, connection error, 429/5xx)."""
+
+
+class RequestFailed(Exception):
+    """Non-retryable failure, or retries exhausted."""
 
 
 def load_json(path):
@@ -29,23 +95,242 @@ def word_overlap_ratio(ideal, generated):
     return len(s1 & s2) / len(s1)
 
 
-def evaluate_rag(questions):
+def latency_stats(latencies_ms: List[float]) -> Dict:
+    """Nearest-rank percentiles plus mean/max, in milliseconds."""
+    if not latencies_ms:
+        return {"count": 0}
+    values = sorted(latencies_ms)
+
+    def pct(q):
+        return values[max(1, math.ceil(q * len(values))) - 1]
+
+    return {
+        "count": len(values),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": sum(values) / len(values),
+        "max_ms": values[-1],
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Checkpointing
+# ─────────────────────────────────────────────────────────────────────────────
+class Checkpoint:
+    """
+    Append-only JSONL file of finished items: {"kind", "key", "result"}.
+    Each line is flushed as soon as the item finishes, so at most the requests
+    in flight are lost when a run is interrupted.
+    """
+
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        self.results: Dict[str, Dict[str, Dict]] = {}
+        if fresh:
+            self.clear()
+        elif os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # partially written last line
+                    self.results.setdefault(row["kind"], {})[row["key"]] = row["result"]
+
+    def done(self, kind: str) -> Dict[str, Dict]:
+        return self.results.get(kind, {})
+
+    def record(self, kind: str, key: str, result: Dict) -> None:
+        self.results.setdefault(kind, {})[key] = result
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": kind, "key": key, "result": result}) + "\n")
+
+    def clear(self, kind: Optional[str] = None) -> None:
+        """Forget every item (removing the file), or only the items of `kind`."""
+        if kind is not None:
+            self.results.pop(kind, None)
+        else:
+            self.results = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        for other_kind, items in list(self.results.items()):
+            for key, result in list(items.items()):
+                self.record(other_kind, key, result)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP sender with timeouts and retries
+# ─────────────────────────────────────────────────────────────────────────────
+def http_sender(client: httpx.AsyncClient, retries: int = MAX_RETRIES) -> Sender:
+    """POST JSON with retries on transient errors (exponential backoff)."""
+
+    async def attempt(path: str, payload: Dict) -> Dict:
+        try:
+            resp = await client.post(path, json=payload)
+        except httpx.TransportError as e:  # includes timeouts
+            raise TransientError(f"{type(e).__name__}: {e}") from e
+        if resp.status_code in TRANSIENT_STATUSES:
+            raise TransientError(f"HTTP {resp.status_code}")
+        if resp.status_code != 200:
+            raise RequestFailed(f"HTTP {resp.status_code}")
+        return resp.json()
+
+    async def send(path: str, payload: Dict) -> Dict:
+        try:
+            async for retry_state in AsyncRetrying(
+                stop=stop_after_attempt(retries + 1),
+                wait=wait_exponential(
+                    multiplier=RETRY_WAIT_MIN_SECONDS,
+                    min=RETRY_WAIT_MIN_SECONDS,
+                    max=RETRY_WAIT_MAX_SECONDS,
+                ),
+                retry=retry_if_exception_type(TransientError),
+                reraise=True,
+            ):
+                with retry_state:
+                    return await attempt(path, payload)
+        except TransientError as e:
+            raise RequestFailed(f"{e} (after {retries + 1} attempts)") from e
+
+    return send
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# In-process sender (service functions on a thread/process pool)
+# ─────────────────────────────────────────────────────────────────────────────
+def _init_worker(overrides: Optional[Dict] = None) -> None:
+    """
+    Load the services (index, embeddings, clients) once per worker and apply
+    the run's overrides ("answer_cache", "distance_threshold").
+    """
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    from backend.app.services import llm_gemini, recommendations, retriever_openai, scope  # noqa: F401
+
+    overrides = overrides or {}
+    if overrides.get("answer_cache"):
+        llm_gemini.ANSWER_CACHE_ENABLED = True
+    if overrides.get("distance_threshold") is not None:
+        scope.DISTANCE_THRESHOLD = overrides["distance_threshold"]
+    retriever_openai.get_vector_store()
+
+
+def _rag_inprocess(payload: Dict) -> Dict:
+    """Same answer/references as POST /rag/query, without persisting the entry."""
+    from backend.app.services.llm_gemini import generate_answer_with_references_gemini
+    from backend.app.services.rag_pipeline import references, retrieve_context, snippet_texts
+
+    fragments = retrieve_context(payload["query"])
+    if not fragments:
+        return {"answer": OUT_OF_SCOPE_ANSWER, "references": []}
+    output = generate_answer_with_references_gemini(snippet_texts(fragments), payload["query"])
+    return {"answer": output.get("answer", "").strip(), "references": references(fragments)}
+
+
+def _recs_inprocess(payload: Dict) -> Dict:
+    """Same recommendations as POST /recs/personalized (seen documents read from the DB)."""
+    from backend.app.db import get_archived_docs, get_seen_references
+    from backend.app.services.recommendations import recommend_resources
+
+    history = [{"refs": refs} for refs in get_seen_references(payload["user_id"])]
+    archived_docs = get_archived_docs(payload["user_id"])
+    if archived_docs:
+        history.append({"refs": archived_docs})
+    recs = recommend_resources(
+        chat_history=history, current_query=payload["current_query"], k=3, alpha=0.6
+    )
+    return {"recommendations": recs}
+
+
+def _retrieval_inprocess(payload: Dict) -> Dict:
+    """Ranked unique sources (best first) and distances, no LLM call."""
+    from backend.app.services.retriever_openai import retrieve_fragments_openai
+
+    fragments = retrieve_fragments_openai(payload["query"], k=payload["k"])
+    return {
+        "sources": list(dict.fromkeys(src for (_, _, src) in fragments)),
+        "distances": [dist for (_, dist, _) in fragments],
+    }
+
+
+INPROCESS_HANDLERS = {
+    "/rag/query": _rag_inprocess,
+    "/recs/personalized": _recs_inprocess,
+    "retrieval": _retrieval_inprocess,
+}
+
+
+def make_executor(pool: str, workers: int, overrides: Optional[Dict] = None) -> Executor:
+    """Thread pool (shared index) or process pool (one index per process)."""
+    if pool == "process":
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(overrides,),
+        )
+    _init_worker(overrides)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eval")
+
+
+def inprocess_sender(executor: Executor, timeout: float = REQUEST_TIMEOUT_SECONDS) -> Sender:
+    """Run the handler for `path` on the executor; any failure is final."""
+
+    async def send(path: str, payload: Dict) -> Dict:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, INPROCESS_HANDLERS[path], payload)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError as e:
+            raise RequestFailed(f"timed out after {timeout:.0f}s") from e
+        except Exception as e:
+            raise RequestFailed(f"{type(e).__name__}: {e}") from e
+
+    return send
+
+
+async def _run_all(items, key_fn, run_fn, kind: str, checkpoint: Checkpoint, concurrency: int):
+    """Run `run_fn` over items not yet in the checkpoint, `concurrency` at a time."""
+    done = checkpoint.done(kind)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        key = str(key_fn(item))
+        if key in done:
+            return done[key]
+        async with semaphore:
+            result = await run_fn(item)
+        if "error" not in result:  # failed items are retried on resume
+            checkpoint.record(kind, key, result)
+        return result
+
+    return await asyncio.gather(*(one(item) for item in items))
+
+
+async def _timed_send(send: Sender, path: str, payload: Dict):
+    start = time.perf_counter()
+    data = await send(path, payload)
+    return data, (time.perf_counter() - start) * 1000
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RAG evaluation
+# ─────────────────────────────────────────────────────────────────────────────
+async def evaluate_rag(questions, send: Sender, checkpoint: Checkpoint, concurrency=CONCURRENCY):
     print("\n=== RAG Evaluation ===")
     total = len(questions)
-    overlap_scores = []
-    reference_recalls = []
 
-    for entry in questions:
+    async def run(entry):
         qid = entry["id"]
-        resp = requests.post(
-            f"{API_URL}/rag/query",
-            json={"user_id": f"eval_{qid}", "query": entry["question"]},
-        )
-        if resp.status_code != 200:
-            print(f"QID {qid}: HTTP {resp.status_code}")
-            continue
+        try:
+            data, latency_ms = await _timed_send(
+                send, "/rag/query", {"user_id": f"eval_{qid}", "query": entry["question"]}
+            )
+        except RequestFailed as e:
+            print(f"QID {qid}: {e}")
+            return {"error": str(e)}
 
-        data = resp.json()
         overlap = word_overlap_ratio(
             entry.get("ideal_answer", ""), data.get("answer", "")
         )
@@ -53,85 +338,280 @@ def evaluate_rag(questions):
         recall = 0.0
         if ideal_refs:
             recall = len(set(data.get("references", [])) & ideal_refs) / len(ideal_refs)
+        print(f"[RAG] QID {qid}: overlap={overlap:.2%}, recall={recall:.2%}, {latency_ms:.0f} ms")
+        return {"overlap": overlap, "recall": recall, "latency_ms": latency_ms}
 
-        overlap_scores.append(overlap)
-        reference_recalls.append(recall)
-        print(f"[RAG] QID {qid}: overlap={overlap:.2%}, recall={recall:.2%}")
+    results = await _run_all(questions, lambda e: e["id"], run, "rag", checkpoint, concurrency)
+    ok = [r for r in results if "error" not in r]
 
-    avg_overlap = sum(overlap_scores) / total if total else 0.0
-    avg_recall = sum(reference_recalls) / total if total else 0.0
+    avg_overlap = sum(r["overlap"] for r in ok) / total if total else 0.0
+    avg_recall = sum(r["recall"] for r in ok) / total if total else 0.0
+    latency = latency_stats([r["latency_ms"] for r in ok])
     print(
-        f"\nRAG Summary: Total={total}, "
-        f"AvgOverlap={avg_overlap:.2%}, AvgRecall={avg_recall:.2%}\n"
+        f"\nRAG Summary: Total={total}, Errors={total - len(ok)}, "
+        f"AvgOverlap={avg_overlap:.2%}, AvgRecall={avg_recall:.2%}, "
+        f"p50={latency.get('p50_ms', 0):.0f} ms, p95={latency.get('p95_ms', 0):.0f} ms\n"
     )
-    return {"total": total, "avg_overlap": avg_overlap, "avg_recall": avg_recall}
+    return {
+        "total": total,
+        "errors": total - len(ok),
+        "avg_overlap": avg_overlap,
+        "avg_recall": avg_recall,
+        "latency": latency,
+    }
 
 
-def evaluate_recs(profiles, default_query):
+# ─────────────────────────────────────────────────────────────────────────────
+# Recommendations evaluation
+# ─────────────────────────────────────────────────────────────────────────────
+async def evaluate_recs(
+    profiles, default_query, send: Sender, checkpoint: Checkpoint, concurrency=CONCURRENCY
+):
     print("\n=== Recommendations Evaluation ===")
-    recommendation_counts = []
-    unique_document_counts = []
+    total_users = len(profiles)
 
-    for profile in profiles:
+    async def run(profile):
         user_id = profile["user_id"]
         history = profile.get("history", [])
         current_query = history[-1]["q"] if history else default_query
+        try:
+            data, latency_ms = await _timed_send(
+                send,
+                "/recs/personalized",
+                {"user_id": user_id, "current_query": current_query},
+            )
+        except RequestFailed as e:
+            print(f"[Recs] User {user_id}: {e}")
+            return {"error": str(e)}
 
-        resp = requests.post(
-            f"{API_URL}/recs/personalized",
-            json={"user_id": user_id, "current_query": current_query},
-        )
-        if resp.status_code != 200:
-            print(f"[Recs] User {user_id}: HTTP {resp.status_code}")
-            continue
+        docs = [r["doc"] for r in data.get("recommendations", [])]
+        print(f"[Recs] {user_id}: recs={len(docs)}, unique={len(set(docs))}, {latency_ms:.0f} ms")
+        return {"recs": len(docs), "unique": len(set(docs)), "latency_ms": latency_ms}
 
-        recs = resp.json().get("recommendations", [])
-        docs = [r["doc"] for r in recs]
+    results = await _run_all(
+        profiles, lambda p: p["user_id"], run, "recs", checkpoint, concurrency
+    )
+    ok = [r for r in results if "error" not in r]
 
-        recommendation_counts.append(len(docs))
-        unique_document_counts.append(len(set(docs)))
-        print(f"[Recs] {user_id}: recs={len(docs)}, unique={len(set(docs))}")
+    avg_recs = sum(r["recs"] for r in ok) / total_users if total_users else 0.0
+    avg_unique = sum(r["unique"] for r in ok) / total_users if total_users else 0.0
+    latency = latency_stats([r["latency_ms"] for r in ok])
+    print(
+        f"\nRecs Summary: Users={total_users}, Errors={total_users - len(ok)}, "
+        f"AvgRecs={avg_recs:.2f}, AvgUnique={avg_unique:.2f}, "
+        f"p50={latency.get('p50_ms', 0):.0f} ms\n"
+    )
+    return {
+        "total_users": total_users,
+        "errors": total_users - len(ok),
+        "avg_recs": avg_recs,
+        "avg_unique": avg_unique,
+        "latency": latency,
+    }
 
-    total_users = len(profiles)
-    avg_recs = sum(recommendation_counts) / total_users if total_users else 0.0
-    avg_unique = sum(unique_document_counts) / total_users if total_users else 0.0
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Retrieval-only evaluation
+# ─────────────────────────────────────────────────────────────────────────────
+def retrieval_metrics(ranked: List[str], relevant: Set[str], k: int) -> Dict:
+    """recall@k, reciprocal rank and nDCG@k (binary relevance) of ranked sources."""
+    ranked = ranked[:k]
+    if not relevant:
+        return {"recall": 0.0, "rr": 0.0, "ndcg": 0.0}
+    hits = [doc in relevant for doc in ranked]
+    recall = sum(hits) / len(relevant)
+    rr = next((1.0 / rank for rank, hit in enumerate(hits, start=1) if hit), 0.0)
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, hit in enumerate(hits, start=1) if hit)
+    idcg = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return {"recall": recall, "rr": rr, "ndcg": dcg / idcg}
+
+
+def retrieval_checkpoint_kind(k: int, distance_threshold: Optional[float]) -> str:
+    return f"retrieval:k={k},threshold={distance_threshold}"
+
+
+async def evaluate_retrieval(
+    questions, send: Sender, checkpoint: Checkpoint, k: int = 3, concurrency=CONCURRENCY,
+    distance_threshold: Optional[float] = None,
+):
+    print(f"\n=== Retrieval Evaluation (k={k}) ===")
+    total = len(questions)
+
+    async def run(entry):
+        qid = entry["id"]
+        try:
+            data, latency_ms = await _timed_send(
+                send, "retrieval", {"query": entry["question"], "k": k}
+            )
+        except RequestFailed as e:
+            print(f"QID {qid}: {e}")
+            return {"error": str(e)}
+        scores = retrieval_metrics(data["sources"], set(entry.get("references", [])), k)
+        print(
+            f"[Retrieval] QID {qid}: recall={scores['recall']:.2%}, "
+            f"rr={scores['rr']:.2f}, ndcg={scores['ndcg']:.2f}, {latency_ms:.1f} ms"
+        )
+        return {**scores, "out_of_scope": not data["sources"], "latency_ms": latency_ms}
+
+    # Results depend on the retrieval parameters, so they are checkpointed per setting
+    kind = retrieval_checkpoint_kind(k, distance_threshold)
+    results = await _run_all(questions, lambda e: e["id"], run, kind, checkpoint, concurrency)
+    ok = [r for r in results if "error" not in r]
+
+    summary = {
+        "total_queries": total,
+        "errors": total - len(ok),
+        "k": k,
+        "distance_threshold": distance_threshold,
+        "recall_at_k": sum(r["recall"] for r in ok) / total if total else 0.0,
+        "mrr": sum(r["rr"] for r in ok) / total if total else 0.0,
+        "ndcg_at_k": sum(r["ndcg"] for r in ok) / total if total else 0.0,
+        "out_of_scope": sum(r["out_of_scope"] for r in ok),
+        "latency": latency_stats([r["latency_ms"] for r in ok]),
+    }
     print(
-        f"\nRecs Summary: Users={total_users}, "
-        f"AvgRecs={avg_recs:.2f}, AvgUnique={avg_unique:.2f}\n"
+        f"\nRetrieval Summary: Total={total}, Errors={summary['errors']}, "
+        f"Recall@{k}={summary['recall_at_k']:.2%}, MRR={summary['mrr']:.3f}, "
+        f"nDCG@{k}={summary['ndcg_at_k']:.3f}, OutOfScope={summary['out_of_scope']}\n"
     )
-    return {"total_users": total_users, "avg_recs": avg_recs, "avg_unique": avg_unique}
+    return summary
+
+
+def save_retrieval_summary(summary: dict, path: str = SUMMARY_FILE):
+    """Store the summary under "retrieval", keeping the RAG/Recs sections."""
+    out = load_json(path) if os.path.exists(path) else {}
+    out["retrieval"] = summary
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    print(f"Saved retrieval metrics to {path}")
 
 
-def save_summary(rag_summary: dict, recs_summary: dict):
+def save_summary(rag_summary: dict, recs_summary: dict, path: str = SUMMARY_FILE):
     # Saving JSON
-    script_dir = os.path.dirname(__file__)
     out = {
         "rag": {
             "total_queries": rag_summary["total"],
+            "errors": rag_summary["errors"],
             "avg_overlap": rag_summary["avg_overlap"],
             "avg_recall": rag_summary["avg_recall"],
+            "latency": rag_summary["latency"],
         },
         "recs": {
             "total_users": recs_summary["total_users"],
+            "errors": recs_summary["errors"],
             "avg_recs": recs_summary["avg_recs"],
             "avg_unique": recs_summary["avg_unique"],
+            "latency": recs_summary["latency"],
         },
     }
-    path = os.path.join(script_dir, "metrics_summary.json")
+    # Keep the last retrieval-only results, if any
+    if os.path.exists(path):
+        previous = load_json(path)
+        if "retrieval" in previous:
+            out["retrieval"] = previous["retrieval"]
     with open(path, "w", encoding="utf-8") as f:
         json.dump(out, f, indent=2)
     print(f"Saved metrics summary to {path}")
 
 
-if __name__ == "__main__":
-    base = os.path.dirname(__file__)
-    qs_path = os.path.join(base, "../tests/simulated_data/test_questions.json")
-    pf_path = os.path.join(base, "../tests/simulated_data/user_profiles.json")
+async def run_evaluation(
+    questions,
+    profiles,
+    default_query: str,
+    send: Sender,
+    checkpoint: Checkpoint,
+    concurrency: int = CONCURRENCY,
+    summary_path: Optional[str] = SUMMARY_FILE,
+):
+    rag = await evaluate_rag(questions, send, checkpoint, concurrency)
+    recs = await evaluate_recs(profiles, default_query, send, checkpoint, concurrency)
+    if summary_path:
+        save_summary(rag, recs, summary_path)
+    # Completed run: the next one starts from scratch (failed items keep it alive)
+    if not rag["errors"] and not recs["errors"]:
+        checkpoint.clear()
+    return rag, recs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch evaluation of the RAG and Recs services")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT_SECONDS, help="seconds per request")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES, help="retries on transient errors")
+    parser.add_argument("--fresh", action="store_true", help="discard an existing checkpoint")
+    parser.add_argument(
+        "--in-process", action="store_true", help="call the services directly instead of the API"
+    )
+    parser.add_argument("--pool", choices=("thread", "process"), default="thread", help="in-process pool")
+    parser.add_argument("--workers", type=int, default=None, help="in-process workers (default: concurrency)")
+    parser.add_argument(
+        "--retrieval-only", action="store_true", help="score retrieval only (recall/MRR/nDCG), no LLM"
+    )
+    parser.add_argument("--k", type=int, default=3, help="fragments retrieved per question")
+    parser.add_argument(
+        "--distance-threshold", type=float, default=None, help="override the retriever's threshold"
+    )
+    parser.add_argument(
+        "--answer-cache", action="store_true", help="reuse Gemini answers for unchanged prompts"
+    )
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    qs_path = os.path.join(SCRIPT_DIR, "../tests/simulated_data/test_questions.json")
+    pf_path = os.path.join(SCRIPT_DIR, "../tests/simulated_data/user_profiles.json")
 
     questions = load_json(qs_path)
     profiles = load_json(pf_path)
     default_q = "How do payments work on Shakers?"
 
-    rag = evaluate_rag(questions)
-    recs = evaluate_recs(profiles, default_q)
-    save_summary(rag, recs)
+    checkpoint = Checkpoint(CHECKPOINT_FILE, fresh=args.fresh)
+    if checkpoint.results:
+        print(f"Resuming from {CHECKPOINT_FILE}")
+
+    overrides = {
+        "answer_cache": args.answer_cache,
+        "distance_threshold": args.distance_threshold,
+    }
+    if args.retrieval_only:
+        with make_executor(args.pool, args.workers or args.concurrency, overrides) as executor:
+            summary = await evaluate_retrieval(
+                questions,
+                inprocess_sender(executor, timeout=args.timeout),
+                checkpoint,
+                k=args.k,
+                concurrency=args.concurrency,
+                distance_threshold=args.distance_threshold,
+            )
+        save_retrieval_summary(summary)
+        if not summary["errors"]:
+            checkpoint.clear(retrieval_checkpoint_kind(args.k, args.distance_threshold))
+        return
+
+    if args.in_process:
+        with make_executor(args.pool, args.workers or args.concurrency, overrides) as executor:
+            await run_evaluation(
+                questions,
+                profiles,
+                default_q,
+                inprocess_sender(executor, timeout=args.timeout),
+                checkpoint,
+                concurrency=args.concurrency,
+            )
+        return
+
+    async with httpx.AsyncClient(base_url=args.api_url, timeout=args.timeout) as client:
+        await run_evaluation(
+            questions,
+            profiles,
+            default_q,
+            http_sender(client, retries=args.retries),
+            checkpoint,
+            concurrency=args.concurrency,
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
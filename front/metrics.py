@@ -3,7 +3,8 @@ Streamlit Metrics Dashboard module displaying evaluation results.
 
 1. Custom CSS styling for a cohesive dark-green theme and responsive layout.
 2. Base64-embedded logo for self-contained asset delivery.
-3. Dynamic loading and error handling for the metrics JSON file.
+3. Loads metrics from the API (`/metrics/summary`, revalidated with its ETag so an
+   unchanged summary costs an empty 304), falling back to the local JSON file.
 4. Structured display of RAG and recommendation metrics using Streamlit columns.
 5. Clear separation of UI sections (header, RAG metrics, recommendation metrics).
 """
@@ -11,8 +12,11 @@ Streamlit Metrics Dashboard module displaying evaluation results.
 import os
 import json
 import base64
+import requests
 import streamlit as st
 
+BACKEND_URL = os.getenv("SHAKERS_BACKEND_URL", "http://localhost:8000")
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 1) STREAMLIT PAGE CONFIGURATION
 # ─────────────────────────────────────────────────────────────────────────────
@@ -69,14 +73,35 @@ st.markdown(
 # ─────────────────────────────────────────────────────────────────────────────
 # 4) LOAD METRICS JSON
 # ─────────────────────────────────────────────────────────────────────────────
-metrics_path = os.path.join(os.getcwd(), "evaluation", "metrics_summary.json")
-if not os.path.exists(metrics_path):
+def load_metrics():
+    """Metrics from the API (conditional GET with the cached ETag), else from the file."""
+    cached = st.session_state.get("metrics_cache")
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    try:
+        resp = requests.get(f"{BACKEND_URL}/metrics/summary", headers=headers, timeout=5)
+        if resp.status_code == 304 and cached:
+            return cached["data"]
+        if resp.status_code == 200:
+            st.session_state["metrics_cache"] = {
+                "etag": resp.headers.get("ETag"),
+                "data": resp.json(),
+            }
+            return st.session_state["metrics_cache"]["data"]
+    except requests.RequestException:
+        pass
+
+    metrics_path = os.path.join(os.getcwd(), "evaluation", "metrics_summary.json")
+    if not os.path.exists(metrics_path):
+        return None
+    with open(metrics_path, "r", encoding="utf-8") as mf:
+        return json.load(mf)
+
+
+m = load_metrics()
+if m is None:
     st.error("Metrics summary not found. Run evaluation/evaluate.py first.")
     st.stop()
 
-with open(metrics_path, "r", encoding="utf-8") as mf:
-    m = json.load(mf)
-
 # ─────────────────────────────────────────────────────────────────────────────
 # 5) DISPLAY RAG METRICS
 # ─────────────────────────────────────────────────────────────────────────────
@@ -125,3 +150,34 @@ for col, title, value in [
         )
 
 st.markdown('<hr class="divider"/>', unsafe_allow_html=True)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 7) DISPLAY LIVE SERVICE METRICS (only when served by the API)
+# ─────────────────────────────────────────────────────────────────────────────
+live = m.get("live")
+if live:
+    st.subheader("Live Service Metrics (since server start)")
+    latencies = live.get("avg_latency_ms", {})
+    oos = live.get("out_of_scope_rate")
+    emb_hit = live.get("cache_hit_rate", {}).get("embedding")
+    col7, col8, col9 = st.columns(3, gap="large")
+    for col, title, value in [
+        (col7, "Queries Served", live.get("queries_served", 0)),
+        (col8, "Out-of-Scope Rate", f"{oos * 100:.1f}%" if oos is not None else "–"),
+        (col9, "Embedding Cache Hits", f"{emb_hit * 100:.1f}%" if emb_hit is not None else "–"),
+    ]:
+        with col:
+            st.markdown(
+                f"""
+                <div class="metric-bubble">
+                  <p class="metric-title">{title}</p>
+                  <p class="metric-value">{value}</p>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+    if latencies:
+        st.markdown(
+            "Average latency: "
+            + ", ".join(f"`{endpoint}` {ms:.0f} ms" for endpoint, ms in latencies.items())
+        )
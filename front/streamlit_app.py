@@ -26,6 +26,8 @@ st.set_page_config(
 # 2) BACKEND URL
 # ─────────────────────────────────────────────────────────────────────────────
 BACKEND_URL = os.getenv("SHAKERS_BACKEND_URL", "http://localhost:8000")
+# Entries fetched per page of the chat history expander
+HISTORY_WINDOW = 10
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 3) LOGO BASE64
@@ -232,6 +234,8 @@ if "username" not in st.session_state:
     st.session_state.username = ""
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "history_cursor" not in st.session_state:
+    st.session_state.history_cursor = None
 if "current_a" not in st.session_state:
     st.session_state.current_a = ""
 if "current_refs" not in st.session_state:
@@ -245,6 +249,33 @@ def strip_inline_refs(text: str) -> str:
     return text if idx == -1 else text[:idx].rstrip()
 
 
+def fetch_history(cursor=None):
+    """
+    One page of the user's history (read newest first, returned oldest first like the
+    chat history) and the cursor of the next, older page; None if /history fails.
+    """
+    try:
+        r = requests.get(
+            f"{BACKEND_URL}/history/{st.session_state.username}",
+            params={"limit": HISTORY_WINDOW, "cursor": cursor, "order": "desc"},
+            timeout=8,
+        )
+        r.raise_for_status()
+        data = r.json()
+    except requests.RequestException:
+        return None
+    return data.get("items", [])[::-1], data.get("next_cursor")
+
+
+def load_recent_history() -> bool:
+    """Replace the chat history by the latest page; False (history kept) on failure."""
+    page = fetch_history()
+    if page is None:
+        return False
+    st.session_state.chat_history, st.session_state.history_cursor = page
+    return True
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 6) HANDLERS
 # ─────────────────────────────────────────────────────────────────────────────
@@ -252,11 +283,13 @@ def handle_login():
     u = st.session_state.input_username.strip()
     if u:
         st.session_state.username = u
+        load_recent_history()
 
 
 def handle_logout():
     st.session_state.username = ""
     st.session_state.chat_history = []
+    st.session_state.history_cursor = None
     st.session_state.current_a = ""
     st.session_state.current_refs = []
     st.session_state.recs_history = []
@@ -277,11 +310,16 @@ def handle_send():
         data = r.json()
         answer = data.get("answer", "")
         refs = data.get("references", [])
+        saved = True
     except:
         answer, refs = " Error: Could not contact RAG service.", []
+        saved = False
     st.session_state.current_a = answer
     st.session_state.current_refs = refs
-    st.session_state.chat_history.append({"q": q, "a": answer, "refs": refs})
+    # Only the latest window is re-read (older pages load on demand); if the entry was
+    # not saved or /history is unavailable, it is appended locally as before
+    if not saved or not load_recent_history():
+        st.session_state.chat_history.append({"q": q, "a": answer, "refs": refs})
 
     # Personalized recs
     try:
@@ -300,6 +338,14 @@ def handle_send():
     st.session_state.input_question = ""
 
 
+def handle_load_older():
+    page = fetch_history(st.session_state.history_cursor)
+    if page is not None:
+        items, cursor = page
+        st.session_state.chat_history = items + st.session_state.chat_history
+        st.session_state.history_cursor = cursor
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 7) LOGIN SCREEN
 # ─────────────────────────────────────────────────────────────────────────────
@@ -393,6 +439,9 @@ if st.session_state.recs_history:
 
 if st.session_state.chat_history:
     with st.expander("Chat History"):
+        # Oldest first; older pages are added above
+        if st.session_state.history_cursor is not None:
+            st.button("Load older", on_click=handle_load_older, key="btn_history_older")
         for i, e in enumerate(st.session_state.chat_history, 1):
             q, a, refs = e["q"], strip_inline_refs(e["a"]), e["refs"]
             refs_html = "<br>".join(f"• {r}" for r in refs) if refs else ""
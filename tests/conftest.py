@@ -1,8 +1,101 @@
 import sys
 import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
 
 # Insert the project root into sys.path
 # so that pytest can locate the 'backend' package
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+
+class FakeGeminiServer:
+    """
+    Minimal local stand-in for the Gemini REST API (generateContent).
+    - delay: seconds to sleep before answering (per model, or default).
+    - calls: list of model names requested, in arrival order.
+    """
+
+    def __init__(self):
+        self.delay = 0.0
+        self.model_delays = {}
+        self.answer = "Fake Gemini answer"
+        self.calls = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                model = self.path.split("/models/")[-1].split(":")[0]
+                server.calls.append(model)
+                time.sleep(server.model_delays.get(model, server.delay))
+                body = json.dumps(
+                    {
+                        "candidates": [
+                            {
+                                "content": {
+                                    "role": "model",
+                                    "parts": [{"text": f"{server.answer} ({model})"}],
+                                },
+                                "finishReason": "STOP",
+                            }
+                        ]
+                    }
+                ).encode("utf-8")
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (timeout / hedge loser)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """
+    Start a fake Gemini server and point the llm_gemini client at it.
+    """
+    from google import genai
+    from google.genai import types as GeminiTypes
+    from backend.app.services import llm_gemini
+
+    server = FakeGeminiServer()
+    client = genai.Client(
+        api_key="test-key",
+        http_options=GeminiTypes.HttpOptions(base_url=server.base_url),
+    )
+    monkeypatch.setattr(llm_gemini, "client_gemini", client)
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def restore_doc_embeddings_stamp(monkeypatch):
+    """
+    Tests that point DOC_EMBED_FILE elsewhere also move the loaded-file stamp; restore
+    it, so a later test's patched DOC_EMBEDDINGS is not replaced by a reload.
+    """
+    from backend.app.services import recommendations
+
+    monkeypatch.setattr(recommendations, "_loaded_stamp", recommendations._loaded_stamp)
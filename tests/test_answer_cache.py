@@ -0,0 +1,70 @@
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+from backend.app.services import llm_gemini
+from backend.app.services.latency import LatencyHistogram
+
+SNIPPETS = ["Funds are held in escrow until approval."]
+
+
+@pytest.fixture
+def answer_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_gemini, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_gemini, "ANSWER_CACHE_DIR", str(tmp_path / "answer_cache"))
+    return tmp_path / "answer_cache"
+
+
+def test_unchanged_prompt_is_answered_from_cache(fake_gemini, answer_cache):
+    """
+    The second identical call is served from disk; a new prompt or another
+    model goes to Gemini again.
+    """
+    first = llm_gemini.generate_answer_with_references_gemini(SNIPPETS, "How do payments work?")
+    second = llm_gemini.generate_answer_with_references_gemini(SNIPPETS, "How do payments work?")
+    assert len(fake_gemini.calls) == 1
+    assert second["answer"] == first["answer"] and second["cached"] is True
+
+    llm_gemini.generate_answer_with_references_gemini(SNIPPETS, "How do refunds work?")
+    llm_gemini.generate_answer_with_references_gemini(
+        SNIPPETS, "How do payments work?", model="gemini-other"
+    )
+    assert len(fake_gemini.calls) == 3
+    assert len(list(answer_cache.rglob("*.json"))) == 3
+
+
+def test_hedged_generation_shares_the_cache(fake_gemini, answer_cache):
+    llm_gemini.generate_answer_with_references_gemini(SNIPPETS, "How do payments work?")
+    result = asyncio.run(
+        llm_gemini.generate_answer_hedged_gemini(SNIPPETS, "How do payments work?")
+    )
+    assert result["cached"] is True and len(fake_gemini.calls) == 1
+
+
+def test_hedge_answer_cached_under_the_model_that_answered(fake_gemini, answer_cache, monkeypatch):
+    monkeypatch.setattr(llm_gemini, "MODEL_LATENCY", defaultdict(LatencyHistogram))
+    monkeypatch.setattr(llm_gemini, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.1)
+    fake_gemini.model_delays = {"gemini-2.0-flash": 2.0, "gemini-2.0-flash-lite": 0.0}
+    result = asyncio.run(
+        llm_gemini.generate_answer_hedged_gemini(
+            SNIPPETS, "How do payments work?", hedge_model="gemini-2.0-flash-lite"
+        )
+    )
+    assert result["model"] == "gemini-2.0-flash-lite"
+
+    fake_gemini.model_delays = {}
+    lite = llm_gemini.generate_answer_with_references_gemini(
+        SNIPPETS, "How do payments work?", model="gemini-2.0-flash-lite"
+    )
+    assert lite["cached"] is True and lite["answer"] == result["answer"]
+    primary = llm_gemini.generate_answer_with_references_gemini(SNIPPETS, "How do payments work?")
+    assert not primary.get("cached") and primary["answer"].endswith("(gemini-2.0-flash)")
+
+
+def test_cache_disabled_by_default(fake_gemini, tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_gemini, "ANSWER_CACHE_DIR", str(tmp_path / "answer_cache"))
+    for _ in range(2):
+        llm_gemini.generate_answer_with_references_gemini(SNIPPETS, "How do payments work?")
+    assert len(fake_gemini.calls) == 2
+    assert not (tmp_path / "answer_cache").exists()
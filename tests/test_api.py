@@ -1,6 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
 from backend.app.main import app
+from backend.app.services import retriever_openai
+
+
+async def _no_store(user_id, question, answer, refs):
+    return None
 
 
 @pytest.fixture
@@ -16,7 +21,7 @@ def test_rag_query_in_scope(monkeypatch, client):
     import backend.app.routers.rag as rag_module
 
     monkeypatch.setattr(
-        rag_module,
+        retriever_openai,
         "retrieve_fragments_openai",
         lambda q, k: [("Here goes content", 0.5, "doc1.md")],
     )
@@ -30,11 +35,11 @@ def test_rag_query_in_scope(monkeypatch, client):
             "prompt": "",
         },
     )
-    # patch add_chat_entry where the router imports it
+    # patch add_chat_entry_async where the router imports it
     import backend.app.routers.rag as rag_db_module
 
     monkeypatch.setattr(
-        rag_db_module, "add_chat_entry", lambda user_id, question, answer, refs: None
+        rag_db_module, "add_chat_entry_async", _no_store
     )
 
     resp = client.post(
@@ -51,13 +56,13 @@ def test_rag_query_out_of_scope(monkeypatch, client):
 
     # retrieve a fragment with distance > threshold
     monkeypatch.setattr(
-        rag_module,
+        retriever_openai,
         "retrieve_fragments_openai",
         lambda q, k: [("Irrelevant content", 2.0, "docX.md")],
     )
     # patch persistence
     monkeypatch.setattr(
-        rag_module, "add_chat_entry", lambda user_id, question, answer, refs: None
+        rag_module, "add_chat_entry_async", _no_store
     )
 
     resp = client.post(
@@ -72,7 +77,7 @@ def test_rag_query_out_of_scope(monkeypatch, client):
 def test_rag_query_no_fragments(monkeypatch, client):
     import backend.app.routers.rag as rag_module
 
-    monkeypatch.setattr(rag_module, "retrieve_fragments_openai", lambda q, k: [])
+    monkeypatch.setattr(retriever_openai, "retrieve_fragments_openai", lambda q, k: [])
 
     resp = client.post("/rag/query", json={"user_id": "user3", "query": "Nothing?"})
     assert resp.status_code == 404
@@ -82,17 +87,17 @@ def test_rag_query_no_fragments(monkeypatch, client):
 
 
 def test_recs_personalized(monkeypatch, client):
-    # patch get_user_history in the router
+    # patch get_seen_references_async in the router
     import backend.app.routers.recs as recs_module
 
-    class Row:
-        def __init__(self, references, question, answer):
-            self.references = references
-            self.question = question
-            self.answer = answer
+    async def fake_seen_refs(user_id):
+        return [["docA", "docB"]]
+
+    async def fake_archived_docs(user_id):
+        return []
 
-    fake_history = [Row(references="docA,docB", question="q1", answer="a1")]
-    monkeypatch.setattr(recs_module, "get_user_history", lambda user_id: fake_history)
+    monkeypatch.setattr(recs_module, "get_seen_references_async", fake_seen_refs)
+    monkeypatch.setattr(recs_module, "get_archived_docs_async", fake_archived_docs)
     # patch the recommendation function in the router
     monkeypatch.setattr(
         recs_module,
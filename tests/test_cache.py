@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pytest
+
+from backend.app.services import cache, recommendations, retriever_openai
+from backend.app.services.cache import MemoryCache, RedisCache
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_BACKEND", "memory")
+    monkeypatch.setattr(cache, "_memory_store", {})
+
+
+class FakeRedis:
+    """Records commands and round trips; `down` makes every call fail."""
+
+    def __init__(self):
+        self.data, self.round_trips, self.down = {}, 0, False
+
+    def pipeline(self, transaction=True):
+        client, commands = self, []
+
+        class Pipeline:
+            def get(self, name):
+                commands.append(("get", name))
+
+            def set(self, name, value, ex=None):
+                commands.append(("set", name, value))
+
+            def execute(self):
+                client.round_trips += 1
+                if client.down:
+                    raise ConnectionError("redis down")
+                results = []
+                for command in commands:
+                    if command[0] == "get":
+                        results.append(client.data.get(command[1]))
+                    else:
+                        client.data[command[1]] = command[2]
+                        results.append(True)
+                return results
+
+        return Pipeline()
+
+
+def test_memory_cache_namespaces_and_ttl(memory_backend):
+    embed, answers = cache.get_cache("embed", "unused"), cache.get_cache("answer", "unused", ttl=0.05)
+    embed.set_many({"a": b"1", "b": b"2"})
+    answers.set("a", b"answer")
+    assert embed.get_many(["a", "b", "c"]) == [b"1", b"2", None]
+    assert answers.get("a") == b"answer"
+    time.sleep(0.06)
+    assert answers.get("a") is None and embed.get("a") == b"1"
+    embed.clear()
+    assert embed.get("b") is None and isinstance(embed, MemoryCache)
+
+
+def test_redis_batches_are_pipelined_and_errors_are_misses():
+    client = FakeRedis()
+    store = RedisCache(client, prefix="shakers:embed:")
+    store.set_many({"a": b"1", "b": b"2"})
+    assert client.round_trips == 1 and sorted(client.data) == ["shakers:embed:a", "shakers:embed:b"]
+    assert store.get_many(["a", "b", "c"]) == [b"1", b"2", None]
+    assert client.round_trips == 2
+
+    client.down = True
+    assert store.get_many(["a", "b"]) == [None, None]
+    store.set("c", b"3")  # logged and skipped
+
+
+def test_embeddings_shared_through_the_backend(memory_backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DIR", str(tmp_path / "embed_cache"))
+    calls = []
+
+    def fake_call(texts, model=None):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    monkeypatch.setattr(retriever_openai, "_call_openai_embedding", fake_call)
+    first = retriever_openai.batch_get_openai_embeddings(["escrow", "refunds"])
+    assert retriever_openai.batch_get_openai_embeddings(["refunds", "escrow"]) == first[::-1]
+    assert retriever_openai.get_openai_embedding("escrow") == first[0]
+    assert calls == [["escrow", "refunds"]]
+    assert not (tmp_path / "embed_cache").exists()
+
+
+def test_recommendations_cached_until_the_kb_changes(memory_backend, monkeypatch):
+    monkeypatch.setattr(recommendations, "CACHE_ENABLED", True)
+    monkeypatch.setattr(
+        recommendations, "DOC_EMBEDDINGS", {"a.md": np.array([1.0, 0.0]), "b.md": np.array([0.0, 1.0])}
+    )
+    queries = []
+    monkeypatch.setattr(
+        recommendations, "get_openai_embedding", lambda q: queries.append(q) or [1.0, 0.0]
+    )
+    history = [{"refs": ["a.md"]}]
+    first = recommendations.recommend_resources(history, "payments", k=1)
+    assert recommendations.recommend_resources(history, "payments", k=1) == first
+    assert len(queries) == 1
+
+    recommendations.recommend_resources([], "payments", k=1)  # other seen documents
+    monkeypatch.setattr(
+        recommendations, "DOC_EMBEDDINGS", {"a.md": np.array([1.0, 0.0]), "c.md": np.array([1.0, 1.0])}
+    )
+    assert recommendations.recommend_resources(history, "payments", k=1)[0]["doc"] == "c.md"
+    assert len(queries) == 3
@@ -0,0 +1,48 @@
+from backend.app.services.chunk_merger import merge_overlapping_chunks
+
+SOURCE_TEXT = "Clients deposit funds in escrow. Funds are released after approval."
+
+
+def _chunk(start, end, score, chunk_index, source="payments.md"):
+    meta = {"source": source, "start_index": start, "chunk_index": chunk_index}
+    return (SOURCE_TEXT[start:end], score, meta)
+
+
+def test_overlapping_chunks_are_stitched():
+    """
+    Two chunks sharing text from the same source become a single passage
+    without the duplicated overlap, keeping the best distance.
+    """
+    chunks = [_chunk(20, 68, 0.4, 1), _chunk(0, 33, 0.6, 0)]
+    merged = merge_overlapping_chunks(chunks)
+    assert merged == [(SOURCE_TEXT, 0.4, "payments.md")]
+
+
+def test_consecutive_chunks_without_overlap_are_joined():
+    """
+    Chunks that are consecutive in the source are joined even without shared text.
+    """
+    chunks = [_chunk(0, 32, 0.5, 0), _chunk(33, 68, 0.3, 1)]
+    merged = merge_overlapping_chunks(chunks)
+    assert len(merged) == 1
+    text, score, src = merged[0]
+    assert text == SOURCE_TEXT[0:32] + "\n" + SOURCE_TEXT[33:68]
+    assert score == 0.3
+
+
+def test_distinct_sources_and_legacy_chunks_are_kept():
+    """
+    Chunks from other sources, or without ordering metadata, are not merged,
+    and the output is sorted by ascending distance.
+    """
+    chunks = [
+        _chunk(0, 20, 0.7, 0),
+        ("Card payments are accepted.", 0.2, {"source": "payments_methods.md"}),
+        _chunk(0, 20, 0.5, 0, source="freelancer.md"),
+    ]
+    merged = merge_overlapping_chunks(chunks)
+    assert [src for _, _, src in merged] == [
+        "payments_methods.md",
+        "freelancer.md",
+        "payments.md",
+    ]
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine
+
+from backend.app import db
+from backend.app.services import compaction
+
+
+@pytest.fixture
+def history_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}")
+    monkeypatch.setattr(db, "engine", engine)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _add(user_id, refs, age_days, now):
+    entry = db._new_entry(user_id, "q", "a long answer", refs)
+    entry.created_at = now - timedelta(days=age_days)
+    with db.Session(db.engine) as session:
+        session.add(entry)
+        session.commit()
+
+
+def test_old_entries_are_archived_and_aggregated(history_db, tmp_path):
+    now = db.utcnow()
+    _add("ana", ["a.md", "b.md"], 200, now)
+    _add("ana", ["a.md"], 120, now)
+    _add("bob", [], 100, now)
+    _add("ana", ["c.md"], 5, now)
+    archive_dir = str(tmp_path / "archive")
+
+    stats = compaction.compact_history(30, batch_size=2, archive_dir=archive_dir, now=now)
+    assert stats["archived"] == 3 and len(stats["files"]) == 2
+
+    rows = [row for path in stats["files"] for row in compaction.read_archive(path)]
+    assert [row["user_id"] for row in rows] == ["ana", "ana", "bob"]
+    assert rows[0]["references"] == "a.md,b.md"
+
+    assert [e.references for e in db.get_user_history("ana")] == ["c.md"]
+    assert sorted(db.get_archived_docs("ana")) == ["a.md", "b.md"]
+    with db.Session(db.engine) as session:
+        assert session.get(db.UserDocStat, ("ana", "a.md")).count == 2
+
+    # Nothing left to archive: a rerun changes nothing
+    assert compaction.compact_history(30, archive_dir=archive_dir, now=now)["archived"] == 0
+    with db.Session(db.engine) as session:
+        assert session.get(db.UserDocStat, ("ana", "a.md")).count == 2
+
+
+def test_incremental_vacuum_releases_pages(history_db, tmp_path):
+    now = db.utcnow()
+    compaction.incremental_vacuum()  # one-time switch to incremental mode
+    for i in range(300):
+        _add(f"user{i}", ["a.md"], 100, now)
+    stats = compaction.compact_history(30, archive_dir=str(tmp_path / "archive"), now=now)
+    assert stats["archived"] == 300 and stats["freed_pages"] > 0
+    with history_db.connect() as conn:
+        assert conn.execute(text("PRAGMA freelist_count")).scalar() == 0
+
+
+def test_init_db_adds_created_at_to_old_databases(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE chatentry (id INTEGER PRIMARY KEY, user_id VARCHAR, "
+            "question VARCHAR, answer VARCHAR, \"references\" VARCHAR)"
+        ))
+        conn.execute(text("INSERT INTO chatentry VALUES (1, 'ana', 'q', 'a', 'a.md')"))
+    monkeypatch.setattr(db, "engine", engine)
+    db.init_db()
+    (entry,) = db.get_user_history("ana")
+    assert entry.created_at is not None
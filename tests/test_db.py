@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from sqlalchemy.engine import make_url
+from sqlmodel import SQLModel, create_engine
+
+from backend.app import db
+
+
+def test_engine_options_pool_server_databases_only():
+    server = db.engine_options(make_url("postgresql+asyncpg://u:p@db/shakers"))
+    assert server["pool_size"] == db.DB_POOL_SIZE and server["pool_pre_ping"] is True
+    assert "connect_args" not in server
+
+    sqlite = db.engine_options(make_url("sqlite:///shakers.db"))
+    assert sqlite["connect_args"] == {"check_same_thread": False}
+    assert "pool_size" not in sqlite
+
+
+def test_async_routes_use_async_engine(tmp_path, monkeypatch):
+    """
+    With an async driver URL, route helpers write and read through the async
+    engine; the rows are visible to the sync engine too.
+    """
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(sync_engine)
+    monkeypatch.setattr(db, "engine", sync_engine)
+    monkeypatch.setattr(db, "IS_ASYNC_DB", True)
+    monkeypatch.setattr(db, "_async_engine", create_async_engine(f"sqlite+aiosqlite:///{path}"))
+
+    async def go():
+        await db.add_chat_entry_async("ana", "q0", "a0", ["a.md", "b.md"])
+        await db.add_chat_entry_async("ana", "q1", "a1", [])
+        await db.add_chat_entry_async("ana", "q2", "a2", ["a.md", "b.md"])
+        refs = await db.get_seen_references_async("ana")
+        await db.dispose_engines()
+        return refs
+
+    assert asyncio.run(go()) == [["a.md", "b.md"]]
+    assert [e.question for e in db.get_user_history("ana")] == ["q0", "q1", "q2"]
@@ -0,0 +1,171 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from evaluation import evaluate
+
+QUESTIONS = [
+    {"id": i, "question": f"question {i}", "ideal_answer": "escrow funds", "references": ["payments.md"]}
+    for i in range(1, 6)
+]
+PROFILES = [{"user_id": "alecy", "history": [{"q": "How do payments work?"}]}]
+
+
+def _handler(calls, failures):
+    """Fake API: records every call and answers 503 for the first failures[qid] attempts."""
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        calls.append(body)
+        if request.url.path == "/recs/personalized":
+            return httpx.Response(200, json={"recommendations": [{"doc": "a.md"}, {"doc": "b.md"}]})
+        qid = int(body["user_id"].split("_")[1])
+        if failures.get(qid, 0) > 0:
+            failures[qid] -= 1
+            return httpx.Response(503)
+        return httpx.Response(200, json={"answer": "Escrow holds the funds", "references": ["payments.md"]})
+
+    return handle
+
+
+def _run(tmp_path, calls, failures, retries=2):
+    async def go():
+        transport = httpx.MockTransport(_handler(calls, failures))
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            checkpoint = evaluate.Checkpoint(str(tmp_path / "ckpt.jsonl"))
+            return await evaluate.run_evaluation(
+                QUESTIONS,
+                PROFILES,
+                "default",
+                evaluate.http_sender(client, retries=retries),
+                checkpoint,
+                concurrency=2,
+                summary_path=str(tmp_path / "summary.json"),
+            )
+
+    return asyncio.run(go())
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(evaluate, "RETRY_WAIT_MIN_SECONDS", 0)
+    monkeypatch.setattr(evaluate, "RETRY_WAIT_MAX_SECONDS", 0)
+
+
+def test_transient_errors_are_retried_and_latency_recorded(tmp_path):
+    calls = []
+    rag, recs = _run(tmp_path, calls, failures={2: 2})
+    assert rag["errors"] == 0 and rag["avg_recall"] == 1.0
+    assert len(calls) == len(QUESTIONS) + 2 + len(PROFILES)
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert summary["rag"]["latency"]["count"] == len(QUESTIONS)
+    assert summary["recs"]["avg_recs"] == 2.0
+    assert not (tmp_path / "ckpt.jsonl").exists()
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    """
+    Items finished before the interruption are read back from the checkpoint;
+    only the remaining (and previously failed) ones are sent again.
+    """
+    ckpt = tmp_path / "ckpt.jsonl"
+    done = {"overlap": 0.5, "recall": 1.0, "latency_ms": 10.0}
+    ckpt.write_text(
+        "".join(json.dumps({"kind": "rag", "key": str(i), "result": done}) + "\n" for i in (1, 2))
+        + '{"kind": "rag", "ke'  # torn final line
+    )
+    calls = []
+    rag, _ = _run(tmp_path, calls, failures={3: 5}, retries=1)
+    rag_calls = [c["user_id"] for c in calls if c["user_id"].startswith("eval_")]
+    assert "eval_1" not in rag_calls and "eval_2" not in rag_calls
+    assert rag_calls.count("eval_3") == 2
+    assert rag["errors"] == 1
+    assert rag["latency"]["count"] == 4
+    assert ckpt.exists()
+
+
+def test_in_process_mode_calls_services_without_http(monkeypatch):
+    """
+    The in-process sender mirrors the API responses (out-of-scope fallback,
+    deduplicated references, DB history for recs) on a thread pool.
+    """
+    from backend.app import db
+    from backend.app.services import llm_gemini, recommendations, retriever_openai
+
+    fragments = {
+        "in scope": [("a", 0.2, "payments.md"), ("b", 0.3, "payments.md"), ("c", 0.4, "faq.md")],
+    }
+    monkeypatch.setattr(retriever_openai, "get_vector_store", lambda: None)
+    monkeypatch.setattr(
+        retriever_openai, "retrieve_fragments_openai", lambda q, k=3: fragments.get(q, [])
+    )
+    monkeypatch.setattr(
+        llm_gemini, "generate_answer_with_references_gemini", lambda s, q: {"answer": f" {len(s)} snippets "}
+    )
+    monkeypatch.setattr(
+        db, "get_seen_references", lambda user_id: [["payments.md", "faq.md"]]
+    )
+    monkeypatch.setattr(db, "get_archived_docs", lambda user_id: ["old.md"])
+    seen = []
+    monkeypatch.setattr(
+        recommendations,
+        "recommend_resources",
+        lambda chat_history, current_query, k, alpha: seen.append(chat_history) or [{"doc": "x.md", "reason": "r"}],
+    )
+
+    async def go():
+        with evaluate.make_executor("thread", 2) as executor:
+            send = evaluate.inprocess_sender(executor)
+            return (
+                await send("/rag/query", {"user_id": "u", "query": "in scope"}),
+                await send("/rag/query", {"user_id": "u", "query": "weather"}),
+                await send("/recs/personalized", {"user_id": "alecy", "current_query": "q"}),
+            )
+
+    in_scope, out_of_scope, recs = asyncio.run(go())
+    assert in_scope == {"answer": "3 snippets", "references": ["payments.md", "faq.md"]}
+    assert out_of_scope == {"answer": evaluate.OUT_OF_SCOPE_ANSWER, "references": []}
+    assert recs == {"recommendations": [{"doc": "x.md", "reason": "r"}]}
+    assert seen == [[{"refs": ["payments.md", "faq.md"]}, {"refs": ["old.md"]}]]
+
+
+def test_retrieval_metrics_rank_aware():
+    relevant = {"payments.md", "refunds.md"}
+    perfect = evaluate.retrieval_metrics(["payments.md", "refunds.md", "faq.md"], relevant, k=3)
+    assert perfect == {"recall": 1.0, "rr": 1.0, "ndcg": pytest.approx(1.0)}
+    late = evaluate.retrieval_metrics(["faq.md", "a.md", "refunds.md"], relevant, k=3)
+    assert late["recall"] == 0.5 and late["rr"] == pytest.approx(1 / 3)
+    assert late["ndcg"] == pytest.approx((1 / 2) / (1 + 1 / 1.584962500721156))
+    assert evaluate.retrieval_metrics([], relevant, k=3)["ndcg"] == 0.0
+
+
+def test_retrieval_only_run_keeps_other_checkpoints(tmp_path, monkeypatch):
+    """
+    Retrieval-only runs never call the LLM, and finishing one only drops its own
+    items from the checkpoint.
+    """
+    from backend.app.services import llm_gemini, retriever_openai
+
+    monkeypatch.setattr(retriever_openai, "get_vector_store", lambda: None)
+    monkeypatch.setattr(
+        retriever_openai,
+        "retrieve_fragments_openai",
+        lambda q, k=3: [("t", 0.5, "faq.md"), ("t", 0.6, "payments.md")][:k],
+    )
+    monkeypatch.setattr(llm_gemini, "generate_answer_with_references_gemini", None)
+    ckpt = evaluate.Checkpoint(str(tmp_path / "ckpt.jsonl"))
+    ckpt.record("rag", "1", {"overlap": 1.0, "recall": 1.0, "latency_ms": 1.0})
+
+    async def go():
+        with evaluate.make_executor("thread", 2) as executor:
+            return await evaluate.evaluate_retrieval(
+                QUESTIONS, evaluate.inprocess_sender(executor), ckpt, k=2
+            )
+
+    summary = asyncio.run(go())
+    assert summary["recall_at_k"] == 1.0 and summary["mrr"] == 0.5
+    assert summary["latency"]["count"] == len(QUESTIONS)
+    ckpt.clear(evaluate.retrieval_checkpoint_kind(2, None))
+    assert evaluate.Checkpoint(str(tmp_path / "ckpt.jsonl")).results == {"rag": {"1": ckpt.done("rag")["1"]}}
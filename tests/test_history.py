@@ -0,0 +1,55 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine
+
+from backend.app import db
+from backend.app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def history_db(tmp_path, monkeypatch):
+    """Temporary database with 5 entries for "ana" interleaved with 2 for "bob"."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    monkeypatch.setattr(db, "engine", engine)
+    SQLModel.metadata.create_all(engine)
+    for i in range(5):
+        db.add_chat_entry("ana", f"q{i}", f"a{i}", [f"doc{i}.md"] if i % 2 else [])
+        if i < 2:
+            db.add_chat_entry("bob", f"bob q{i}", "a", ["bob.md"])
+    return engine
+
+
+def test_history_pages_follow_the_cursor(history_db):
+    first = client.get("/history/ana", params={"limit": 2}).json()
+    assert [item["q"] for item in first["items"]] == ["q4", "q3"]
+    assert first["items"][1]["refs"] == ["doc3.md"]
+
+    second = client.get("/history/ana", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    last = client.get("/history/ana", params={"limit": 2, "cursor": second["next_cursor"]}).json()
+    assert [item["q"] for item in second["items"] + last["items"]] == ["q2", "q1", "q0"]
+    assert last["next_cursor"] is None
+
+    oldest = client.get("/history/ana", params={"limit": 3, "order": "asc"}).json()
+    assert [item["q"] for item in oldest["items"]] == ["q0", "q1", "q2"]
+    assert client.get("/history/ana", params={"limit": 0}).status_code == 422
+
+
+def test_history_stream_reads_in_batches(history_db, monkeypatch):
+    from backend.app.routers import history
+
+    monkeypatch.setattr(history, "STREAM_BATCH_SIZE", 2)
+    resp = client.get("/history/ana/stream")
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["q"] for row in rows] == ["q0", "q1", "q2", "q3", "q4"]
+    assert db.get_user_history("bob")[0].question == "bob q0"
+
+
+def test_seen_references_cover_the_whole_live_history(history_db):
+    db.add_chat_entry("ana", "q5", "a5", ["doc1.md"])  # same references as q1
+    assert sorted(db.get_seen_references("ana")) == [["doc1.md"], ["doc3.md"]]
+    assert db.get_seen_references("nobody") == []
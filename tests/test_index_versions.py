@@ -0,0 +1,61 @@
+import os
+
+import pytest
+from langchain_community.vectorstores import Chroma
+
+from backend.app.services import recommendations, retriever_openai
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    kb_dir = tmp_path / "kb"
+    kb_dir.mkdir()
+    (kb_dir / "payments.md").write_text("Payments are held in escrow.")
+    monkeypatch.setattr(retriever_openai, "KB_DIR", str(kb_dir))
+    monkeypatch.setattr(retriever_openai, "CHROMA_DB_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DIR", str(tmp_path / "embed_cache"))
+    monkeypatch.setattr(recommendations, "DOC_EMBED_FILE", str(tmp_path / "doc_embeddings.json"))
+    monkeypatch.setattr(recommendations, "DOC_EMBEDDINGS", {})
+    os.makedirs(tmp_path / "embed_cache")
+    monkeypatch.setattr(
+        retriever_openai, "_call_openai_embedding", lambda texts, model=None: [[1.0, 0.0] for _ in texts]
+    )
+    return kb_dir
+
+
+def _versions():
+    return sorted(n for n in os.listdir(retriever_openai.CHROMA_DB_DIR) if n.startswith("v"))
+
+
+def test_rebuilds_publish_new_versions_and_collect_old_ones(kb):
+    assert retriever_openai.current_index_dir() is None
+    retriever_openai.create_chroma_index()
+    first = retriever_openai.current_index_dir()
+
+    with retriever_openai.pinned_vector_store() as pinned:
+        # Rebuilds while a query holds the first version
+        (kb / "payments.md").write_text("Payments are released weekly.")
+        retriever_openai.create_chroma_index()
+        retriever_openai.create_chroma_index()
+        assert retriever_openai.current_index_dir() != first
+        assert os.path.isdir(first) and len(_versions()) == 3
+        assert pinned.get(include=["documents"])["documents"] == ["Payments are held in escrow."]
+
+    assert retriever_openai.get_vector_store().get(include=["documents"])["documents"] == [
+        "Payments are released weekly."
+    ]
+    removed = retriever_openai.gc_index_versions()
+    assert removed == [first] and len(_versions()) == retriever_openai.INDEX_KEEP_VERSIONS
+
+
+def test_unversioned_index_is_read_then_replaced(kb):
+    root = retriever_openai.CHROMA_DB_DIR
+    Chroma(persist_directory=root)._collection.add(
+        ids=["chunk_0"], embeddings=[[1.0, 0.0]], documents=["old layout"], metadatas=[{"source": "a.md"}]
+    )
+    assert retriever_openai.current_index_dir() == root
+    assert retriever_openai.get_vector_store().get()["documents"] == ["old layout"]
+
+    retriever_openai.create_chroma_index()
+    assert sorted(os.listdir(root)) == [retriever_openai.INDEX_POINTER] + _versions()
+    assert retriever_openai.get_vector_store().get()["documents"] == ["Payments are held in escrow."]
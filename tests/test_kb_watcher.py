@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from backend.app.services import recommendations, retriever_openai
+from backend.app.services.kb_watcher import KBWatcher
+
+VECTORS = {
+    "Payments are held in escrow until the client approves.": [1.0, 0.0, 0.0],
+    "Payments are released weekly by bank transfer.": [0.8, 0.6, 0.0],
+    "Freelancers build a profile with skills and portfolio.": [0.0, 1.0, 0.0],
+    "Messages are end-to-end encrypted.": [0.0, 0.0, 1.0],
+}
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    kb_dir = tmp_path / "kb"
+    kb_dir.mkdir()
+    (kb_dir / "payments.md").write_text("Payments are held in escrow until the client approves.")
+    (kb_dir / "freelancer.md").write_text("Freelancers build a profile with skills and portfolio.")
+    monkeypatch.setattr(retriever_openai, "KB_DIR", str(kb_dir))
+    monkeypatch.setattr(retriever_openai, "CHROMA_DB_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DIR", str(tmp_path / "embed_cache"))
+    os.makedirs(tmp_path / "embed_cache")
+    doc_file = tmp_path / "doc_embeddings.json"
+    doc_file.write_text(json.dumps({"payments.md": [1.0, 0.0, 0.0], "freelancer.md": [0.0, 1.0, 0.0]}))
+    monkeypatch.setattr(recommendations, "DOC_EMBED_FILE", str(doc_file))
+    monkeypatch.setattr(recommendations, "DOC_EMBEDDINGS", {})
+    calls = []
+
+    def fake_call(texts, model=None):
+        calls.extend(texts)
+        return [VECTORS[t] for t in texts]
+
+    monkeypatch.setattr(retriever_openai, "_call_openai_embedding", fake_call)
+    retriever_openai.create_chroma_index(chunk_size=1000, chunk_overlap=0)
+    calls.clear()
+    return kb_dir, doc_file, calls
+
+
+def _sources(store):
+    return sorted(m["source"] for m in store.get(include=["metadatas"])["metadatas"])
+
+
+def test_changes_are_debounced_then_applied_incrementally(kb):
+    kb_dir, doc_file, calls = kb
+    watcher = KBWatcher(str(kb_dir), interval=0.01, debounce=1.0)
+    (kb_dir / "payments.md").write_text("Payments are released weekly by bank transfer.")
+    (kb_dir / "security.md").write_text("Messages are end-to-end encrypted.")
+    os.remove(kb_dir / "freelancer.md")
+
+    assert watcher.check(now=100.0) is False  # change seen, not yet settled
+    assert watcher.check(now=100.5) is False
+    assert watcher.check(now=101.5) is True
+    assert sorted(calls) == [
+        "Messages are end-to-end encrypted.",
+        "Payments are released weekly by bank transfer.",
+    ]
+
+    store = retriever_openai.get_vector_store()
+    assert _sources(store) == ["payments.md", "security.md"]
+    documents = store.get(include=["documents"])["documents"]
+    assert "Payments are held in escrow until the client approves." not in documents
+
+    stored = json.loads(doc_file.read_text())
+    assert sorted(stored) == ["payments.md", "security.md"]
+    assert stored["payments.md"] == pytest.approx([0.8, 0.6, 0.0])
+    assert sorted(recommendations.DOC_EMBEDDINGS) == ["payments.md", "security.md"]
+    assert watcher.check(now=200.0) is False
+
+
+def test_unchanged_content_keeps_chunks(kb):
+    kb_dir, doc_file, calls = kb
+    watcher = KBWatcher(str(kb_dir), debounce=0.0)
+    store = retriever_openai.get_vector_store()
+    ids = sorted(store.get()["ids"])
+    path = kb_dir / "payments.md"
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+    watcher.check(now=1.0)
+    assert watcher.check(now=1.0) is True
+    assert sorted(retriever_openai.get_vector_store().get()["ids"]) == ids and calls == []
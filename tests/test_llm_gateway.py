@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.services import retriever_openai
+from backend.app.services.llm_gemini import generate_answer_with_references_gemini
+from backend.app.services.llm_gateway import LLMGateway, LLMOverloadedError
+
+
+async def _no_store(user_id, question, answer, refs):
+    return None
+
+
+SNIPPETS = ["Funds are held in escrow until approval.", "Cards are accepted."]
+
+
+def test_gateway_returns_llm_answer(fake_gemini):
+    """
+    A request within limits is answered by the (fake) Gemini server.
+    """
+    gateway = LLMGateway(max_concurrency=2, max_queue=2, timeout_seconds=5)
+    out = asyncio.run(
+        gateway.generate(SNIPPETS, "How do payments work?", generate_answer_with_references_gemini)
+    )
+    assert out["answer"].startswith("Fake Gemini answer")
+    assert not out.get("degraded")
+    assert fake_gemini.calls == ["gemini-2.0-flash"]
+
+
+def test_gateway_degrades_to_top_snippet_on_timeout(fake_gemini):
+    """
+    When the provider exceeds the deadline, the top snippet is returned instead.
+    """
+    fake_gemini.delay = 1.0
+    gateway = LLMGateway(max_concurrency=1, max_queue=1, timeout_seconds=0.2)
+    out = asyncio.run(
+        gateway.generate(SNIPPETS, "How do payments work?", generate_answer_with_references_gemini)
+    )
+    assert out["degraded"] is True
+    assert out["answer"] == SNIPPETS[0]
+    assert gateway.degraded_count == 1
+
+
+def test_gateway_sheds_when_queue_full(fake_gemini):
+    """
+    With one slot busy and no queue capacity, extra requests are shed immediately.
+    """
+    fake_gemini.delay = 0.3
+    gateway = LLMGateway(max_concurrency=1, max_queue=0, timeout_seconds=5)
+
+    async def burst():
+        return await asyncio.gather(
+            *[
+                gateway.generate(SNIPPETS, "q", generate_answer_with_references_gemini)
+                for _ in range(3)
+            ],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(burst())
+    shed = [r for r in results if isinstance(r, LLMOverloadedError)]
+    answered = [r for r in results if isinstance(r, dict)]
+    assert len(shed) == 2 and len(answered) == 1
+    assert gateway.shed_count == 2
+    assert len(fake_gemini.calls) == 1
+
+
+def test_rag_query_returns_503_when_overloaded(monkeypatch):
+    """
+    The /rag/query endpoint maps a shed request to HTTP 503 with Retry-After.
+    """
+    import backend.app.routers.rag as rag_module
+
+    class OverloadedGateway:
+        async def generate(self, snippet_texts, query, llm_fn):
+            raise LLMOverloadedError("full")
+
+    monkeypatch.setattr(
+        retriever_openai,
+        "retrieve_fragments_openai",
+        lambda q, k: [("Here goes content", 0.5, "doc1.md")],
+    )
+    monkeypatch.setattr(rag_module, "LLM_GATEWAY", OverloadedGateway())
+    monkeypatch.setattr(
+        rag_module, "add_chat_entry_async", _no_store
+    )
+
+    resp = TestClient(app).post("/rag/query", json={"user_id": "u", "query": "q"})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
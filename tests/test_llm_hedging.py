@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.services import llm_gemini
+from backend.app.services.latency import LatencyHistogram
+
+SNIPPETS = ["Funds are held in escrow until approval."]
+
+
+@pytest.fixture(autouse=True)
+def fresh_histograms(monkeypatch):
+    """
+    Isolate per-model latency statistics and use a short default hedge delay.
+    """
+    from collections import defaultdict
+
+    monkeypatch.setattr(llm_gemini, "MODEL_LATENCY", defaultdict(LatencyHistogram))
+    monkeypatch.setattr(llm_gemini, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.1)
+    yield
+
+
+def test_histogram_percentile_interpolates_within_bucket():
+    """
+    Percentiles are interpolated inside the bucket holding the requested rank.
+    """
+    hist = LatencyHistogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        hist.record(value)
+    assert hist.count == 4
+    assert hist.percentile(0.25) == pytest.approx(1.0)
+    assert hist.percentile(0.5) == pytest.approx(1.5)
+    assert hist.percentile(1.0) == pytest.approx(4.0)
+    assert LatencyHistogram().percentile(0.5) is None
+
+
+def test_hedge_delay_uses_percentile_after_min_samples(monkeypatch):
+    """
+    The hedge delay switches from the default to the model's percentile.
+    """
+    monkeypatch.setattr(llm_gemini, "LLM_HEDGE_MIN_SAMPLES", 5)
+    assert llm_gemini.hedge_delay_seconds("m") == 0.1
+    for _ in range(5):
+        llm_gemini.MODEL_LATENCY["m"].record(0.3)
+    assert 0.25 < llm_gemini.hedge_delay_seconds("m") <= 0.5
+
+
+def test_slow_primary_is_hedged_to_alternate_model(fake_gemini):
+    """
+    When the primary model stalls, the backup model answers and the call
+    returns well before the primary would have.
+    """
+    fake_gemini.model_delays = {"gemini-2.0-flash": 2.0, "gemini-2.0-flash-lite": 0.0}
+    start = time.time()
+    out = asyncio.run(
+        llm_gemini.generate_answer_hedged_gemini(
+            SNIPPETS, "How do payments work?", hedge_model="gemini-2.0-flash-lite"
+        )
+    )
+    assert time.time() - start < 1.5
+    assert out["model"] == "gemini-2.0-flash-lite"
+    assert out["answer"].endswith("(gemini-2.0-flash-lite)")
+    assert fake_gemini.calls == ["gemini-2.0-flash", "gemini-2.0-flash-lite"]
+
+
+def test_fast_primary_is_not_hedged(fake_gemini):
+    """
+    A primary that answers before the hedge delay triggers no backup request.
+    """
+    out = asyncio.run(
+        llm_gemini.generate_answer_hedged_gemini(
+            SNIPPETS, "How do payments work?", hedge_model="gemini-2.0-flash-lite"
+        )
+    )
+    assert out["model"] == "gemini-2.0-flash"
+    assert fake_gemini.calls == ["gemini-2.0-flash"]
+    assert llm_gemini.MODEL_LATENCY["gemini-2.0-flash"].count == 1
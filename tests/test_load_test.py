@@ -0,0 +1,41 @@
+import pytest
+from openai import OpenAI
+
+from benchmarks.fake_providers import FakeOpenAIServer, LatencyModel, fake_embedding
+from benchmarks.load_test import percentile, summarize
+
+
+def test_fake_openai_server_speaks_embeddings_api():
+    """
+    The official client (base64 encoding by default) decodes the fake vectors.
+    """
+    server = FakeOpenAIServer("fixed:0").start()
+    try:
+        client = OpenAI(api_key="test", base_url=server.base_url)
+        resp = client.embeddings.create(model="m", input=["payments", "escrow"])
+    finally:
+        server.stop()
+    assert len(resp.data) == 2
+    assert resp.data[0].embedding == pytest.approx(fake_embedding("payments"), abs=1e-6)
+
+
+def test_latency_model_rejects_unknown_distribution():
+    assert LatencyModel("uniform:0.1,0.2").sample() <= 0.2
+    with pytest.raises(ValueError):
+        LatencyModel("pareto:1")
+
+
+def test_summarize_reports_percentiles_and_errors():
+    """
+    Percentiles use successful requests only; failures count towards the error rate.
+    """
+    samples = [{"endpoint": "rag", "latency": i / 100, "status": 200} for i in range(1, 101)]
+    samples += [{"endpoint": "rag", "latency": 5.0, "status": 503}]
+    samples += [{"endpoint": "rag", "latency": 30.0, "status": "ReadTimeout"}]
+    stats = summarize(samples, elapsed=10.0)["rag"]
+    assert stats["requests"] == 102 and stats["ok"] == 100
+    assert stats["error_rate"] == pytest.approx(2 / 102)
+    assert stats["throughput_rps"] == pytest.approx(10.0)
+    assert stats["p50_ms"] == pytest.approx(500.0)
+    assert stats["p99_ms"] == pytest.approx(990.0)
+    assert percentile([], 0.5) == 0.0
@@ -0,0 +1,24 @@
+import logging
+
+from backend.app.logging_config import SamplingFilter, _parse_mapping
+
+
+def _record(name, level=logging.DEBUG):
+    return logging.LogRecord(name, level, __file__, 1, "msg %s", ("x",), None)
+
+
+def test_parse_mapping_ignores_blank_entries():
+    assert _parse_mapping("a=0.1, b.c=DEBUG,,") == {"a": "0.1", "b.c": "DEBUG"}
+
+
+def test_sampling_keeps_one_in_n_for_configured_loggers():
+    """
+    Sampled loggers (and their children) keep 1 record out of every 1/rate;
+    other loggers and warnings are never dropped.
+    """
+    sampler = SamplingFilter({"retriever_openai.cache": 0.25, "llm_gemini.prompt": 0})
+    kept = [sampler.filter(_record("retriever_openai.cache")) for _ in range(8)]
+    assert kept == [True, False, False, False, True, False, False, False]
+    assert not sampler.filter(_record("llm_gemini.prompt"))
+    assert sampler.filter(_record("llm_gemini.prompt", logging.WARNING))
+    assert all(sampler.filter(_record("retriever_openai")) for _ in range(3))
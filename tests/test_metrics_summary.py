@@ -0,0 +1,67 @@
+import json
+import os
+from collections import defaultdict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.routers import metrics as metrics_module
+from backend.app.services import telemetry
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def summary_file(tmp_path, monkeypatch):
+    """Isolated metrics file, summary cache and live counters."""
+    path = tmp_path / "metrics_summary.json"
+    path.write_text(json.dumps({"rag": {"total_queries": 7}}))
+    monkeypatch.setattr(metrics_module, "METRICS_PATH", str(path))
+    monkeypatch.setattr(metrics_module, "_summary_cache", {"stamp": None, "data": None})
+    monkeypatch.setattr(telemetry, "EVENT_COUNT", defaultdict(int))
+    monkeypatch.setattr(metrics_module, "EVENT_COUNT", telemetry.EVENT_COUNT)
+    return path
+
+
+def test_summary_merges_live_counters(summary_file):
+    telemetry.count_event("rag_queries", 4)
+    telemetry.count_event("rag_out_of_scope")
+    telemetry.count_event("embedding_cache_hit", 3)
+    telemetry.count_event("embedding_cache_miss")
+
+    data = client.get("/metrics/summary").json()
+    assert data["rag"] == {"total_queries": 7}
+    live = data["live"]
+    assert live["queries_served"] == 4
+    assert live["out_of_scope_rate"] == 0.25
+    assert live["cache_hit_rate"] == {"embedding": 0.75, "answer": None, "rerank": None, "recs": None}
+    assert not any(e.startswith("/metrics") for e in live["avg_latency_ms"])
+
+
+def test_summary_etag_and_mtime_invalidation(summary_file, monkeypatch):
+    """
+    Polling with the last ETag gets an empty 304 while nothing changed; the file
+    is parsed again only when its mtime/size changes.
+    """
+    reads = []
+    real_load = json.load
+    monkeypatch.setattr(metrics_module.json, "load", lambda f: reads.append(1) or real_load(f))
+
+    first = client.get("/metrics/summary")
+    etag = first.headers["etag"]
+    second = client.get("/metrics/summary", headers={"If-None-Match": etag})
+    assert second.status_code == 304 and second.content == b""
+    assert len(reads) == 1
+
+    summary_file.write_text(json.dumps({"rag": {"total_queries": 8}}))
+    os.utime(summary_file, ns=(1, 10**18))
+    third = client.get("/metrics/summary", headers={"If-None-Match": etag})
+    assert third.status_code == 200 and third.json()["rag"]["total_queries"] == 8
+    assert third.headers["etag"] != etag
+    assert len(reads) == 2
+
+
+def test_summary_missing_file_is_404(summary_file):
+    summary_file.unlink()
+    assert client.get("/metrics/summary").status_code == 404
@@ -0,0 +1,45 @@
+import pytest
+
+from benchmarks.micro import compare, run_benchmarks
+
+
+def test_micro_benchmarks_run_on_synthetic_data():
+    """
+    A tiny run covers every benchmark without network access or the real data.
+    """
+    cases = run_benchmarks(
+        ["recommend", "retrieve", "cache", "history", "prompt"],
+        kb_sizes=[10],
+        history_lengths=[0, 3],
+        snippet_counts=[3],
+        dims=32,
+        repeat=1,
+        min_time=0.001,
+    )
+    names = {c["case"] for c in cases}
+    assert "recommend_resources[kb=10,history=3]" in names
+    assert "retrieve_fragments_openai[kb=10,k=3]" in names
+    assert "_load_from_cache[dims=32,hit=False]" in names
+    assert "get_user_history[history=3]" in names
+    assert "build_prompt[snippets=3]" in names
+    assert all(c["median_us"] > 0 for c in cases)
+
+
+def test_compare_flags_regressions_and_improvements():
+    old = {"commit": "a", "cases": [
+        {"case": "x[n=1]", "median_us": 100.0},
+        {"case": "y[n=1]", "median_us": 100.0},
+        {"case": "z[n=1]", "median_us": 100.0},
+    ]}
+    new = {"commit": "b", "cases": [
+        {"case": "x[n=1]", "median_us": 150.0},
+        {"case": "y[n=1]", "median_us": 50.0},
+        {"case": "z[n=1]", "median_us": 105.0},
+        {"case": "new[n=1]", "median_us": 1.0},
+    ]}
+    rows = {r["case"]: r for r in compare(old, new)}
+    assert set(rows) == {"x[n=1]", "y[n=1]", "z[n=1]"}
+    assert rows["x[n=1]"]["verdict"] == "regression"
+    assert rows["y[n=1]"]["ratio"] == pytest.approx(0.5)
+    assert rows["y[n=1]"]["verdict"] == "improvement"
+    assert rows["z[n=1]"]["verdict"] == "unchanged"
@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.app.services import quantization, recommendations, retriever_openai
+from benchmarks.quantization import run_benchmark, synthetic_vectors
+
+
+def test_encode_decode_error_bounds():
+    vector = np.random.default_rng(0).standard_normal(1536).astype(np.float32)
+    half = quantization.decode(quantization.encode(vector, "float16"))
+    assert np.abs(half - vector).max() < 1e-2
+    blob = quantization.encode(vector, "int8")
+    assert len(blob) == quantization._HEADER.size + 1536
+    restored = quantization.decode(blob)
+    step = np.abs(vector).max() / 127
+    assert np.abs(restored - vector).max() <= step / 2 + 1e-6
+    with pytest.raises(ValueError):
+        quantization.decode(b"nope" + blob[4:])
+
+    short = quantization.shorten(vector, 256)
+    assert short.shape == (256,) and np.linalg.norm(short) == pytest.approx(1.0, abs=1e-6)
+    assert quantization.shorten(vector, 0).shape == (1536,)
+
+
+def test_binary_cache_falls_back_to_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DIR", str(tmp_path))
+    retriever_openai._save_to_cache("old entry", [0.5, -0.25])
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DTYPE", "int8")
+    retriever_openai._save_to_cache("new entry", [1.0, -0.5])
+    assert sorted(p.rsplit(".", 1)[1] for p in os.listdir(tmp_path)) == ["int8", "json"]
+    assert retriever_openai._load_from_cache("old entry") == [0.5, -0.25]
+    assert retriever_openai._load_from_cache("new entry") == pytest.approx([1.0, -0.5], abs=1e-2)
+
+
+def test_shortened_index_is_rescored_on_full_vectors(tmp_path, monkeypatch):
+    """Two dimensions prefer the wrong document; re-scoring on all three restores the order."""
+    vectors = {
+        "Payments are held in escrow until the client approves.": [0.5, 0.3, 0.81],
+        "Freelancers build a profile with skills and portfolio.": [0.6, 0.05, -0.8],
+        "How are payments released?": [0.6, 0.0, 0.8],
+    }
+    kb_dir = tmp_path / "kb"
+    kb_dir.mkdir()
+    (kb_dir / "payments.md").write_text("Payments are held in escrow until the client approves.")
+    (kb_dir / "freelancer.md").write_text("Freelancers build a profile with skills and portfolio.")
+    monkeypatch.setattr(retriever_openai, "KB_DIR", str(kb_dir))
+    monkeypatch.setattr(retriever_openai, "CHROMA_DB_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DIR", str(tmp_path / "embed_cache"))
+    monkeypatch.setattr(recommendations, "DOC_EMBED_FILE", str(tmp_path / "doc_embeddings.json"))
+    monkeypatch.setattr(recommendations, "DOC_EMBEDDINGS", {})
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DTYPE", "int8")
+    monkeypatch.setattr(retriever_openai, "INDEX_DIMENSIONS", 2)
+    monkeypatch.setattr(retriever_openai, "SCOPE_PREFILTER_ENABLED", False)
+    os.makedirs(tmp_path / "embed_cache")
+    embedded = []
+
+    def fake_call(texts, model=None):
+        embedded.extend(texts)
+        return [vectors[t] for t in texts]
+
+    monkeypatch.setattr(retriever_openai, "_call_openai_embedding", fake_call)
+    # A lossy cache entry is not used for the stored full-precision vectors
+    retriever_openai._save_to_cache("Payments are held in escrow until the client approves.", [0.4, 0.4, 0.8])
+    retriever_openai.create_chroma_index(chunk_size=1000, chunk_overlap=0)
+    assert len(embedded) == 2
+    store = retriever_openai.get_vector_store()
+    assert all(len(v) == 2 for v in store.get(include=["embeddings"])["embeddings"])
+    stored = retriever_openai.full_vectors(retriever_openai.current_index_dir())
+    assert np.allclose(stored.lookup([{"source": "payments.md", "chunk_index": 0}]), [[0.5, 0.3, 0.81]])
+
+    short_hits = store.similarity_search_by_vector_with_relevance_scores([1.0, 0.0], k=1)
+    assert short_hits[0][0].metadata["source"] == "freelancer.md"
+    embedded.clear()
+    fragments = retriever_openai.retrieve_fragments_openai("How are payments released?", k=1)
+    assert [src for (_, _, src) in fragments] == ["payments.md"]
+    assert fragments[0][1] == pytest.approx(0.1001, abs=1e-2)
+    # Only the query is embedded; chunk texts never are while serving
+    assert embedded == ["How are payments released?"]
+
+    # An incremental update keeps the other file's vectors without re-embedding them
+    vectors["Freelancers build a public profile."] = [0.6, 0.05, -0.79]
+    (kb_dir / "freelancer.md").write_text("Freelancers build a public profile.")
+    retriever_openai.update_index_files(["freelancer.md"])
+    assert embedded[1:] == ["Freelancers build a public profile."]
+    stored = retriever_openai.full_vectors(retriever_openai.current_index_dir())
+    assert sorted(retriever_openai._chunk_source(i) for i in stored.ids) == ["freelancer.md", "payments.md"]
+
+    # Full-precision chunk vectors are cached too: a full rebuild embeds nothing
+    embedded.clear()
+    retriever_openai.create_chroma_index(chunk_size=1000, chunk_overlap=0)
+    assert embedded == []
+    stored = retriever_openai.full_vectors(retriever_openai.current_index_dir())
+    assert np.allclose(stored.lookup([{"source": "payments.md", "chunk_index": 0}]), [[0.5, 0.3, 0.81]])
+
+
+def test_benchmark_reports_recall_and_sizes():
+    docs, queries = synthetic_vectors(200, 10, dims=64)
+    rows = run_benchmark(docs, queries, [0, 16], ["float32", "int8"], k=3, oversample=4)
+    by_variant = {(r["dims"], r["dtype"]): r for r in rows}
+    assert by_variant[(64, "float32")]["recall_at_k"] == 1.0
+    assert by_variant[(64, "int8")]["cache_bytes_per_vector"] < by_variant[(64, "float32")]["cache_bytes_per_vector"]
+    short = by_variant[(16, "float32")]
+    assert short["index_bytes_per_vector"] == 64
+    assert short["recall_at_k_rescored"] >= short["recall_at_k"]
@@ -62,3 +62,21 @@ def test_recommend_with_history():
     assert docs[0] == "doc3.md"
     # Only two documents remain to recommend
     assert len(docs) == 2
+
+
+def test_vectors_rewritten_by_another_process_are_reloaded(tmp_path, monkeypatch):
+    """A worker without the KB watcher picks up doc_embeddings.json written elsewhere."""
+    import json
+
+    doc_file = tmp_path / "doc_embeddings.json"
+    doc_file.write_text(json.dumps({"doc1.md": [1.0, 0.0]}))
+    monkeypatch.setattr(recommendations, "DOC_EMBED_FILE", str(doc_file))
+    recommendations.reload_if_changed()
+    assert [r["doc"] for r in recommendations.recommend_resources([], "one")] == ["doc1.md"]
+
+    # Another process replaces the file (write then rename)
+    tmp_file = tmp_path / "new.json"
+    tmp_file.write_text(json.dumps({"doc1.md": [1.0, 0.0], "doc4.md": [0.0, 1.0]}))
+    tmp_file.replace(doc_file)
+    docs = [r["doc"] for r in recommendations.recommend_resources([], "two")]
+    assert docs == ["doc4.md", "doc1.md"]
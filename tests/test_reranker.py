@@ -0,0 +1,65 @@
+import threading
+
+from backend.app.services import reranker as reranker_module
+from backend.app.services.reranker import Reranker
+from benchmarks.rerank import overlap_scores, run_benchmark
+
+FRAGMENTS = [
+    ("Freelancers build a profile with skills.", 0.40, "freelancer.md"),
+    ("Messages are end-to-end encrypted.", 0.50, "security.md"),
+    ("Payments are held in escrow until approval.", 0.60, "payments.md"),
+    ("Refunds are issued after a dispute.", 0.70, "payment_disputes_and_refunds.md"),
+]
+
+
+def _fake_scorer(calls):
+    lock = threading.Lock()
+
+    def score(pairs):
+        with lock:
+            calls.append(len(pairs))
+        return [float("escrow" in p) + float("dispute" in p) * 0.5 for _, p in pairs]
+
+    return score
+
+
+def test_rerank_orders_by_score_in_batches_and_caches():
+    calls = []
+    reranker = Reranker(_fake_scorer(calls), batch_size=3, workers=2)
+    kept = reranker.rerank("How does escrow work?", FRAGMENTS, top_n=2)
+    assert [src for (_, _, src) in kept] == ["payments.md", "payment_disputes_and_refunds.md"]
+    assert sorted(calls) == [1, 3]
+
+    calls.clear()
+    assert reranker.rerank("How does escrow work?", FRAGMENTS, top_n=2) == kept
+    assert calls == []  # every pair served from the score cache
+    reranker.rerank("Another question?", FRAGMENTS[:2], top_n=2)
+    assert calls == [2]
+
+
+def test_cache_is_bounded():
+    reranker = Reranker(_fake_scorer([]), cache_size=3)
+    reranker.rerank("question", FRAGMENTS, top_n=1)
+    assert len(reranker._cache) == 3
+
+
+def test_missing_model_keeps_distance_order(monkeypatch):
+    monkeypatch.setattr(reranker_module, "load_cross_encoder", lambda model_name: None)
+    reranker = Reranker()
+    assert reranker.rerank("How does escrow work?", FRAGMENTS, top_n=2) == FRAGMENTS[:2]
+
+
+def test_benchmark_reports_tokens_saved_and_latency():
+    questions = [
+        {"question": "How does escrow payment work?", "references": ["payments.md"]},
+        {"question": "Is messaging encrypted?", "references": ["security.md"]},
+    ]
+    rows = run_benchmark(
+        questions, lambda q, k: FRAGMENTS[:k], Reranker(overlap_scores),
+        candidates=4, top_ns=[1, 3], baseline_k=2,
+    )
+    baseline, top1, top3 = rows
+    assert baseline["reference_recall"] == 0.5 and "added_ms_cold" not in baseline
+    assert top1["reference_recall"] == 1.0
+    assert top1["tokens_saved"] > 0 and top1["prompt_tokens"] < top3["prompt_tokens"]
+    assert top1["added_ms_cold"]["p50"] >= 0 and "p95" in top1["added_ms_warm"]
@@ -0,0 +1,106 @@
+import zlib
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.app import responses
+from backend.app.responses import CompressionMiddleware, ORJSONResponse, accepts
+from benchmarks.serialization import run_benchmark
+
+BODY = "escrow payments " * 200  # 3200 bytes
+
+
+def _app(**options) -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, **options)
+
+    @app.get("/text")
+    def text(size: int = len(BODY)):
+        return PlainTextResponse(BODY[:size])
+
+    @app.get("/stream")
+    def stream(media_type: str = "application/x-ndjson"):
+        return StreamingResponse(iter([b"a" * 10, b"b" * 10]), media_type=media_type)
+
+    return app
+
+
+class FakeBrotli:
+    """zlib standing in for the brotli package's streaming compressor."""
+
+    class Compressor:
+        def __init__(self, quality):
+            self._zlib = zlib.compressobj()
+
+        def process(self, data):
+            return self._zlib.compress(data)
+
+        def flush(self):
+            return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+        def finish(self):
+            return self._zlib.flush()
+
+
+def test_orjson_response_encodes_numpy_and_non_string_keys():
+    response = ORJSONResponse({"score": np.float32(0.5), "ids": np.arange(2), 3: "doc.md"})
+    assert response.body == b'{"score":0.5,"ids":[0,1],"3":"doc.md"}'
+
+
+def test_accept_encoding_parsing():
+    assert accepts("gzip, deflate, br", "br")
+    assert accepts("br;q=0.5, gzip", "br")
+    assert not accepts("br;q=0, gzip", "br") and not accepts("gzip", "br")
+
+
+def test_gzip_above_threshold_only(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    client = TestClient(_app())
+    large = client.get("/text", headers={"Accept-Encoding": "gzip, br"})
+    assert large.headers["content-encoding"] == "gzip" and large.text == BODY
+    assert int(large.headers["content-length"]) < len(BODY)
+
+    small = client.get("/text", params={"size": 100}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.text == BODY[:100]
+    plain = client.get("/text", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_streams_compressed_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    client = TestClient(_app())
+    # Small chunks of a stream are still compressed (its total size is unknown)
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == "a" * 10 + "b" * 10
+
+    events = client.get(
+        "/stream", params={"media_type": "text/event-stream"}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert "content-encoding" not in events.headers
+
+
+def test_brotli_preferred_when_installed(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", FakeBrotli)
+    client = TestClient(_app())
+    response = client.get("/text", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert zlib.decompress(response.content) == BODY.encode()
+
+    response = client.get("/text", headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert response.headers["content-encoding"] == "gzip" and response.text == BODY
+    # brotli_quality=None turns brotli off
+    response = TestClient(_app(brotli_quality=None)).get("/text", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in response.headers
+
+
+def test_serialization_benchmark_reports_each_endpoint():
+    rows = run_benchmark(["rag", "history_page", "health"], repeat=1, min_time=0.001, page_size=5)
+    rag, page, health = rows
+    assert set(rag["encode"]) == {"pydantic_json", "pydantic_orjson", "jsonable_json", "jsonable_orjson"}
+    assert page["fastest"] in page["encode"] and 0 < page["compress"]["gzip"]["ratio"] < 1
+    assert not health["compressed_by_middleware"]
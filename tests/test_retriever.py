@@ -1,6 +1,8 @@
+import json
 import os
 import pytest
-from backend.app.services import retriever_openai
+
+from backend.app.services import recommendations, retriever_openai, scope
 
 
 @pytest.fixture(autouse=True)
@@ -22,6 +24,10 @@ def setup_dirs(tmp_path, monkeypatch):
         retriever_openai, "EMBED_CACHE_DIR", str(tmp_path / "embed_cache")
     )
     os.makedirs(str(tmp_path / "embed_cache"), exist_ok=True)
+    monkeypatch.setattr(
+        recommendations, "DOC_EMBED_FILE", str(tmp_path / "doc_embeddings.json")
+    )
+    monkeypatch.setattr(recommendations, "DOC_EMBEDDINGS", {})
 
     # Simulate embeddings
     def fake_call(texts, model=None):
@@ -42,6 +48,24 @@ def test_create_chroma_index():
     assert len(files) > 0
 
 
+def test_index_build_writes_document_vectors():
+    """
+    Test that the index build derives doc_embeddings.json from the chunk vectors,
+    weighting each chunk by its length.
+    """
+    retriever_openai.create_chroma_index(chunk_size=1000, chunk_overlap=0)
+    with open(recommendations.DOC_EMBED_FILE, encoding="utf-8") as f:
+        assert json.load(f) == {"doc1.md": [1.0, 1.0]}
+    assert list(recommendations.DOC_EMBEDDINGS) == ["doc1.md"]
+
+    vectors = retriever_openai.document_vectors(
+        ["aaa", "a", "bb"],
+        [{"source": "x.md"}, {"source": "x.md"}, {"source": "y.md"}],
+        [[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]],
+    )
+    assert vectors == {"x.md": [0.75, 0.25], "y.md": [0.5, 0.5]}
+
+
 def test_retrieve_fragments_in_scope():
     """
     Test that retrieving fragments in scope returns a list of one fragment
@@ -59,6 +83,6 @@ def test_retrieve_fragments_out_of_scope(monkeypatch):
     """
     Test that if the distance threshold is set very low, no fragments are returned.
     """
-    monkeypatch.setattr(retriever_openai, "DISTANCE_THRESHOLD", -1.0)
+    monkeypatch.setattr(scope, "DISTANCE_THRESHOLD", -1.0)
     fragments = retriever_openai.retrieve_fragments_openai("something else", k=1)
     assert fragments == []
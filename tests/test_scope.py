@@ -0,0 +1,116 @@
+import os
+from collections import defaultdict
+
+import pytest
+
+from backend.app.services import recommendations, retriever_openai, scope, telemetry
+
+VECTORS = {
+    "Payments are held in escrow until the client approves.": [1.0, 0.0, 0.0],
+    "Freelancers build a profile with skills and portfolio.": [0.0, 1.0, 0.0],
+    "How are payments released?": [0.9, 0.1, 0.0],
+    "Tell me about escrow payments on mars": [0.0, 0.0, 1.0],
+    "Weather forecast tomorrow Madrid": [0.0, 0.1, 1.0],
+    # Paraphrase sharing no word with the KB
+    "Withdraw earnings quickly?": [0.95, 0.05, 0.1],
+}
+
+
+@pytest.fixture
+def kb_index(tmp_path, monkeypatch):
+    """Two-document KB indexed with fixed embeddings; records embedding calls."""
+    kb_dir = tmp_path / "kb"
+    kb_dir.mkdir()
+    (kb_dir / "payments.md").write_text("Payments are held in escrow until the client approves.")
+    (kb_dir / "freelancer.md").write_text("Freelancers build a profile with skills and portfolio.")
+    monkeypatch.setattr(retriever_openai, "KB_DIR", str(kb_dir))
+    monkeypatch.setattr(retriever_openai, "CHROMA_DB_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DIR", str(tmp_path / "embed_cache"))
+    monkeypatch.setattr(recommendations, "DOC_EMBED_FILE", str(tmp_path / "doc_embeddings.json"))
+    monkeypatch.setattr(recommendations, "DOC_EMBEDDINGS", {})
+    os.makedirs(tmp_path / "embed_cache")
+    calls = []
+
+    def fake_call(texts, model=None):
+        calls.extend(texts)
+        return [VECTORS[t] for t in texts]
+
+    monkeypatch.setattr(retriever_openai, "_call_openai_embedding", fake_call)
+    retriever_openai.create_chroma_index(chunk_size=1000, chunk_overlap=0)
+    calls.clear()
+    return calls
+
+
+def test_lexical_miss_is_left_to_the_centroid_stage(kb_index, monkeypatch):
+    monkeypatch.setattr(telemetry, "EVENT_COUNT", defaultdict(int))
+    assert retriever_openai.retrieve_fragments_openai("Weather forecast tomorrow Madrid") == []
+    assert kb_index == ["Weather forecast tomorrow Madrid"]
+    assert telemetry.EVENT_COUNT["scope_lexical_miss"] == 1
+    assert telemetry.EVENT_COUNT["scope_rejected_centroid"] == 1
+
+    fragments = retriever_openai.retrieve_fragments_openai("How are payments released?", k=1)
+    assert [src for (_, _, src) in fragments] == ["payments.md"]
+
+
+def test_in_scope_paraphrase_without_shared_words_is_answered(kb_index, monkeypatch):
+    monkeypatch.setattr(telemetry, "EVENT_COUNT", defaultdict(int))
+    index = retriever_openai.get_scope_index(retriever_openai.get_vector_store())
+    assert not index.lexical_match("Withdraw earnings quickly?")
+
+    fragments = retriever_openai.retrieve_fragments_openai("Withdraw earnings quickly?", k=1)
+    assert [src for (_, _, src) in fragments] == ["payments.md"]
+    assert telemetry.EVENT_COUNT["scope_lexical_miss"] == 1
+    assert telemetry.EVENT_COUNT["scope_rejected_centroid"] == 0
+
+
+def test_stems_keep_accented_words():
+    assert scope.content_stems("¿Qué métodos de pago aceptan?") >= {"métod", "pago", "acept"}
+    assert "rechn" in scope.content_stems("Wie kann ich eine Rechnung bekommen?")
+
+
+def test_centroid_stage_skips_vector_search(kb_index, monkeypatch):
+    """Known words but an unrelated embedding: rejected after embedding, before the search."""
+    monkeypatch.setattr(telemetry, "EVENT_COUNT", defaultdict(int))
+    searched = []
+    store = retriever_openai.get_vector_store()
+    monkeypatch.setattr(
+        store, "similarity_search_by_vector_with_relevance_scores", lambda *a, **kw: searched.append(1)
+    )
+    assert retriever_openai.retrieve_fragments_openai("Tell me about escrow payments on mars") == []
+    assert kb_index == ["Tell me about escrow payments on mars"] and searched == []
+    assert telemetry.EVENT_COUNT["scope_rejected_centroid"] == 1
+
+
+def test_scope_index_is_built_with_the_index_version(kb_index, monkeypatch):
+    """Queries never read the whole collection: the index comes from the build or its file."""
+
+    def read_collection(store):
+        raise AssertionError("scope index built on the query path")
+
+    monkeypatch.setattr(scope.ScopeIndex, "from_store", classmethod(read_collection))
+    store = retriever_openai.get_vector_store()
+    assert os.path.exists(os.path.join(store._persist_directory, retriever_openai.SCOPE_INDEX_FILE))
+    assert retriever_openai.retrieve_fragments_openai("Weather forecast tomorrow Madrid") == []
+
+    # Another worker (nothing cached) loads the saved file
+    monkeypatch.setattr(scope, "_scope_indexes", {})
+    index = retriever_openai.get_scope_index(store)
+    assert index.sources == ["freelancer.md", "payments.md"] and scope.content_stems("escrow") <= index.vocabulary
+    assert index.centroids.shape == (2, 3)
+    assert retriever_openai.retrieve_fragments_openai("Weather forecast tomorrow Madrid") == []
+
+
+def test_calibration_keeps_in_scope_questions():
+    index = scope.ScopeIndex.from_chunks(
+        ["escrow payments", "freelancer profile"],
+        [{"source": "payments.md"}, {"source": "freelancer.md"}],
+        [[1.0, 0.0], [0.0, 1.0]],
+    )
+    paraphrase = "withdraw earnings quickly"
+    embed = {"in a": [1.0, 0.2], "in b": [0.6, 0.8], paraphrase: [1.0, 0.0], "off": [-1.0, -1.0]}.get
+    result = scope.calibrate(index, ["in a", "in b", paraphrase], ["off"], embed)
+    assert result["centroid_min_similarity"] == pytest.approx(0.8 - scope.CALIBRATION_MARGIN)
+    assert result["in_scope"]["rejection_rate"] == 0.0
+    assert result["lexical_false_rejection_rate"] == pytest.approx(1 / 3)
+    assert result["out_of_scope"]["rejected_centroid"] == 1
+    assert scope.is_out_of_scope([]) and not scope.is_out_of_scope([0.3, scope.DISTANCE_THRESHOLD + 1])
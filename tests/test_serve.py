@@ -0,0 +1,68 @@
+import fcntl
+import threading
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import main, serve
+from backend.app.main import app
+from backend.app.services import recommendations, retriever_openai, warmup
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_liveness_and_readiness(client, monkeypatch):
+    assert client.get("/health/live").json()["status"] == "alive"
+
+    monkeypatch.setattr(retriever_openai, "index_exists", lambda: False)
+    monkeypatch.setattr(warmup, "STATUS", {"state": "running"})
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"] == {"database": True, "index": False, "warmup": False}
+
+    monkeypatch.setattr(retriever_openai, "index_exists", lambda: True)
+    monkeypatch.setattr(warmup, "STATUS", {"state": "failed"})
+    assert client.get("/health/ready").status_code == 200
+    # A warm-up past its budget keeps running without holding readiness back
+    monkeypatch.setattr(warmup, "STATUS", {"state": "running", "budget_spent": True})
+    assert client.get("/health/ready").status_code == 200
+
+
+def test_startup_builds_a_missing_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "BACKGROUND_LOCK_FILE", tmp_path / ".background.lock")
+    monkeypatch.setattr(main, "WARMUP_ENABLED", False)
+    monkeypatch.setattr(retriever_openai, "index_exists", lambda: False)
+    built = threading.Event()
+    monkeypatch.setattr(retriever_openai, "ensure_index", built.set)
+    with TestClient(app):
+        assert built.wait(5)
+
+
+def test_background_jobs_locked_to_one_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "BACKGROUND_LOCK_FILE", tmp_path / ".background.lock")
+    assert main.acquire_background_lock() is True
+    other = open(tmp_path / ".background.lock", "a")
+    try:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        main.release_background_lock()
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    finally:
+        other.close()
+
+
+def test_document_vectors_share_one_read_only_matrix():
+    packed = recommendations._packed({"a.md": [1.0, 0.0], "b.md": np.array([0.0, 1.0])})
+    assert packed["a.md"].base is packed["b.md"].base
+    assert packed["a.md"].dtype == np.float32 and not packed["a.md"].flags.writeable
+
+
+def test_gunicorn_preloads_the_app():
+    options = serve.gunicorn_options(serve.worker_count(0), "0.0.0.0", 8000)
+    assert options["preload_app"] is True and options["workers"] >= 1
+    assert options["worker_class"].endswith("UvicornWorker")
+    assert options["post_fork"] is serve.post_fork
@@ -0,0 +1,61 @@
+import hashlib
+
+import pytest
+
+from backend.app.services import retriever_openai
+from benchmarks.sweep import mark_pareto, run_sweep
+
+QUESTIONS = [
+    {"id": 1, "question": "escrow payments", "references": ["payments.md"]},
+    {"id": 2, "question": "refund disputes", "references": ["refunds.md"]},
+]
+
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    """Mini KB, isolated index/cache paths and a word-hash fake embedder."""
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "payments.md").write_text("escrow payments " * 60)
+    (kb / "refunds.md").write_text("refund disputes " * 60)
+    monkeypatch.setattr(retriever_openai, "KB_DIR", str(kb))
+    monkeypatch.setattr(retriever_openai, "CHROMA_DB_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(retriever_openai, "EMBED_CACHE_DIR", str(tmp_path / "cache"))
+    (tmp_path / "cache").mkdir()
+    calls = []
+
+    def fake_call(texts, model=None):
+        calls.append(len(texts))
+        vectors = []
+        for text in texts:
+            vec = [0.0] * 8
+            for word in text.split():
+                vec[hashlib.md5(word.encode()).digest()[0] % 8] += 1.0
+            norm = sum(v * v for v in vec) ** 0.5 or 1.0
+            vectors.append([v / norm for v in vec])
+        return vectors
+
+    monkeypatch.setattr(retriever_openai, "_call_openai_embedding", fake_call)
+    return tmp_path, calls
+
+
+def test_sweep_builds_each_variant_and_reuses_embeddings(sandbox):
+    tmp_path, calls = sandbox
+    rows = run_sweep([200, 400], [0, 300], [1, 2], QUESTIONS, str(tmp_path / "sweep"), workers=1)
+    # overlap >= chunk size is skipped: (200, 300)
+    assert {(r["chunk_size"], r["overlap"]) for r in rows} == {(200, 0), (400, 0), (400, 300)}
+    assert all(r["recall_at_k"] == 1.0 and r["index_bytes"] > 0 for r in rows)
+    assert any(r["pareto"] for r in rows)
+
+    embedded = sum(calls)
+    run_sweep([200], [0], [1], QUESTIONS, str(tmp_path / "again"), workers=1)
+    assert sum(calls) == embedded  # every chunk and query came from the cache
+
+
+def test_pareto_front():
+    rows = [
+        {"ndcg_at_k": 0.9, "p50_ms": 10.0, "index_bytes": 100},
+        {"ndcg_at_k": 0.8, "p50_ms": 12.0, "index_bytes": 100},  # dominated
+        {"ndcg_at_k": 0.7, "p50_ms": 5.0, "index_bytes": 100},
+    ]
+    assert [r["pareto"] for r in mark_pareto(rows)] == [True, False, True]
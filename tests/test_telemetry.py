@@ -0,0 +1,90 @@
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.services import retriever_openai, telemetry
+from backend.app.services.latency import LatencyHistogram
+
+
+async def _no_store(user_id, question, answer, refs):
+    return None
+
+
+def test_render_prometheus_histogram_format():
+    """
+    Histograms are exported with cumulative buckets, +Inf, _sum and _count.
+    """
+    hist = LatencyHistogram(buckets=(0.1, 1.0))
+    hist.record(0.05)
+    hist.record(0.5)
+    lines = telemetry._histogram_lines("x_seconds", {"stage": "embedding"}, hist)
+    assert lines == [
+        'x_seconds_bucket{stage="embedding",le="0.1"} 1',
+        'x_seconds_bucket{stage="embedding",le="1.0"} 2',
+        'x_seconds_bucket{stage="embedding",le="+Inf"} 2',
+        'x_seconds_sum{stage="embedding"} 0.55',
+        'x_seconds_count{stage="embedding"} 2',
+    ]
+
+
+def test_stage_timings_are_labelled_with_endpoint(monkeypatch):
+    """
+    Stages timed while serving /rag/query are exported under that endpoint,
+    next to the total request time.
+    """
+    import backend.app.routers.rag as rag_module
+
+    def fake_retrieve(q, k):
+        with telemetry.timed("vector_search"):
+            return [("Irrelevant content", 2.0, "docX.md")]
+
+    monkeypatch.setattr(retriever_openai, "retrieve_fragments_openai", fake_retrieve)
+    monkeypatch.setattr(
+        rag_module, "add_chat_entry_async", _no_store
+    )
+
+    client = TestClient(app)
+    assert client.post("/rag/query", json={"user_id": "u", "query": "q"}).status_code == 200
+
+    resp = client.get("/metrics/prometheus")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert (
+        'shakers_stage_duration_seconds_count{endpoint="/rag/query",stage="vector_search"}'
+        in body
+    )
+    assert 'shakers_request_duration_seconds_count{endpoint="/rag/query"}' in body
+    assert 'shakers_requests_total{endpoint="/rag/query",status="200"}' in body
+
+
+def test_endpoint_label_is_the_route_template():
+    """Ids that are a prefix of a path segment ("h" in "/history/h") still give one label."""
+    from fastapi import APIRouter, FastAPI, Request
+
+    labels = []
+    demo, sub = FastAPI(), FastAPI()
+
+    @demo.get("/history/{user_id}")
+    def history(user_id: str, request: Request):
+        labels.append(telemetry.endpoint_label(request.scope))
+
+    @sub.get("/items/{item_id}")
+    def item(item_id: str, request: Request):
+        labels.append(telemetry.endpoint_label(request.scope))
+
+    router = APIRouter()
+
+    @router.get("/{user_id}")
+    def user(user_id: str, request: Request):
+        labels.append(telemetry.endpoint_label(request.scope))
+
+    demo.mount("/api", sub)
+    demo.include_router(router, prefix="/users")
+    client = TestClient(demo)
+    for path in ("/history/h", "/history/hi", "/history/history", "/api/items/a", "/users/users"):
+        assert client.get(path).status_code == 200
+    assert labels == ["/history/{user_id}"] * 3 + ["/api/items/{item_id}", "/users/{user_id}"]
+
+    # Without the matched route: whole segments only
+    scope = {"endpoint": history, "path": "/history/h", "path_params": {"user_id": "h"}}
+    assert telemetry.endpoint_label(scope) == "/history/{user_id}"
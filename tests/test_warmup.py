@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from datetime import timedelta
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+from backend.app import db
+from backend.app.services import llm_gemini, retriever_openai, warmup
+
+
+@pytest.fixture
+def history_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}")
+    monkeypatch.setattr(db, "engine", engine)
+    SQLModel.metadata.create_all(engine)
+    now = db.utcnow()
+    rows = [
+        ("How do payments work?", ["payments.md"], 1),
+        ("How do payments work?", ["payments.md"], 2),
+        ("How do payments work?", ["payments.md"], 30),
+        ("Find a freelancer", ["find_freelancer.md"], 1),
+        ("Weather in Madrid", [], 1),
+        ("Weather in Madrid", [], 1),
+    ]
+    with db.Session(engine) as session:
+        for question, refs, age_days in rows:
+            entry = db._new_entry("u", question, "a", refs)
+            entry.created_at = now - timedelta(days=age_days)
+            session.add(entry)
+        session.commit()
+    return engine
+
+
+def test_frequent_questions_are_recent_answered_and_ranked(history_db):
+    since = db.utcnow() - timedelta(days=7)
+    assert db.get_frequent_questions(since, 10) == [
+        ("How do payments work?", 2),
+        ("Find a freelancer", 1),
+    ]
+    assert warmup.frequent_questions(limit=1, window_days=7) == ["How do payments work?"]
+
+
+def test_startup_waits_only_for_the_budget(history_db, tmp_path, monkeypatch):
+    """A slow warm-up returns after the budget and finishes in the background."""
+    monkeypatch.setattr(retriever_openai, "CHROMA_DB_DIR", str(tmp_path / "missing"))
+    release = threading.Event()
+    embedded, answered = [], []
+
+    def slow_batch(texts, model=None):
+        release.wait(5)
+        embedded.extend(texts)
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(retriever_openai, "batch_get_openai_embeddings", slow_batch)
+    monkeypatch.setattr(llm_gemini, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(
+        retriever_openai, "retrieve_fragments_openai", lambda q, k=3: [("text", 0.1, "payments.md")]
+    )
+    monkeypatch.setattr(
+        llm_gemini, "generate_answer_with_references_gemini", lambda s, q: answered.append(q)
+    )
+
+    async def scenario():
+        task = await warmup.start(0.05, answers=1)
+        assert warmup.STATUS["state"] == "running" and not task.done()
+        assert warmup.startup_over()  # readiness no longer waits
+        release.set()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(scenario())
+    assert embedded == ["How do payments work?", "Find a freelancer"]
+    assert answered == ["How do payments work?"]
+    assert warmup.STATUS["state"] == "ready" and warmup.STATUS["index_loaded"] is False
+
+
+def test_precomputed_prompt_matches_the_route(monkeypatch):
+    """With reranking on, the warm-up answers from the same snippets as /rag/query."""
+    from fastapi.testclient import TestClient
+
+    from backend.app.main import app
+    from backend.app.routers import rag as rag_module
+    from backend.app.services import rag_pipeline, reranker
+
+    candidates = [("a", 0.2, "a.md"), ("b", 0.3, "b.md"), ("c", 0.4, "c.md"), ("d", 0.5, "d.md")]
+    monkeypatch.setattr(rag_pipeline, "RERANK_ENABLED", True)
+    monkeypatch.setattr(rag_pipeline, "RERANK_CANDIDATES", 4)
+    monkeypatch.setattr(retriever_openai, "retrieve_fragments_openai", lambda q, k: candidates[:k])
+    monkeypatch.setattr(reranker, "rerank", lambda q, fragments: fragments[::-1][:2])
+    monkeypatch.setattr(llm_gemini, "ANSWER_CACHE_ENABLED", True)
+    prompts = []
+
+    def fake_generate(snippets, query):
+        prompts.append((snippets, query))
+        return {"answer": "x"}
+
+    async def no_store(*args):
+        return None
+
+    monkeypatch.setattr(llm_gemini, "generate_answer_with_references_gemini", fake_generate)
+    monkeypatch.setattr(rag_module, "generate_answer_with_references_gemini", fake_generate)
+    monkeypatch.setattr(rag_module, "LLM_HEDGING_ENABLED", False)
+    monkeypatch.setattr(rag_module, "add_chat_entry_async", no_store)
+
+    assert warmup.precompute_answers(["How do payments work?"]) == 1
+    response = TestClient(app).post("/rag/query", json={"user_id": "u", "query": "How do payments work?"})
+    assert response.json()["references"] == ["d.md", "c.md"]
+    assert prompts[0] == prompts[1] == (["d", "c"], "How do payments work?")